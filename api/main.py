@@ -2,9 +2,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import datetime
+import asyncio
 from api.routers import webhooks_router
-from bot.database import init_db
+from api.routers.webhooks import webhook_queue
+from bot.database import init_db, pool_metrics
 from bot.utils import logger
+from bot.utils.http_client import http_client
+from bot.utils.webhook_replay import replay
+from bot.utils.webhook_retention import webhook_retention
 from config import settings
 
 
@@ -19,11 +25,20 @@ async def lifespan(app: FastAPI):
     logger.info("Starting FastAPI application...")
     await init_db()
     logger.info("Database initialized")
+    await http_client.start()
+    webhook_queue.start()
+    # Webhooks acknowledged before the last shutdown but never processed
+    recovery = asyncio.create_task(replay(webhook_queue, statuses=("received",), before=datetime.utcnow()))
+    webhook_retention.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down FastAPI application...")
+    webhook_retention.stop()
+    recovery.cancel()
+    webhook_queue.stop()
+    await http_client.close()
 
 
 # Create FastAPI app
@@ -61,6 +76,19 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Metrics endpoint.
+    
+    Returns:
+        Database connection pool and webhook log retention metrics
+    """
+    return {
+        "database": pool_metrics(),
+        "webhook_retention": webhook_retention.metrics()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
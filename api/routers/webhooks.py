@@ -1,67 +1,213 @@
 """Payment webhook router for FastAPI."""
 from fastapi import APIRouter, Request, HTTPException, Header
-from typing import Optional
+from typing import Optional, Any
 from datetime import datetime
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.database import get_db_session
-from bot.models import Payment, PaymentStatus, WebhookLog, User
+from bot.models import Payment, WebhookLog
 from bot.utils import logger
+from bot.utils.confirmations import apply_confirmations
+from bot.utils.service_health import any_breaker_open, read_health
+from bot.utils.trade_queue import queue_metrics
+from bot.utils.webhook_queue import WebhookQueue, loads
 from config import settings
 import hashlib
 import hmac
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
 
+# Header carrying the hex HMAC-SHA256 of the raw body
+SIGNATURE_HEADER = "X-Signature"
 
-def verify_webhook_signature(payload: str, signature: str, secret: str) -> bool:
+
+def verify_webhook_signature(payload: bytes, signature: Optional[str], secret: str) -> bool:
     """Verify webhook signature.
     
     Args:
-        payload: Webhook payload
-        signature: Provided signature
+        payload: Raw request body, exactly as received
+        signature: Provided hex HMAC-SHA256 signature
         secret: Webhook secret
         
     Returns:
         True if valid, False otherwise
     """
+    if not signature:
+        return False
+    
     expected_signature = hmac.new(
         secret.encode(),
-        payload.encode(),
+        payload,
         hashlib.sha256
     ).hexdigest()
     
-    return hmac.compare_digest(signature, expected_signature)
+    return hmac.compare_digest(signature.strip().lower().encode(), expected_signature.encode())
 
 
-@router.post("/payment")
-async def payment_webhook(request: Request):
-    """Handle payment webhook notifications.
+async def process_payment(session: AsyncSession, log: WebhookLog, payload: Any) -> bool:
+    """Handle a logged payment webhook.
+    
+    Args:
+        session: Database session
+        log: Webhook log row
+        payload: Parsed payload
+        
+    Returns:
+        True (payment webhooks are only recorded)
+    """
+    logger.info(f"Received payment webhook: {payload}")
+    return True
+
+
+async def process_blockcypher(session: AsyncSession, log: WebhookLog, payload: Any) -> bool:
+    """Apply a logged BlockCypher transaction confirmation to its payment.
+    
+    Args:
+        session: Database session
+        log: Webhook log row
+        payload: Parsed transaction
+        
+    Returns:
+        True if a payment was updated
+    """
+    if log.event_type != "tx-confirmation":
+        return False
+    
+    # Find payment by transaction hash
+    result = await session.execute(
+        select(Payment).where(Payment.transaction_id == payload.get("hash"))
+    )
+    payment = result.scalar_one_or_none()
+    if payment is None:
+        return False
+    
+    await apply_confirmations(session, payment, payload.get("confirmations", 0))
+    logger.info(f"Processed BlockCypher webhook {log.id}: {log.event_type}")
+    return True
+
+
+webhook_queue = WebhookQueue({"payment": process_payment, "blockcypher": process_blockcypher})
+
+
+def event_key(webhook_type: str, event_id: Optional[str], payload: Any) -> Optional[str]:
+    """Build the key that identifies one event across redeliveries.
+    
+    BlockCypher sends the hook's id as ``X-EventId`` on every delivery from
+    that hook, one per confirmation, so its key also includes the
+    transaction hash and confirmation count.
+    
+    Args:
+        webhook_type: Log type
+        event_id: Sender's event id header
+        payload: Parsed payload
+        
+    Returns:
+        Event key, or None when the sender gave no event id
+    """
+    if not event_id:
+        return None
+    if webhook_type == "blockcypher":
+        return f"blockcypher:{event_id}:{payload.get('hash')}:{payload.get('confirmations', 0)}"
+    return f"{webhook_type}:{event_id}"
+
+
+async def accept(
+    request: Request,
+    webhook_type: str,
+    secret: str,
+    event_type: Optional[str] = None,
+    event_id: Optional[str] = None
+) -> Optional[int]:
+    """Verify, persist and queue a delivery.
+    
+    The body is read once; the signature is checked on those bytes before
+    anything is parsed, and the bytes are what gets logged, so the log can
+    be replayed exactly.
     
     Args:
         request: FastAPI request
+        webhook_type: Log type, selects the handler
+        secret: Signing secret (empty to accept unsigned deliveries)
+        event_type: Sender's event type
+        event_id: Sender's event id
         
     Returns:
-        Success response
+        Webhook log id, or None if the event was already accepted
+        
+    Raises:
+        HTTPException: 401 for a bad signature, 400 for a body that isn't
+            a JSON object, 503 with Retry-After when the queue is full
     """
+    body = await request.body()
+    if secret and not verify_webhook_signature(body, request.headers.get(SIGNATURE_HEADER), secret):
+        webhook_queue.stats.unauthorized += 1
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    
+    try:
+        text = body.decode("utf-8")
+        payload = loads(body)
+    except ValueError:
+        webhook_queue.stats.malformed += 1
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if not isinstance(payload, dict):
+        # Handlers read fields off the payload; anything else would only fail in a worker
+        webhook_queue.stats.malformed += 1
+        raise HTTPException(status_code=400, detail="Payload must be a JSON object")
+    
+    key = event_key(webhook_type, event_id, payload)
+    if webhook_queue.is_duplicate(key):
+        return None
+    
+    if not webhook_queue.reserve():
+        raise HTTPException(
+            status_code=503,
+            detail="Webhook queue is full",
+            headers={"Retry-After": str(settings.webhook_retry_after)}
+        )
+    
     try:
-        payload = await request.json()
-        
-        # Log webhook
         async with get_db_session() as session:
             log = WebhookLog(
-                webhook_type="payment",
-                payload=str(payload),
+                webhook_type=webhook_type,
+                event_type=event_type,
+                event_key=key,
+                payload=text,
                 status="received"
             )
             session.add(log)
-            await session.commit()
-        
-        logger.info(f"Received payment webhook: {payload}")
+    except IntegrityError:
+        # Another delivery of the same event got there first
+        webhook_queue.release()
+        webhook_queue.duplicate(key)
+        return None
+    except Exception:
+        webhook_queue.release()
+        raise
+    
+    webhook_queue.submit(log.id, key, payload)
+    return log.id
+
+
+@router.post("/payment")
+async def payment_webhook(request: Request, x_eventid: Optional[str] = Header(None)):
+    """Handle payment webhook notifications.
+    
+    Args:
+        request: FastAPI request
+        x_eventid: Event ID header; repeated deliveries of an ID are dropped
         
-        return {"status": "received"}
+    Returns:
+        Success response
+    """
+    try:
+        log_id = await accept(request, "payment", settings.api_secret_key, event_id=x_eventid)
+        return {"status": "received" if log_id else "duplicate"}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing payment webhook: {e}")
+        logger.error(f"Error receiving payment webhook: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -73,6 +219,9 @@ async def blockcypher_webhook(
 ):
     """Handle BlockCypher webhook for crypto payments.
     
+    The event is logged and acknowledged; a ``webhook_queue`` worker applies
+    it to the payment. Redeliveries of an event are acknowledged and dropped.
+    
     Args:
         request: FastAPI request
         x_eventtype: BlockCypher event type header
@@ -82,77 +231,13 @@ async def blockcypher_webhook(
         Success response
     """
     try:
-        payload = await request.json()
-        
-        # Log webhook
-        async with get_db_session() as session:
-            log = WebhookLog(
-                webhook_type="blockcypher",
-                payload=str(payload),
-                status="received"
-            )
-            session.add(log)
-            await session.flush()
-            
-            # Process transaction confirmation
-            if x_eventtype == "tx-confirmation":
-                tx_hash = payload.get("hash")
-                confirmations = payload.get("confirmations", 0)
-                
-                # Find payment by transaction hash
-                result = await session.execute(
-                    select(Payment).where(Payment.transaction_id == tx_hash)
-                )
-                payment = result.scalar_one_or_none()
-                
-                if payment:
-                    payment.confirmations = confirmations
-                    
-                    if confirmations >= settings.payment_confirmation_blocks:
-                        payment.status = PaymentStatus.COMPLETED
-                        payment.completed_at = datetime.utcnow()
-                        
-                        # Update user
-                        result = await session.execute(
-                            select(User).where(User.discord_id == payment.user_id)
-                        )
-                        user = result.scalar_one_or_none()
-                        if user:
-                            user.total_payments += 1
-                            user.total_spent_usd += payment.amount_usd
-                            user.last_payment_at = datetime.utcnow()
-                        
-                        logger.info(f"Payment {payment.id} completed")
-                    else:
-                        payment.status = PaymentStatus.CONFIRMING
-                        logger.info(f"Payment {payment.id} confirming: {confirmations}/{settings.payment_confirmation_blocks}")
-                    
-                    log.status = "processed"
-                    log.processed_at = datetime.utcnow()
-            
-            await session.commit()
-        
-        logger.info(f"Processed BlockCypher webhook: {x_eventtype}")
-        
-        return {"status": "processed"}
+        log_id = await accept(request, "blockcypher", settings.blockcypher_webhook_token, x_eventtype, x_eventid)
+        return {"status": "received" if log_id else "duplicate"}
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing BlockCypher webhook: {e}")
-        
-        # Update log with error
-        try:
-            async with get_db_session() as session:
-                result = await session.execute(
-                    select(WebhookLog).order_by(WebhookLog.id.desc()).limit(1)
-                )
-                log = result.scalar_one_or_none()
-                if log:
-                    log.status = "failed"
-                    log.error_message = str(e)
-                    await session.commit()
-        except:
-            pass
-        
+        logger.error(f"Error receiving BlockCypher webhook: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
@@ -160,10 +245,30 @@ async def blockcypher_webhook(
 async def health_check():
     """Health check endpoint.
     
+    Outbound calls are made by the bot, so its circuit breakers and
+    connection pool are read from the snapshot it publishes to the database.
+    
     Returns:
         Health status
     """
+    try:
+        trade_queue = await queue_metrics()
+    except Exception as e:
+        logger.error(f"Error reading trade queue metrics: {e}")
+        trade_queue = None
+    
+    try:
+        bot = await read_health("bot")
+    except Exception as e:
+        logger.error(f"Error reading bot health: {e}")
+        bot = None
+    
+    degraded = bot is None or bot["stale"] or any_breaker_open(bot)
     return {
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat()
+        "status": "degraded" if degraded else "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "circuit_breakers": bot["http"]["circuit_breakers"] if bot else None,
+        "http": bot,
+        "trade_queue": trade_queue,
+        "webhook_queue": webhook_queue.metrics()
     }
@@ -9,17 +9,18 @@ from bot.database import get_db_session
 from bot.models import Payment, PaymentStatus, PaymentType, User, OSRSTrade
 from bot.utils import logger
 from bot.utils.crypto_payments import (
-    BitcoinPaymentProcessor,
-    LitecoinPaymentProcessor,
-    CryptoRateConverter
-)
-from bot.utils.osrs_payments import (
-    OSRSGPPaymentProcessor,
-    RuneLitePluginClient,
-    OSRSTradeAutomation
+    build_chain_clients,
+    CryptoRateConverter,
+    rate_service
 )
+from bot.utils.exchange_rates import CachedRate
+from bot.utils.confirmations import ConfirmationPoller
+from bot.utils.trade_queue import TradeQueue
+from bot.utils.runelite_pool import RuneLitePool
+from bot.utils.osrs_payments import OSRSGPPaymentProcessor, TradeResult
 from config import settings
 import asyncio
+import time
 
 
 class Payments(commands.Cog):
@@ -33,27 +34,68 @@ class Payments(commands.Cog):
         """
         self.bot = bot
         
-        # Initialize payment processors
-        self.btc_processor = BitcoinPaymentProcessor(settings.blockcypher_api_key)
-        self.ltc_processor = LitecoinPaymentProcessor(settings.blockcypher_api_key)
-        self.osrs_processor = OSRSGPPaymentProcessor(settings.osrs_gp_rate)
+        # Initialize payment processors on the bot's shared HTTP pool
+        self.http = bot.http_client
+        self.chain_clients = build_chain_clients(settings.blockcypher_api_key, self.http)
+        self.btc_processor = self.chain_clients.get("BTC")
+        self.ltc_processor = self.chain_clients.get("LTC")
+        self.confirmation_poller = ConfirmationPoller(self.chain_clients)
+        self.osrs_processor = OSRSGPPaymentProcessor(settings.osrs_gp_rate, self.http)
         
-        # Initialize RuneLite client
-        self.runelite_client = RuneLitePluginClient(
-            settings.runelite_plugin_host,
-            settings.runelite_plugin_port
-        )
-        self.trade_automation = OSRSTradeAutomation(
-            self.runelite_client,
-            self.osrs_processor
+        # RuneLite clients share one persistent trade queue
+        self.trade_queue = TradeQueue()
+        self.runelite_pool = RuneLitePool.from_settings(
+            self.trade_queue,
+            self.osrs_processor,
+            self.http,
+            on_complete=self.on_trade_complete
         )
         
-        # Start payment monitoring
+        # Last time the prefetcher refreshed every tracked rate
+        self.last_rate_prefetch: Optional[float] = None
+        
+        # Start trade dispatch, payment monitoring, confirmation polling and rate prefetching
+        self.runelite_pool.start()
         self.payment_monitor.start()
+        self.confirmation_monitor.start()
+        self.rate_prefetcher.start()
     
     def cog_unload(self):
         """Cleanup when cog is unloaded."""
         self.payment_monitor.cancel()
+        self.confirmation_monitor.cancel()
+        self.rate_prefetcher.cancel()
+        self.runelite_pool.stop()
+    
+    @property
+    def rate_prefetcher_healthy(self) -> bool:
+        """Whether the prefetcher has refreshed rates within its last few cycles."""
+        if not self.rate_prefetcher.is_running() or self.last_rate_prefetch is None:
+            return False
+        max_age = settings.rate_prefetch_interval_seconds * 3
+        return time.monotonic() - self.last_rate_prefetch <= max_age
+    
+    async def get_rate_quote(self, currency: str) -> Optional[CachedRate]:
+        """Get a USD rate for quoting, preferring the prefetched in-memory rate.
+        
+        Args:
+            currency: Currency code (e.g. BTC)
+            
+        Returns:
+            Cached rate with its age, or None if no quotable rate is available
+        """
+        if self.rate_prefetcher_healthy:
+            quote = rate_service.peek(currency)
+            if quote and quote.age <= rate_service.max_staleness:
+                return quote
+            logger.info(f"No quotable prefetched {currency} rate, fetching inline")
+        else:
+            # Prefetcher is down or behind; fetch synchronously
+            logger.warning(f"Rate prefetcher unhealthy, fetching {currency} rate inline")
+        
+        if await CryptoRateConverter.get_rate(currency) is None:
+            return None
+        return rate_service.peek(currency)
     
     @app_commands.command(name="pay", description="Initiate a payment for access")
     @app_commands.describe(
@@ -113,14 +155,15 @@ class Payments(commands.Cog):
                 # Handle different payment types
                 if payment_type_lower == "btc":
                     # Convert USD to BTC
-                    btc_amount = await CryptoRateConverter.usd_to_btc(amount_usd)
-                    if not btc_amount:
+                    quote = await self.get_rate_quote("BTC")
+                    if not quote:
                         await interaction.followup.send(
                             "❌ Failed to get BTC conversion rate. Please try again.",
                             ephemeral=True
                         )
                         return
                     
+                    btc_amount = amount_usd / quote.rate
                     payment.amount_crypto = btc_amount
                     payment.wallet_address = settings.btc_wallet_address
                     
@@ -132,6 +175,11 @@ class Payments(commands.Cog):
                     )
                     embed.add_field(name="Amount (USD)", value=f"${amount_usd:.2f}", inline=True)
                     embed.add_field(name="Amount (BTC)", value=f"{btc_amount:.8f} BTC", inline=True)
+                    embed.add_field(
+                        name="Rate",
+                        value=f"${quote.rate:,.2f}/BTC ({quote.age:.0f}s old)",
+                        inline=True
+                    )
                     embed.add_field(name="Payment Address", value=f"```{settings.btc_wallet_address}```", inline=False)
                     embed.add_field(
                         name="Confirmations Required",
@@ -147,14 +195,15 @@ class Payments(commands.Cog):
                 
                 elif payment_type_lower == "ltc":
                     # Convert USD to LTC
-                    ltc_amount = await CryptoRateConverter.usd_to_ltc(amount_usd)
-                    if not ltc_amount:
+                    quote = await self.get_rate_quote("LTC")
+                    if not quote:
                         await interaction.followup.send(
                             "❌ Failed to get LTC conversion rate. Please try again.",
                             ephemeral=True
                         )
                         return
                     
+                    ltc_amount = amount_usd / quote.rate
                     payment.amount_crypto = ltc_amount
                     payment.wallet_address = settings.ltc_wallet_address
                     
@@ -166,6 +215,11 @@ class Payments(commands.Cog):
                     )
                     embed.add_field(name="Amount (USD)", value=f"${amount_usd:.2f}", inline=True)
                     embed.add_field(name="Amount (LTC)", value=f"{ltc_amount:.8f} LTC", inline=True)
+                    embed.add_field(
+                        name="Rate",
+                        value=f"${quote.rate:,.2f}/LTC ({quote.age:.0f}s old)",
+                        inline=True
+                    )
                     embed.add_field(name="Payment Address", value=f"```{settings.ltc_wallet_address}```", inline=False)
                     embed.add_field(
                         name="Confirmations Required",
@@ -270,17 +324,30 @@ class Payments(commands.Cog):
                 pending_payment = result.scalar_one_or_none()
                 
                 if pending_payment:
-                    # Create trade record
-                    trade = OSRSTrade(
-                        payment_id=pending_payment.id,
-                        user_id=str(interaction.user.id),
-                        rsn=rsn,
-                        gp_amount=pending_payment.amount_gp,
-                        world=settings.osrs_world,
-                        location=settings.osrs_trade_location
+                    # Queue a trade unless one is already waiting for this payment
+                    result = await session.execute(
+                        select(OSRSTrade).where(
+                            OSRSTrade.payment_id == pending_payment.id,
+                            OSRSTrade.status.in_(["pending", "in_progress"])
+                        )
                     )
-                    session.add(trade)
+                    trade = result.scalars().first()
+                    if trade:
+                        if trade.status == "pending":
+                            trade.rsn = rsn
+                    else:
+                        trade = OSRSTrade(
+                            payment_id=pending_payment.id,
+                            user_id=str(interaction.user.id),
+                            rsn=rsn,
+                            gp_amount=pending_payment.amount_gp,
+                            world=settings.osrs_world,
+                            location=settings.osrs_trade_location
+                        )
+                        session.add(trade)
                     await session.commit()
+                    self.trade_queue.notify()
+                    ahead = await self.trade_queue.position(trade)
                     
                     embed = discord.Embed(
                         title="✅ RSN Set & Trade Initiated",
@@ -290,6 +357,7 @@ class Payments(commands.Cog):
                     )
                     embed.add_field(name="World", value=str(settings.osrs_world), inline=True)
                     embed.add_field(name="Location", value=settings.osrs_trade_location, inline=True)
+                    embed.add_field(name="Queue Position", value=str(ahead + 1), inline=True)
                     embed.add_field(
                         name="Instructions",
                         value=f"Please log into World {settings.osrs_world} and wait at {settings.osrs_trade_location}. "
@@ -404,6 +472,49 @@ class Payments(commands.Cog):
         """Wait for bot to be ready before starting monitor."""
         await self.bot.wait_until_ready()
     
+    @tasks.loop(seconds=settings.confirmation_poll_interval_seconds)
+    async def confirmation_monitor(self):
+        """Poll confirmations for confirming crypto payments in batches."""
+        try:
+            batches = await self.confirmation_poller.poll()
+            if batches:
+                slowest = max(b.latency for b in batches)
+                logger.info(
+                    f"Checked {sum(b.size for b in batches)} transaction(s) in {len(batches)} batch(es), "
+                    f"slowest {slowest * 1000:.0f}ms"
+                )
+        except Exception as e:
+            logger.error(f"Error in confirmation monitor: {e}")
+    
+    @confirmation_monitor.before_loop
+    async def before_confirmation_monitor(self):
+        """Wait for bot to be ready before polling confirmations."""
+        await self.bot.wait_until_ready()
+    
+    @tasks.loop(seconds=settings.rate_prefetch_interval_seconds)
+    async def rate_prefetcher(self):
+        """Keep exchange rates warm so /pay quotes from memory."""
+        try:
+            started = time.monotonic()
+            await rate_service.refresh()
+            # refresh() logs provider errors and keeps the old entries, so only
+            # count the cycle if every rate was fetched during it
+            rates = [rate_service.peek(c) for c in rate_service.currencies]
+            if all(r and r.fetched_at >= started for r in rates):
+                self.last_rate_prefetch = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error in rate prefetcher: {e}")
+    
+    async def on_trade_complete(self, trade: OSRSTrade, result: TradeResult):
+        """Grant access once a queued trade has completed.
+        
+        Args:
+            trade: Completed trade
+            result: Trade outcome
+        """
+        await self.bot.wait_until_ready()
+        await self.assign_payment_role(trade.user_id)
+    
     async def assign_payment_role(self, user_id: str):
         """Assign payment role to user.
         
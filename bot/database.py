@@ -1,18 +1,164 @@
 """Database utilities and session management."""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-from bot.models import Base
+from typing import AsyncGenerator, Optional, Dict, Any, Deque
+from bot.migrations import migrate
 from config import settings
 
 
+@dataclass
+class PoolStats:
+    """Connection pool counters and checkout durations."""
+    connects: int = 0
+    checkouts: int = 0
+    checkins: int = 0
+    invalidations: int = 0
+    checked_out: int = 0
+    peak_checked_out: int = 0
+    total_checkout_seconds: float = 0.0
+    max_checkout_seconds: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get counters and checkout-time percentiles.
+        
+        Returns:
+            Dict of counters plus avg/p95/max seconds a connection stayed checked out
+        """
+        recent = sorted(self.recent)
+        return {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "invalidations": self.invalidations,
+            "avg_checkout_seconds": round(self.total_checkout_seconds / self.checkins, 4) if self.checkins else 0.0,
+            "p95_checkout_seconds": round(recent[int(len(recent) * 0.95) - 1], 4) if recent else 0.0,
+            "max_checkout_seconds": round(self.max_checkout_seconds, 4)
+        }
+
+
+def is_sqlite(url: str) -> bool:
+    """Check whether a database URL points at SQLite.
+    
+    Args:
+        url: SQLAlchemy database URL
+        
+    Returns:
+        True for SQLite
+    """
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Build engine arguments for a database backend.
+    
+    SQLite gets a driver-level busy timeout (pragmas are applied per
+    connection, see ``_apply_sqlite_pragmas``); server databases get a sized
+    connection pool that pings and recycles connections.
+    
+    Args:
+        url: SQLAlchemy database URL
+        
+    Returns:
+        Keyword arguments for ``create_async_engine``
+    """
+    options: Dict[str, Any] = {"echo": settings.database_echo, "future": True}
+    if is_sqlite(url):
+        options["connect_args"] = {"timeout": settings.sqlite_busy_timeout_ms / 1000}
+    else:
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=settings.database_pool_pre_ping
+        )
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection.
+    
+    WAL lets the bot and API processes read while the other writes,
+    ``synchronous=NORMAL`` is durable under WAL with far fewer fsyncs, and
+    the busy timeout makes writers wait for the lock instead of failing
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.close()
+
+
+def instrument_pool(engine: AsyncEngine, stats: PoolStats):
+    """Record connection pool activity on an engine.
+    
+    Args:
+        engine: Engine to watch
+        stats: Counters to update
+    """
+    pool = engine.sync_engine.pool
+    
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connects += 1
+    
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        stats.checkouts += 1
+        stats.checked_out += 1
+        stats.peak_checked_out = max(stats.peak_checked_out, stats.checked_out)
+    
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return
+        held = time.perf_counter() - started
+        stats.checkins += 1
+        stats.checked_out -= 1
+        stats.total_checkout_seconds += held
+        stats.max_checkout_seconds = max(stats.max_checkout_seconds, held)
+        stats.recent.append(held)
+    
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+
+def create_engine(url: Optional[str] = None, stats: Optional[PoolStats] = None) -> AsyncEngine:
+    """Create an engine tuned for its backend.
+    
+    Args:
+        url: SQLAlchemy database URL (defaults to DATABASE_URL)
+        stats: Pool counters to record into
+        
+    Returns:
+        Async engine
+    """
+    url = url or settings.database_url
+    engine = create_async_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if stats is not None:
+        instrument_pool(engine, stats)
+    return engine
+
+
+# Pool counters for the process-wide engine
+pool_stats = PoolStats()
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.dev_mode,
-    future=True
-)
+engine = create_engine(settings.database_url, pool_stats)
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -22,10 +168,26 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def pool_metrics() -> Dict[str, Any]:
+    """Get the process-wide engine's pool state.
+    
+    Returns:
+        Dict of backend, pool status and checkout counters
+    """
+    return {
+        "backend": engine.dialect.name,
+        "pool": engine.sync_engine.pool.status(),
+        **pool_stats.snapshot()
+    }
+
+
 async def init_db():
-    """Initialize database tables."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Bring the database schema up to date.
+    
+    Reads the applied revision and runs any newer migrations; a current
+    database costs one lookup, with no table reflection.
+    """
+    await migrate(engine)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
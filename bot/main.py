@@ -5,6 +5,8 @@ import asyncio
 from pathlib import Path
 from bot.database import init_db
 from bot.utils import logger
+from bot.utils.http_client import http_client
+from bot.utils.service_health import HealthPublisher
 from config import settings
 
 
@@ -23,6 +25,12 @@ class GPSkilledGuardian(commands.Bot):
             intents=intents,
             help_command=None
         )
+        
+        # Shared outbound HTTP pool used by all payment processors
+        self.http_client = http_client
+        
+        # Breaker and pool state for the API's health endpoint
+        self.health_publisher = HealthPublisher("bot", self.http_client)
     
     async def setup_hook(self):
         """Setup hook called when bot starts."""
@@ -30,6 +38,10 @@ class GPSkilledGuardian(commands.Bot):
         logger.info("Initializing database...")
         await init_db()
         
+        # Open shared HTTP connection pool
+        await self.http_client.start()
+        self.health_publisher.start()
+        
         # Load cogs
         logger.info("Loading cogs...")
         cogs_dir = Path(__file__).parent / "cogs"
@@ -53,6 +65,12 @@ class GPSkilledGuardian(commands.Bot):
         except Exception as e:
             logger.error(f"Failed to sync commands: {e}")
     
+    async def close(self):
+        """Close the bot and release shared resources."""
+        await super().close()
+        self.health_publisher.stop()
+        await self.http_client.close()
+    
     async def on_ready(self):
         """Called when bot is ready."""
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
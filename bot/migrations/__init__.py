@@ -0,0 +1,238 @@
+"""Versioned schema migrations.
+
+Each ``vNNNN_*.py`` module in this package is one revision, in the style of
+an Alembic revision script: it defines ``revision``, ``down_revision``, a
+one-line ``description`` and ``upgrade(connection)`` / ``downgrade(connection)``
+functions that receive a synchronous SQLAlchemy connection. Revisions are
+frozen once released; schema changes go in a new revision, and the matching
+change is made to ``bot/models.py`` so the two stay in step.
+
+The applied revision is stored in the ``schema_version`` table. At startup
+``migrate`` reads that one row and only touches the schema when it is behind,
+instead of reflecting every table the way ``create_all`` does.
+
+Run by hand with ``python -m bot.migrations [current|upgrade|downgrade REV]``.
+"""
+import importlib
+import logging
+import pkgutil
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Optional, List, Sequence
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+
+
+@dataclass
+class Migration:
+    """One revision module."""
+    revision: str
+    down_revision: Optional[str]
+    description: str
+    module: ModuleType
+    
+    def upgrade(self, connection: Connection):
+        """Apply the revision."""
+        self.module.upgrade(connection)
+    
+    def downgrade(self, connection: Connection):
+        """Revert the revision."""
+        self.module.downgrade(connection)
+
+
+def load_migrations() -> List[Migration]:
+    """Discover revision modules and order them by their down_revision chain.
+    
+    Returns:
+        Migrations from the first revision to head
+        
+    Raises:
+        RuntimeError: If the revisions don't form a single chain
+    """
+    by_parent = {}
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("v"):
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        migration = Migration(module.revision, module.down_revision, module.description, module)
+        if migration.down_revision in by_parent:
+            raise RuntimeError(
+                f"Revisions {by_parent[migration.down_revision].revision} and {migration.revision} "
+                f"both follow {migration.down_revision}"
+            )
+        by_parent[migration.down_revision] = migration
+    
+    chain: List[Migration] = []
+    parent = None
+    while parent in by_parent:
+        chain.append(by_parent.pop(parent))
+        parent = chain[-1].revision
+    if by_parent:
+        raise RuntimeError(f"Unreachable revisions: {sorted(m.revision for m in by_parent.values())}")
+    return chain
+
+
+def head() -> Optional[str]:
+    """Get the newest revision.
+    
+    Returns:
+        Head revision, or None if there are no revisions
+    """
+    chain = load_migrations()
+    return chain[-1].revision if chain else None
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    """Read the applied revision.
+    
+    Args:
+        connection: Database connection
+        
+    Returns:
+        Applied revision, or None for a database that was never migrated
+    """
+    if not inspect(connection).has_table(VERSION_TABLE):
+        return None
+    return connection.execute(text(f"SELECT version_num FROM {VERSION_TABLE}")).scalar()
+
+
+def _set_revision(connection: Connection, revision: Optional[str]):
+    """Record the applied revision."""
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"
+    ))
+    connection.execute(text(f"DELETE FROM {VERSION_TABLE}"))
+    if revision is not None:
+        connection.execute(text(f"INSERT INTO {VERSION_TABLE} (version_num) VALUES (:revision)"), {"revision": revision})
+
+
+def _position(chain: Sequence[Migration], revision: Optional[str]) -> int:
+    """Get how many revisions of the chain are applied at a revision."""
+    if revision is None:
+        return 0
+    for index, migration in enumerate(chain):
+        if migration.revision == revision:
+            return index + 1
+    raise RuntimeError(f"Unknown revision {revision}")
+
+
+def upgrade(connection: Connection, target: Optional[str] = None) -> List[str]:
+    """Apply pending revisions.
+    
+    Args:
+        connection: Database connection (inside a transaction)
+        target: Revision to stop at (defaults to head)
+        
+    Returns:
+        Revisions applied, in order
+    """
+    chain = load_migrations()
+    start = _position(chain, current_revision(connection))
+    stop = _position(chain, target) if target is not None else len(chain)
+    
+    applied = []
+    for migration in chain[start:stop]:
+        logger.info(f"Applying migration {migration.revision}: {migration.description}")
+        migration.upgrade(connection)
+        _set_revision(connection, migration.revision)
+        applied.append(migration.revision)
+    return applied
+
+
+def downgrade(connection: Connection, target: Optional[str]) -> List[str]:
+    """Revert revisions newer than a target.
+    
+    Args:
+        connection: Database connection (inside a transaction)
+        target: Revision to go back to (None reverts everything)
+        
+    Returns:
+        Revisions reverted, newest first
+    """
+    chain = load_migrations()
+    start = _position(chain, current_revision(connection))
+    stop = _position(chain, target)
+    
+    reverted = []
+    for migration in reversed(chain[stop:start]):
+        logger.info(f"Reverting migration {migration.revision}: {migration.description}")
+        migration.downgrade(connection)
+        _set_revision(connection, migration.down_revision)
+        reverted.append(migration.revision)
+    return reverted
+
+
+async def migrate(engine: AsyncEngine, target: Optional[str] = None) -> List[str]:
+    """Bring a database up to date.
+    
+    Args:
+        engine: Database engine
+        target: Revision to stop at (defaults to head)
+        
+    Returns:
+        Revisions applied
+    """
+    async with engine.begin() as conn:
+        return await conn.run_sync(upgrade, target)
+
+
+def create_index(
+    connection: Connection,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    where: Optional[str] = None,
+    unique: bool = False
+):
+    """Create an index unless it exists.
+    
+    Args:
+        connection: Database connection
+        name: Index name
+        table: Table name
+        columns: Column expressions, e.g. ``"priority DESC"``
+        where: Predicate for a partial index
+        unique: Create a unique index
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    ddl = f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    if where:
+        ddl += f" WHERE {where}"
+    connection.execute(text(ddl))
+
+
+def drop_index(connection: Connection, name: str):
+    """Drop an index if it exists.
+    
+    Args:
+        connection: Database connection
+        name: Index name
+    """
+    connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def add_column(connection: Connection, table: str, column: str):
+    """Add a column.
+    
+    Args:
+        connection: Database connection
+        table: Table name
+        column: Column definition, e.g. ``"event_type VARCHAR"``
+    """
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}"))
+
+
+def drop_column(connection: Connection, table: str, name: str):
+    """Drop a column.
+    
+    Args:
+        connection: Database connection
+        table: Table name
+        name: Column name
+    """
+    connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {name}"))
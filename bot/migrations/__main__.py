@@ -0,0 +1,40 @@
+"""Command-line entry point for schema migrations."""
+import argparse
+import asyncio
+from bot.database import engine
+from bot.migrations import current_revision, downgrade, head, upgrade
+
+
+async def run(command: str, target=None):
+    """Run a migration command against DATABASE_URL.
+    
+    Args:
+        command: ``current``, ``upgrade`` or ``downgrade``
+        target: Revision for upgrade/downgrade
+    """
+    try:
+        async with engine.begin() as conn:
+            if command == "current":
+                revision = await conn.run_sync(current_revision)
+                print(f"current: {revision}  head: {head()}")
+            elif command == "upgrade":
+                applied = await conn.run_sync(upgrade, target)
+                print(f"applied: {', '.join(applied) or 'nothing'}")
+            else:
+                reverted = await conn.run_sync(downgrade, target)
+                print(f"reverted: {', '.join(reverted) or 'nothing'}")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    """Parse arguments and run the command."""
+    parser = argparse.ArgumentParser(description="Manage the database schema")
+    parser.add_argument("command", choices=("current", "upgrade", "downgrade"))
+    parser.add_argument("revision", nargs="?", help="Target revision (downgrade with none reverts everything)")
+    args = parser.parse_args()
+    asyncio.run(run(args.command, args.revision))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Initial schema.
+
+Tables are created with ``checkfirst`` so databases created by the old
+``create_all`` startup are adopted as they are. Columns added to existing
+tables after their first release come in later revisions.
+"""
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+revision = "0001"
+down_revision = None
+description = "Initial schema"
+
+metadata = sa.MetaData()
+
+sa.Table(
+    "payments", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.String, nullable=False, index=True),
+    sa.Column("username", sa.String, nullable=False),
+    sa.Column("payment_type", sa.Enum("BTC", "LTC", "OSRS_GP", name="paymenttype"), nullable=False),
+    sa.Column("amount_usd", sa.Float, nullable=False),
+    sa.Column("amount_crypto", sa.Float),
+    sa.Column("amount_gp", sa.Float),
+    sa.Column("wallet_address", sa.String),
+    sa.Column("payment_address", sa.String),
+    sa.Column("transaction_id", sa.String, index=True),
+    sa.Column(
+        "status",
+        sa.Enum("PENDING", "CONFIRMING", "COMPLETED", "EXPIRED", "FAILED", name="paymentstatus")
+    ),
+    sa.Column("confirmations", sa.Integer),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("updated_at", sa.DateTime),
+    sa.Column("completed_at", sa.DateTime),
+    sa.Column("expires_at", sa.DateTime, nullable=False),
+    sa.Column("notes", sa.Text)
+)
+
+sa.Table(
+    "osrs_trades", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("payment_id", sa.Integer, nullable=False, index=True),
+    sa.Column("user_id", sa.String, nullable=False),
+    sa.Column("rsn", sa.String, nullable=False),
+    sa.Column("gp_amount", sa.Float, nullable=False),
+    sa.Column("world", sa.Integer, nullable=False),
+    sa.Column("location", sa.String, nullable=False),
+    sa.Column("status", sa.String),
+    sa.Column("trade_started_at", sa.DateTime),
+    sa.Column("trade_completed_at", sa.DateTime),
+    sa.Column("screenshot_path", sa.String),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("updated_at", sa.DateTime),
+    sa.Column("notes", sa.Text)
+)
+
+sa.Table(
+    "users", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("discord_id", sa.String, unique=True, nullable=False, index=True),
+    sa.Column("username", sa.String, nullable=False),
+    sa.Column("discriminator", sa.String),
+    sa.Column("has_paid_role", sa.Boolean),
+    sa.Column("total_payments", sa.Integer),
+    sa.Column("total_spent_usd", sa.Float),
+    sa.Column("osrs_rsn", sa.String),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("updated_at", sa.DateTime),
+    sa.Column("last_payment_at", sa.DateTime)
+)
+
+sa.Table(
+    "moderation_actions", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.String, nullable=False, index=True),
+    sa.Column("moderator_id", sa.String, nullable=False),
+    sa.Column("action_type", sa.String, nullable=False),
+    sa.Column("reason", sa.Text),
+    sa.Column("duration", sa.Integer),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("expires_at", sa.DateTime),
+    sa.Column("is_active", sa.Boolean)
+)
+
+sa.Table(
+    "webhook_logs", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("webhook_type", sa.String, nullable=False),
+    sa.Column("payload", sa.Text, nullable=False),
+    sa.Column("status", sa.String),
+    sa.Column("processed_at", sa.DateTime),
+    sa.Column("created_at", sa.DateTime),
+    sa.Column("error_message", sa.Text)
+)
+
+
+def upgrade(connection: Connection):
+    """Create the tables that don't exist yet."""
+    metadata.create_all(connection, checkfirst=True)
+
+
+def downgrade(connection: Connection):
+    """Drop every table."""
+    metadata.drop_all(connection, checkfirst=True)
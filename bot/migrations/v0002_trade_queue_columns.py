@@ -0,0 +1,35 @@
+"""Trade stage and queue columns on osrs_trades.
+
+``stage`` and ``stage_timings`` record how far the trade automation got;
+``priority`` and ``claimed_by`` back the trade queue. The old ``create_all``
+startup added these to existing databases itself, so only the columns a
+table is missing are added.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from bot.migrations import add_column, drop_column
+
+revision = "0002"
+down_revision = "0001"
+description = "Trade stage and queue columns"
+
+COLUMNS = (
+    ("stage", "stage VARCHAR"),
+    ("stage_timings", "stage_timings JSON"),
+    ("priority", "priority INTEGER DEFAULT 0"),
+    ("claimed_by", "claimed_by VARCHAR"),
+)
+
+
+def upgrade(connection: Connection):
+    """Add the columns osrs_trades doesn't have yet."""
+    existing = {column["name"] for column in inspect(connection).get_columns("osrs_trades")}
+    for name, definition in COLUMNS:
+        if name not in existing:
+            add_column(connection, "osrs_trades", definition)
+
+
+def downgrade(connection: Connection):
+    """Drop the columns."""
+    for name, _ in reversed(COLUMNS):
+        drop_column(connection, "osrs_trades", name)
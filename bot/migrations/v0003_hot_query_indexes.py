@@ -0,0 +1,42 @@
+"""Indexes for the hot query paths.
+
+- ``payment_monitor``: expired payments by ``status`` and ``expires_at``
+- ``/setrsn``: a user's pending payment of a type
+- ``/checkpayment``: a user's payments newest first
+- ``ConfirmationPoller``: confirming payments that have a transaction
+  (partial, as most payments never get a transaction hash)
+- trade queue: pending trades in claim order
+- webhook logs: rows by status and age
+
+``ix_payments_user_id`` is dropped; both per-user indexes lead with
+``user_id`` and serve its lookups.
+"""
+from sqlalchemy.engine import Connection
+from bot.migrations import create_index, drop_index
+
+revision = "0003"
+down_revision = "0002"
+description = "Composite and partial indexes for hot queries"
+
+INDEXES = (
+    ("ix_payments_status_expires_at", "payments", ("status", "expires_at"), None),
+    ("ix_payments_user_type_status", "payments", ("user_id", "payment_type", "status"), None),
+    ("ix_payments_user_created_at", "payments", ("user_id", "created_at"), None),
+    ("ix_payments_confirming_tx", "payments", ("status", "transaction_id"), "transaction_id IS NOT NULL"),
+    ("ix_osrs_trades_queue", "osrs_trades", ("status", "priority DESC", "created_at", "id"), None),
+    ("ix_webhook_logs_status_created_at", "webhook_logs", ("status", "created_at"), None),
+)
+
+
+def upgrade(connection: Connection):
+    """Create the indexes and drop the one they replace."""
+    for name, table, columns, where in INDEXES:
+        create_index(connection, name, table, columns, where)
+    drop_index(connection, "ix_payments_user_id")
+
+
+def downgrade(connection: Connection):
+    """Restore the single-column user index and drop the new ones."""
+    create_index(connection, "ix_payments_user_id", "payments", ("user_id",))
+    for name, _, _, _ in INDEXES:
+        drop_index(connection, name)
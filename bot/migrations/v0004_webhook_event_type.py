@@ -0,0 +1,21 @@
+"""Record the sender's event type on webhook logs.
+
+Webhooks are processed after the delivery is acknowledged, so the
+``X-EventType`` header has to be stored with the payload.
+"""
+from sqlalchemy.engine import Connection
+from bot.migrations import add_column, drop_column
+
+revision = "0004"
+down_revision = "0003"
+description = "Webhook log event type"
+
+
+def upgrade(connection: Connection):
+    """Add webhook_logs.event_type."""
+    add_column(connection, "webhook_logs", "event_type VARCHAR")
+
+
+def downgrade(connection: Connection):
+    """Drop webhook_logs.event_type."""
+    drop_column(connection, "webhook_logs", "event_type")
@@ -0,0 +1,24 @@
+"""Deduplicate webhook deliveries.
+
+``event_key`` identifies one event across redeliveries; the unique index
+makes a second insert of the same event fail instead of logging it twice.
+Rows without a key (senders that send no event id) are not constrained.
+"""
+from sqlalchemy.engine import Connection
+from bot.migrations import add_column, create_index, drop_column, drop_index
+
+revision = "0005"
+down_revision = "0004"
+description = "Webhook log event key"
+
+
+def upgrade(connection: Connection):
+    """Add webhook_logs.event_key and its unique index."""
+    add_column(connection, "webhook_logs", "event_key VARCHAR")
+    create_index(connection, "ux_webhook_logs_event_key", "webhook_logs", ("event_key",), unique=True)
+
+
+def downgrade(connection: Connection):
+    """Drop webhook_logs.event_key."""
+    drop_index(connection, "ux_webhook_logs_event_key")
+    drop_column(connection, "webhook_logs", "event_key")
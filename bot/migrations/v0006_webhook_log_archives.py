@@ -0,0 +1,40 @@
+"""Archive table for compacted webhook logs.
+
+Each row holds a batch of processed ``webhook_logs`` rows, oldest first, as
+compressed JSON lines; ``last_created_at`` is indexed for purging.
+"""
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from bot.migrations import create_index, drop_index
+
+revision = "0006"
+down_revision = "0005"
+description = "Webhook log archives"
+
+metadata = sa.MetaData()
+
+archives = sa.Table(
+    "webhook_log_archives", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("first_log_id", sa.Integer, nullable=False),
+    sa.Column("last_log_id", sa.Integer, nullable=False),
+    sa.Column("first_created_at", sa.DateTime, nullable=False),
+    sa.Column("last_created_at", sa.DateTime, nullable=False),
+    sa.Column("row_count", sa.Integer, nullable=False),
+    sa.Column("codec", sa.String, nullable=False),
+    sa.Column("raw_bytes", sa.Integer, nullable=False),
+    sa.Column("data", sa.LargeBinary, nullable=False),
+    sa.Column("archived_at", sa.DateTime)
+)
+
+
+def upgrade(connection: Connection):
+    """Create webhook_log_archives."""
+    archives.create(connection, checkfirst=True)
+    create_index(connection, "ix_webhook_log_archives_last_created_at", "webhook_log_archives", ("last_created_at",))
+
+
+def downgrade(connection: Connection):
+    """Drop webhook_log_archives."""
+    drop_index(connection, "ix_webhook_log_archives_last_created_at")
+    archives.drop(connection, checkfirst=True)
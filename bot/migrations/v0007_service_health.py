@@ -0,0 +1,31 @@
+"""Service health snapshots.
+
+The bot makes every outbound call, so its circuit breaker and connection
+pool state lives in the bot process; it writes a snapshot here for the
+API's health endpoint to read. One row per service.
+"""
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+revision = "0007"
+down_revision = "0006"
+description = "Service health snapshots"
+
+metadata = sa.MetaData()
+
+service_health = sa.Table(
+    "service_health", metadata,
+    sa.Column("service", sa.String, primary_key=True),
+    sa.Column("http", sa.JSON, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False)
+)
+
+
+def upgrade(connection: Connection):
+    """Create service_health."""
+    service_health.create(connection, checkfirst=True)
+
+
+def downgrade(connection: Connection):
+    """Drop service_health."""
+    service_health.drop(connection, checkfirst=True)
@@ -1,7 +1,7 @@
 """Database models for GPSkilledGuardian."""
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum, JSON, Index, LargeBinary, desc, text
 from sqlalchemy.ext.declarative import declarative_base
 import enum
 
@@ -24,12 +24,37 @@ class PaymentType(enum.Enum):
     OSRS_GP = "osrs_gp"
 
 
+class TradeStage(enum.Enum):
+    """OSRS trade automation stages, in order."""
+    HOP = "hop"
+    REQUESTED = "requested"
+    WINDOW_OPEN = "window_open"
+    OFFERED = "offered"
+    ACCEPTED = "accepted"
+    CONFIRMING = "confirming"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class Payment(Base):
-    """Payment tracking model."""
+    """Payment tracking model.
+    
+    Indexes mirror migration 0003 (see ``bot/migrations``).
+    """
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_status_expires_at", "status", "expires_at"),  # payment_monitor
+        Index("ix_payments_user_type_status", "user_id", "payment_type", "status"),  # /setrsn
+        Index("ix_payments_user_created_at", "user_id", "created_at"),  # /checkpayment
+        Index(  # ConfirmationPoller
+            "ix_payments_confirming_tx", "status", "transaction_id",
+            sqlite_where=text("transaction_id IS NOT NULL"),
+            postgresql_where=text("transaction_id IS NOT NULL")
+        ),
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False)
     username = Column(String, nullable=False)
     payment_type = Column(Enum(PaymentType), nullable=False)
     amount_usd = Column(Float, nullable=False)
@@ -50,6 +75,9 @@ class Payment(Base):
 class OSRSTrade(Base):
     """OSRS trade tracking model."""
     __tablename__ = "osrs_trades"
+    __table_args__ = (
+        Index("ix_osrs_trades_queue", "status", desc("priority"), "created_at", "id"),  # Claim order
+    )
     
     id = Column(Integer, primary_key=True)
     payment_id = Column(Integer, nullable=False, index=True)
@@ -59,9 +87,13 @@ class OSRSTrade(Base):
     world = Column(Integer, nullable=False)
     location = Column(String, nullable=False)
     status = Column(String, default="pending")  # pending, in_progress, completed, failed
+    priority = Column(Integer, default=0)  # Higher runs first; FIFO within a priority
+    claimed_by = Column(String, nullable=True)  # Worker that picked the trade up
     trade_started_at = Column(DateTime, nullable=True)
     trade_completed_at = Column(DateTime, nullable=True)
     screenshot_path = Column(String, nullable=True)
+    stage = Column(String, nullable=True)  # Last TradeStage reached
+    stage_timings = Column(JSON, nullable=True)  # Seconds spent reaching each stage
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     notes = Column(Text, nullable=True)
@@ -102,11 +134,45 @@ class ModerationAction(Base):
 class WebhookLog(Base):
     """Webhook event logging."""
     __tablename__ = "webhook_logs"
+    __table_args__ = (
+        Index("ix_webhook_logs_status_created_at", "status", "created_at"),
+        Index("ux_webhook_logs_event_key", "event_key", unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     webhook_type = Column(String, nullable=False)  # payment, blockcypher, etc.
+    event_type = Column(String, nullable=True)  # Sender's event type, e.g. tx-confirmation
+    event_key = Column(String, nullable=True)  # Deduplicates redeliveries of one event
     payload = Column(Text, nullable=False)
-    status = Column(String, default="received")  # received, processed, failed
+    status = Column(String, default="received")  # received, processed, ignored, failed
     processed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     error_message = Column(Text, nullable=True)
+
+
+class WebhookLogArchive(Base):
+    """Compacted batch of processed webhook logs."""
+    __tablename__ = "webhook_log_archives"
+    __table_args__ = (
+        Index("ix_webhook_log_archives_last_created_at", "last_created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    first_log_id = Column(Integer, nullable=False)
+    last_log_id = Column(Integer, nullable=False)
+    first_created_at = Column(DateTime, nullable=False)
+    last_created_at = Column(DateTime, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    codec = Column(String, nullable=False)  # gzip or zstd
+    raw_bytes = Column(Integer, nullable=False)  # Uncompressed JSON lines size
+    data = Column(LargeBinary, nullable=False)  # Compressed JSON lines, one log row each
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ServiceHealth(Base):
+    """Latest health snapshot a process published for the others to read."""
+    __tablename__ = "service_health"
+    
+    service = Column(String, primary_key=True)  # e.g. bot
+    http = Column(JSON, nullable=False)  # HTTPClient.metrics(): pool, rate limits, circuit breakers
+    updated_at = Column(DateTime, nullable=False)
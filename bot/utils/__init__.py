@@ -1,23 +1,74 @@
 """Bot utilities package."""
 from bot.utils.logger import setup_logger, logger
+from bot.utils.http_client import HTTPClient, http_client
+from bot.utils.rate_limiter import TokenBucket, RateLimiterRegistry
+from bot.utils.resilience import CircuitBreaker, CircuitOpenError
 from bot.utils.crypto_payments import (
+    ChainConfig,
+    BLOCKCYPHER_CHAINS,
+    BlockCypherClient,
+    build_chain_clients,
     BitcoinPaymentProcessor,
     LitecoinPaymentProcessor,
-    CryptoRateConverter
+    CryptoRateConverter,
+    rate_service
 )
+from bot.utils.exchange_rates import (
+    ExchangeRateService,
+    RateProvider,
+    CoinbaseRateProvider,
+    StaticRateProvider
+)
+from bot.utils.hiscores import HiscoresClient, PlayerStats, normalize_rsn
+from bot.utils.plugin_events import PluginEventStream, PluginEvent
 from bot.utils.osrs_payments import (
     OSRSGPPaymentProcessor,
     RuneLitePluginClient,
-    OSRSTradeAutomation
+    OSRSTradeAutomation,
+    TradeResult
 )
+from bot.utils.trade_queue import TradeQueue, TradeWorker
+from bot.utils.screenshots import ScreenshotStore
+from bot.utils.trade_batches import TradeBatch, plan_batches
+from bot.utils.runelite_pool import RuneLitePool, PooledClient
+from bot.utils.webhook_queue import WebhookQueue
 
 __all__ = [
     "setup_logger",
     "logger",
+    "HTTPClient",
+    "http_client",
+    "TokenBucket",
+    "RateLimiterRegistry",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ChainConfig",
+    "BLOCKCYPHER_CHAINS",
+    "BlockCypherClient",
+    "build_chain_clients",
     "BitcoinPaymentProcessor",
     "LitecoinPaymentProcessor",
     "CryptoRateConverter",
+    "rate_service",
+    "ExchangeRateService",
+    "RateProvider",
+    "CoinbaseRateProvider",
+    "StaticRateProvider",
+    "HiscoresClient",
+    "PlayerStats",
+    "normalize_rsn",
+    "PluginEventStream",
+    "PluginEvent",
     "OSRSGPPaymentProcessor",
     "RuneLitePluginClient",
-    "OSRSTradeAutomation"
+    "OSRSTradeAutomation",
+    "TradeResult",
+    "TradeQueue",
+    "TradeWorker",
+    "ScreenshotStore",
+    "TradeBatch",
+    "plan_batches",
+    "RuneLitePool",
+    "PooledClient",
+    "WebhookQueue"
 ]
@@ -0,0 +1,232 @@
+"""Payment confirmation tracking shared by webhooks and polling."""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Any
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from bot.database import get_db_session
+from bot.models import Payment, PaymentStatus, User
+from bot.utils.crypto_payments import BlockCypherClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def apply_confirmations(session: AsyncSession, payment: Payment, confirmations: int) -> bool:
+    """Record a payment's confirmation count and complete it at the threshold.
+    
+    Deliveries can arrive late, twice or out of order and are processed
+    concurrently, so both changes are conditional UPDATEs rather than
+    attribute writes: the count never goes down and a completed payment is
+    never moved back to confirming.
+    
+    Args:
+        session: Database session (caller commits)
+        payment: Payment to update
+        confirmations: Current confirmation count
+        
+    Returns:
+        True if the payment was completed by this call
+    """
+    await session.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, func.coalesce(Payment.confirmations, 0) < confirmations)
+        .values(confirmations=confirmations)
+    )
+    
+    if confirmations < settings.payment_confirmation_blocks:
+        await session.execute(
+            update(Payment)
+            .where(Payment.id == payment.id, Payment.status != PaymentStatus.COMPLETED)
+            .values(status=PaymentStatus.CONFIRMING)
+        )
+        logger.info(f"Payment {payment.id} confirming: {confirmations}/{settings.payment_confirmation_blocks}")
+        return False
+    
+    return await complete_payment(session, payment)
+
+
+async def complete_payment(session: AsyncSession, payment: Payment) -> bool:
+    """Mark a payment completed and credit it to the user, exactly once.
+    
+    The status change is a conditional UPDATE, so when two workers complete
+    the same payment concurrently only one of them credits the user.
+    
+    Args:
+        session: Database session (caller commits)
+        payment: Payment to complete
+        
+    Returns:
+        True if this call completed the payment, False if it already was
+    """
+    now = datetime.utcnow()
+    result = await session.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status != PaymentStatus.COMPLETED)
+        .values(status=PaymentStatus.COMPLETED, completed_at=now)
+    )
+    if result.rowcount != 1:
+        logger.info(f"Payment {payment.id} was already completed")
+        return False
+    
+    # Update user; in SQL, as other workers may be crediting the same user
+    await session.execute(
+        update(User)
+        .where(User.discord_id == payment.user_id)
+        .values(
+            total_payments=User.total_payments + 1,
+            total_spent_usd=User.total_spent_usd + payment.amount_usd,
+            last_payment_at=now
+        )
+    )
+    
+    logger.info(f"Payment {payment.id} completed")
+    return True
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batched transaction lookup."""
+    chain: str
+    size: int
+    found: int
+    latency: float
+
+
+@dataclass
+class ConfirmationPollStats:
+    """Counters for the confirmation poller."""
+    polls: int = 0
+    batches: int = 0
+    transactions_checked: int = 0
+    payments_updated: int = 0
+    payments_completed: int = 0
+    total_batch_latency: float = 0.0
+    last_batches: List[BatchResult] = field(default_factory=list)
+    
+    @property
+    def avg_batch_latency(self) -> float:
+        """Mean seconds per batched lookup."""
+        return self.total_batch_latency / self.batches if self.batches else 0.0
+
+
+class ConfirmationPoller:
+    """Poll confirmation counts for in-flight crypto payments in batches.
+    
+    Transaction hashes of all ``CONFIRMING`` payments are grouped per chain
+    and looked up with BlockCypher batch requests, then every payment is
+    updated in a single database transaction.
+    """
+    
+    def __init__(self, chain_clients: Dict[str, BlockCypherClient]):
+        """Initialize confirmation poller.
+        
+        Args:
+            chain_clients: Dict of currency symbol to chain client
+        """
+        self.chain_clients = chain_clients
+        self.stats = ConfirmationPollStats()
+    
+    async def _load_confirming(self) -> Dict[str, Dict[str, List[int]]]:
+        """Load confirming payments grouped by chain and transaction hash.
+        
+        Returns:
+            Dict of currency symbol to {tx hash: [payment ids]}
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(Payment.id, Payment.payment_type, Payment.transaction_id).where(
+                    Payment.status == PaymentStatus.CONFIRMING,
+                    Payment.transaction_id.is_not(None)
+                )
+            )
+            rows = result.all()
+        
+        grouped: Dict[str, Dict[str, List[int]]] = {}
+        for payment_id, payment_type, tx_hash in rows:
+            symbol = payment_type.value.upper()
+            grouped.setdefault(symbol, {}).setdefault(tx_hash, []).append(payment_id)
+        return grouped
+    
+    async def poll(self) -> List[BatchResult]:
+        """Run one polling pass.
+        
+        Returns:
+            Per-batch results for this pass
+        """
+        self.stats.polls += 1
+        grouped = await self._load_confirming()
+        
+        batches: List[BatchResult] = []
+        confirmations: Dict[int, int] = {}
+        
+        for symbol, by_hash in grouped.items():
+            client = self.chain_clients.get(symbol)
+            if client is None:
+                logger.warning(f"No chain client for {symbol}; skipping {len(by_hash)} transaction(s)")
+                continue
+            
+            for batch in client.batches(list(by_hash)):
+                started = time.perf_counter()
+                txs = await client.get_transactions(batch)
+                latency = time.perf_counter() - started
+                
+                batches.append(BatchResult(symbol, len(batch), len(txs), latency))
+                logger.debug(f"Checked {len(batch)} {symbol} transaction(s) in {latency * 1000:.0f}ms")
+                
+                for tx_hash, tx in txs.items():
+                    for payment_id in by_hash.get(tx_hash, []):
+                        confirmations[payment_id] = tx.get("confirmations", 0)
+        
+        if confirmations:
+            await self._apply(confirmations)
+        
+        self.stats.batches += len(batches)
+        self.stats.transactions_checked += sum(b.size for b in batches)
+        self.stats.total_batch_latency += sum(b.latency for b in batches)
+        self.stats.last_batches = batches
+        return batches
+    
+    async def _apply(self, confirmations: Dict[int, int]):
+        """Write confirmation counts in one transaction.
+        
+        Args:
+            confirmations: Dict of payment id to confirmation count
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(Payment).where(
+                    Payment.id.in_(list(confirmations)),
+                    Payment.status == PaymentStatus.CONFIRMING
+                )
+            )
+            for payment in result.scalars().all():
+                count = confirmations[payment.id]
+                if count == payment.confirmations:
+                    continue
+                self.stats.payments_updated += 1
+                if await apply_confirmations(session, payment, count):
+                    self.stats.payments_completed += 1
+            
+            await session.commit()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get poller counters.
+        
+        Returns:
+            Dict of counters and latency in milliseconds
+        """
+        return {
+            "polls": self.stats.polls,
+            "batches": self.stats.batches,
+            "transactions_checked": self.stats.transactions_checked,
+            "payments_updated": self.stats.payments_updated,
+            "payments_completed": self.stats.payments_completed,
+            "avg_batch_latency_ms": round(self.stats.avg_batch_latency * 1000, 1),
+            "last_batches": [
+                {"chain": b.chain, "size": b.size, "found": b.found, "latency_ms": round(b.latency * 1000, 1)}
+                for b in self.stats.last_batches
+            ]
+        }
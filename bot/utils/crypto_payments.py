@@ -1,56 +1,188 @@
 """Cryptocurrency payment processing utilities."""
 import asyncio
-import aiohttp
-from typing import Optional, Dict, Any
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime, timedelta
 from config import settings
 from bot.models import Payment, PaymentStatus, PaymentType
+from bot.utils.http_client import HTTPClient, http_client
+from bot.utils.exchange_rates import ExchangeRateService, CoinbaseRateProvider
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class BitcoinPaymentProcessor:
-    """Bitcoin payment processing using BlockCypher API."""
+@dataclass(frozen=True)
+class ChainConfig:
+    """BlockCypher chain parameters."""
+    coin: str
+    network: str
+    symbol: str
+    name: str
+    decimals: int = 8
+    
+    @property
+    def path(self) -> str:
+        """API path segment, e.g. ``btc/main``."""
+        return f"{self.coin}/{self.network}"
+
+
+# Chains BlockCypher supports; enable them with BLOCKCYPHER_CHAINS
+BLOCKCYPHER_CHAINS: Dict[str, ChainConfig] = {
+    "btc": ChainConfig("btc", "main", "BTC", "Bitcoin"),
+    "ltc": ChainConfig("ltc", "main", "LTC", "Litecoin"),
+    "doge": ChainConfig("doge", "main", "DOGE", "Dogecoin"),
+    "dash": ChainConfig("dash", "main", "DASH", "Dash"),
+    "eth": ChainConfig("eth", "main", "ETH", "Ethereum", decimals=18),
+    "btc-test3": ChainConfig("btc", "test3", "BTC", "Bitcoin Testnet"),
+    "bcy-test": ChainConfig("bcy", "test", "BCY", "BlockCypher Testnet"),
+}
+
+
+def parse_chains(spec: str) -> List[ChainConfig]:
+    """Parse a comma-separated chain list.
     
-    BASE_URL = "https://api.blockcypher.com/v1/btc/main"
+    Entries are either keys of ``BLOCKCYPHER_CHAINS`` (``btc``, ``btc-test3``)
+    or ``coin/network[:SYMBOL]`` for chains not in the registry. Payments are
+    matched to chains by currency symbol, so each symbol may be enabled once.
     
-    def __init__(self, api_key: str):
-        """Initialize Bitcoin payment processor.
+    Args:
+        spec: Chain list, e.g. ``"btc,ltc,doge/main:DOGE"``
+        
+    Returns:
+        Chain configurations in the given order
+        
+    Raises:
+        ValueError: If an entry is malformed or two chains share a symbol
+    """
+    chains = {}
+    for entry in filter(None, (e.strip().lower() for e in spec.split(","))):
+        if entry in BLOCKCYPHER_CHAINS:
+            chain = BLOCKCYPHER_CHAINS[entry]
+        else:
+            path, _, symbol = entry.partition(":")
+            coin, _, network = path.partition("/")
+            if not coin or not network:
+                raise ValueError(f"Invalid BlockCypher chain: {entry!r}")
+            symbol = (symbol or coin).upper()
+            chain = ChainConfig(coin, network, symbol, symbol)
+        
+        if chain.symbol in chains:
+            other = chains[chain.symbol]
+            raise ValueError(
+                f"BlockCypher chains {other.path} and {chain.path} are both {chain.symbol}"
+            )
+        chains[chain.symbol] = chain
+    return list(chains.values())
+
+
+class BlockCypherClient:
+    """Payment processing for any BlockCypher-supported chain.
+    
+    All chains share the process-wide connection pool and, per API token, one
+    concurrency budget, since BlockCypher enforces its limits per token
+    across chains.
+    """
+    
+    # One in-flight request budget per API token, shared by every chain
+    _budgets: Dict[str, asyncio.Semaphore] = {}
+    
+    def __init__(self, chain: ChainConfig, api_key: str, http: Optional[HTTPClient] = None):
+        """Initialize BlockCypher chain client.
         
         Args:
+            chain: Chain parameters
             api_key: BlockCypher API key
+            http: Shared HTTP client (defaults to the process-wide client)
         """
+        self.chain = chain
         self.api_key = api_key
+        self.http = http or http_client
+        self.base_url = f"{settings.blockcypher_base_url.rstrip('/')}/{chain.path}"
+        self.batch_size = max(1, min(settings.blockcypher_batch_size, 100))
+    
+    @property
+    def budget(self) -> asyncio.Semaphore:
+        """Concurrency budget shared by all clients using this API token."""
+        budget = self._budgets.get(self.api_key)
+        if budget is None:
+            budget = BlockCypherClient._budgets[self.api_key] = asyncio.Semaphore(
+                settings.blockcypher_max_concurrency
+            )
+        return budget
+    
+    @asynccontextmanager
+    async def _request(self, method: str, path: str, **kwargs) -> AsyncIterator[Any]:
+        """Perform a BlockCypher request within the shared budget.
+        
+        Args:
+            method: HTTP method
+            path: Path below the chain base URL
+            kwargs: Extra request arguments
+            
+        Yields:
+            The response
+        """
+        params = dict(kwargs.pop("params", None) or {})
+        if self.api_key:
+            params["token"] = self.api_key
+        
+        async with self.budget:
+            async with self.http.request(
+                method, f"{self.base_url}{path}", params=params, **kwargs
+            ) as response:
+                yield response
+    
+    def _to_units(self, base_units: int) -> float:
+        """Convert base units (satoshis, litoshis, wei) to whole coins.
+        
+        Args:
+            base_units: Amount in the chain's smallest unit
+            
+        Returns:
+            Amount in whole coins
+        """
+        return base_units / 10 ** self.chain.decimals
+    
+    def batches(self, items: List[str]) -> List[List[str]]:
+        """Split items into API batch-sized chunks.
+        
+        ``get_transactions`` requests one chunk at a time; callers that time
+        each request use this to pass it one batch per call.
+        
+        Args:
+            items: Items to batch
+            
+        Returns:
+            List of chunks
+        """
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
     
     async def create_payment_address(self) -> Optional[Dict[str, Any]]:
-        """Create a new payment address for receiving Bitcoin.
+        """Create a new payment address for receiving funds.
         
         Returns:
             Dict containing address info or None on error
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/addrs"
-                params = {"token": self.api_key}
-                
-                async with session.post(url, params=params) as response:
-                    if response.status == 201:
-                        data = await response.json()
-                        return {
-                            "address": data.get("address"),
-                            "private": data.get("private"),
-                            "public": data.get("public")
-                        }
-                    else:
-                        logger.error(f"Failed to create BTC address: {response.status}")
-                        return None
+            async with self._request("POST", "/addrs") as response:
+                if response.status == 201:
+                    data = await response.json()
+                    return {
+                        "address": data.get("address"),
+                        "private": data.get("private"),
+                        "public": data.get("public")
+                    }
+                else:
+                    logger.error(f"Failed to create {self.chain.symbol} address: {response.status}")
+                    return None
         except Exception as e:
-            logger.error(f"Error creating BTC payment address: {e}")
+            logger.error(f"Error creating {self.chain.symbol} payment address: {e}")
             return None
     
     async def check_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
-        """Check Bitcoin transaction status.
+        """Check transaction status.
         
         Args:
             tx_hash: Transaction hash
@@ -59,171 +191,202 @@ class BitcoinPaymentProcessor:
             Transaction details or None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/txs/{tx_hash}"
-                params = {"token": self.api_key}
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"Failed to check BTC transaction: {response.status}")
-                        return None
+            async with self._request("GET", f"/txs/{tx_hash}") as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    logger.error(f"Failed to check {self.chain.symbol} transaction: {response.status}")
+                    return None
         except Exception as e:
-            logger.error(f"Error checking BTC transaction: {e}")
+            logger.error(f"Error checking {self.chain.symbol} transaction: {e}")
             return None
     
+    async def get_transactions(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Look up several transactions using BlockCypher batch requests.
+        
+        Args:
+            tx_hashes: Transaction hashes
+            
+        Returns:
+            Dict of hash to transaction details; failed lookups are omitted
+        """
+        results = {}
+        for batch in self.batches(list(dict.fromkeys(tx_hashes))):
+            try:
+                async with self._request("GET", f"/txs/{';'.join(batch)}") as response:
+                    if response.status != 200:
+                        logger.error(f"Failed to batch-check {self.chain.symbol} transactions: {response.status}")
+                        continue
+                    data = await response.json()
+            except Exception as e:
+                logger.error(f"Error batch-checking {self.chain.symbol} transactions: {e}")
+                continue
+            
+            for tx in data if isinstance(data, list) else [data]:
+                if tx.get("hash"):
+                    results[tx["hash"]] = tx
+        return results
+    
     async def get_address_balance(self, address: str) -> Optional[float]:
-        """Get balance of a Bitcoin address.
+        """Get balance of an address.
         
         Args:
-            address: Bitcoin address
+            address: Chain address
             
         Returns:
-            Balance in BTC or None
+            Balance in whole coins or None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/addrs/{address}/balance"
-                params = {"token": self.api_key}
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Convert from satoshis to BTC
-                        return data.get("balance", 0) / 100000000
-                    else:
-                        return None
+            async with self._request("GET", f"/addrs/{address}/balance") as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return self._to_units(data.get("balance", 0))
+                else:
+                    return None
         except Exception as e:
-            logger.error(f"Error getting BTC balance: {e}")
+            logger.error(f"Error getting {self.chain.symbol} balance: {e}")
             return None
     
+    async def get_address_balances(self, addresses: List[str]) -> Dict[str, float]:
+        """Get balances of several addresses using BlockCypher batch requests.
+        
+        Args:
+            addresses: Chain addresses
+            
+        Returns:
+            Dict of address to balance in whole coins; failed lookups are omitted
+        """
+        results = {}
+        for batch in self.batches(list(dict.fromkeys(addresses))):
+            try:
+                async with self._request("GET", f"/addrs/{';'.join(batch)}/balance") as response:
+                    if response.status != 200:
+                        logger.error(f"Failed to batch-get {self.chain.symbol} balances: {response.status}")
+                        continue
+                    data = await response.json()
+            except Exception as e:
+                logger.error(f"Error batch-getting {self.chain.symbol} balances: {e}")
+                continue
+            
+            for entry in data if isinstance(data, list) else [data]:
+                if entry.get("address"):
+                    results[entry["address"]] = self._to_units(entry.get("balance", 0))
+        return results
+    
     async def create_webhook(self, address: str, callback_url: str) -> Optional[str]:
         """Create a webhook for monitoring address.
         
         Args:
-            address: Bitcoin address to monitor
+            address: Address to monitor
             callback_url: URL to receive webhook notifications
             
         Returns:
             Webhook ID or None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/hooks"
-                params = {"token": self.api_key}
-                payload = {
-                    "event": "tx-confirmation",
-                    "address": address,
-                    "url": callback_url,
-                    "confirmations": settings.payment_confirmation_blocks
-                }
-                
-                async with session.post(url, params=params, json=payload) as response:
-                    if response.status == 201:
-                        data = await response.json()
-                        return data.get("id")
-                    else:
-                        logger.error(f"Failed to create webhook: {response.status}")
-                        return None
+            payload = {
+                "event": "tx-confirmation",
+                "address": address,
+                "url": callback_url,
+                "confirmations": settings.payment_confirmation_blocks
+            }
+            
+            async with self._request("POST", "/hooks", json=payload) as response:
+                if response.status == 201:
+                    data = await response.json()
+                    return data.get("id")
+                else:
+                    logger.error(f"Failed to create {self.chain.symbol} webhook: {response.status}")
+                    return None
         except Exception as e:
-            logger.error(f"Error creating webhook: {e}")
+            logger.error(f"Error creating {self.chain.symbol} webhook: {e}")
             return None
+    
+    async def delete_webhook(self, webhook_id: str) -> bool:
+        """Delete a webhook.
+        
+        Args:
+            webhook_id: Webhook ID
+            
+        Returns:
+            True if deleted, False otherwise
+        """
+        try:
+            async with self._request("DELETE", f"/hooks/{webhook_id}") as response:
+                return response.status == 204
+        except Exception as e:
+            logger.error(f"Error deleting {self.chain.symbol} webhook {webhook_id}: {e}")
+            return False
 
 
-class LitecoinPaymentProcessor:
-    """Litecoin payment processing using BlockCypher API."""
+class BitcoinPaymentProcessor(BlockCypherClient):
+    """Bitcoin payment processing using BlockCypher API."""
     
-    BASE_URL = "https://api.blockcypher.com/v1/ltc/main"
+    def __init__(self, api_key: str, http: Optional[HTTPClient] = None):
+        """Initialize Bitcoin payment processor.
+        
+        Args:
+            api_key: BlockCypher API key
+            http: Shared HTTP client (defaults to the process-wide client)
+        """
+        super().__init__(BLOCKCYPHER_CHAINS["btc"], api_key, http)
+
+
+class LitecoinPaymentProcessor(BlockCypherClient):
+    """Litecoin payment processing using BlockCypher API."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http: Optional[HTTPClient] = None):
         """Initialize Litecoin payment processor.
         
         Args:
             api_key: BlockCypher API key
+            http: Shared HTTP client (defaults to the process-wide client)
         """
-        self.api_key = api_key
+        super().__init__(BLOCKCYPHER_CHAINS["ltc"], api_key, http)
+
+
+def build_chain_clients(
+    api_key: str,
+    http: Optional[HTTPClient] = None,
+    spec: Optional[str] = None
+) -> Dict[str, BlockCypherClient]:
+    """Create one client per enabled chain.
     
-    async def create_payment_address(self) -> Optional[Dict[str, Any]]:
-        """Create a new payment address for receiving Litecoin.
+    Args:
+        api_key: BlockCypher API key
+        http: Shared HTTP client
+        spec: Chain list (defaults to BLOCKCYPHER_CHAINS setting)
         
-        Returns:
-            Dict containing address info or None on error
-        """
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/addrs"
-                params = {"token": self.api_key}
-                
-                async with session.post(url, params=params) as response:
-                    if response.status == 201:
-                        data = await response.json()
-                        return {
-                            "address": data.get("address"),
-                            "private": data.get("private"),
-                            "public": data.get("public")
-                        }
-                    else:
-                        logger.error(f"Failed to create LTC address: {response.status}")
-                        return None
-        except Exception as e:
-            logger.error(f"Error creating LTC payment address: {e}")
-            return None
+    Returns:
+        Dict of currency symbol to client
+    """
+    chains = parse_chains(spec if spec is not None else settings.blockcypher_chains)
+    return {chain.symbol: BlockCypherClient(chain, api_key, http) for chain in chains}
+
+
+class CryptoRateConverter:
+    """Convert between USD and cryptocurrency rates."""
     
-    async def check_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
-        """Check Litecoin transaction status.
+    @staticmethod
+    async def get_rates() -> Dict[str, float]:
+        """Get current USD rates for every supported cryptocurrency.
         
-        Args:
-            tx_hash: Transaction hash
-            
         Returns:
-            Transaction details or None
+            Dict of currency code to price in USD
         """
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/txs/{tx_hash}"
-                params = {"token": self.api_key}
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"Failed to check LTC transaction: {response.status}")
-                        return None
-        except Exception as e:
-            logger.error(f"Error checking LTC transaction: {e}")
-            return None
+        return await rate_service.get_rates()
     
-    async def get_address_balance(self, address: str) -> Optional[float]:
-        """Get balance of a Litecoin address.
+    @staticmethod
+    async def get_rate(currency: str) -> Optional[float]:
+        """Get current USD rate for a cryptocurrency.
         
         Args:
-            address: Litecoin address
+            currency: Currency code (e.g. BTC)
             
         Returns:
-            Balance in LTC or None
+            Price in USD or None
         """
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.BASE_URL}/addrs/{address}/balance"
-                params = {"token": self.api_key}
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # Convert from litoshis to LTC
-                        return data.get("balance", 0) / 100000000
-                    else:
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting LTC balance: {e}")
-            return None
-
-
-class CryptoRateConverter:
-    """Convert between USD and cryptocurrency rates."""
-    
-    COINBASE_API = "https://api.coinbase.com/v2/exchange-rates"
+        return await rate_service.get_rate(currency)
     
     @staticmethod
     async def get_btc_rate() -> Optional[float]:
@@ -232,19 +395,7 @@ class CryptoRateConverter:
         Returns:
             BTC price in USD or None
         """
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{CryptoRateConverter.COINBASE_API}?currency=BTC"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return float(data["data"]["rates"]["USD"])
-                    else:
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting BTC rate: {e}")
-            return None
+        return await rate_service.get_rate("BTC")
     
     @staticmethod
     async def get_ltc_rate() -> Optional[float]:
@@ -253,19 +404,23 @@ class CryptoRateConverter:
         Returns:
             LTC price in USD or None
         """
-        try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{CryptoRateConverter.COINBASE_API}?currency=LTC"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return float(data["data"]["rates"]["USD"])
-                    else:
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting LTC rate: {e}")
-            return None
+        return await rate_service.get_rate("LTC")
+    
+    @staticmethod
+    async def usd_to_crypto(currency: str, usd_amount: float) -> Optional[float]:
+        """Convert USD to a cryptocurrency.
+        
+        Args:
+            currency: Currency code (e.g. BTC)
+            usd_amount: Amount in USD
+            
+        Returns:
+            Amount in the cryptocurrency or None
+        """
+        rate = await CryptoRateConverter.get_rate(currency)
+        if rate:
+            return usd_amount / rate
+        return None
     
     @staticmethod
     async def usd_to_btc(usd_amount: float) -> Optional[float]:
@@ -296,3 +451,7 @@ class CryptoRateConverter:
         if rate:
             return usd_amount / rate
         return None
+
+
+# Global exchange rate cache shared by all quotes
+rate_service = ExchangeRateService(CoinbaseRateProvider())
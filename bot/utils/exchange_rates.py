@@ -0,0 +1,320 @@
+"""Cached exchange-rate service for crypto quotes."""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterable, List, Set
+from config import settings
+from bot.models import PaymentType
+from bot.utils.http_client import HTTPClient, http_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def crypto_currencies() -> List[str]:
+    """Get the currency codes of every crypto payment type.
+    
+    Returns:
+        Upper-case currency codes (e.g. ["BTC", "LTC"])
+    """
+    return [t.value.upper() for t in PaymentType if t is not PaymentType.OSRS_GP]
+
+
+class RateProvider(ABC):
+    """Source of USD exchange rates."""
+    
+    name = "provider"
+    
+    @abstractmethod
+    async def fetch_rates(self, currencies: Iterable[str]) -> Dict[str, float]:
+        """Fetch USD prices for several currencies in one round trip.
+        
+        Args:
+            currencies: Currency codes
+            
+        Returns:
+            Dict of currency code to price in USD; unknown currencies are omitted
+        """
+
+
+class CoinbaseRateProvider(RateProvider):
+    """Coinbase exchange-rates API.
+    
+    ``exchange-rates?currency=USD`` returns how much of every currency one
+    USD buys, so one request prices all supported currencies at once.
+    """
+    
+    name = "coinbase"
+    
+    def __init__(self, url: Optional[str] = None, http: Optional[HTTPClient] = None):
+        """Initialize Coinbase rate provider.
+        
+        Args:
+            url: Exchange rates endpoint
+            http: Shared HTTP client (defaults to the process-wide client)
+        """
+        self.url = url or settings.coinbase_api_url
+        self.http = http or http_client
+    
+    async def fetch_rates(self, currencies: Iterable[str]) -> Dict[str, float]:
+        """Fetch USD prices for several currencies in one request.
+        
+        Args:
+            currencies: Currency codes
+            
+        Returns:
+            Dict of currency code to price in USD
+        """
+        async with self.http.request("GET", self.url, params={"currency": "USD"}) as response:
+            if response.status != 200:
+                logger.error(f"Failed to get exchange rates: {response.status}")
+                return {}
+            data = await response.json()
+        
+        per_usd = data["data"]["rates"]
+        rates = {}
+        for currency in currencies:
+            value = float(per_usd.get(currency, 0) or 0)
+            if value > 0:
+                rates[currency] = 1 / value
+        return rates
+
+
+class StaticRateProvider(RateProvider):
+    """Fixed in-memory rates, for tests and local runs."""
+    
+    name = "static"
+    
+    def __init__(self, rates: Dict[str, float]):
+        """Initialize static rate provider.
+        
+        Args:
+            rates: Dict of currency code to price in USD
+        """
+        self.rates = {c.upper(): r for c, r in rates.items()}
+        self.calls = 0
+    
+    async def fetch_rates(self, currencies: Iterable[str]) -> Dict[str, float]:
+        """Return the configured rates.
+        
+        Args:
+            currencies: Currency codes
+            
+        Returns:
+            Dict of currency code to price in USD
+        """
+        self.calls += 1
+        return {c: self.rates[c] for c in currencies if c in self.rates}
+
+
+@dataclass
+class CachedRate:
+    """A USD rate and when it was fetched."""
+    rate: float
+    fetched_at: float
+    
+    @property
+    def age(self) -> float:
+        """Seconds since the rate was fetched."""
+        return time.monotonic() - self.fetched_at
+
+
+@dataclass
+class RateCacheStats:
+    """Counters for the rate cache."""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+    rejected_stale: int = 0
+
+
+class ExchangeRateService:
+    """TTL cache in front of a rate provider.
+    
+    Fresh rates (younger than ``ttl``) are served from memory. Rates past the
+    TTL but within ``max_staleness`` are still served while a background
+    refresh runs (stale-while-revalidate). Anything older is refused rather
+    than quoted. Every refresh fetches all tracked currencies in one provider
+    call, and concurrent misses share that one in-flight fetch.
+    """
+    
+    def __init__(
+        self,
+        provider: RateProvider,
+        ttl: Optional[float] = None,
+        max_staleness: Optional[float] = None,
+        currencies: Optional[Iterable[str]] = None
+    ):
+        """Initialize exchange rate service.
+        
+        Args:
+            provider: Source of USD rates
+            ttl: Seconds a rate is considered fresh
+            max_staleness: Seconds after which a rate must not be quoted
+            currencies: Currencies to fetch on every refresh (defaults to all
+                crypto payment types)
+        """
+        self.provider = provider
+        self.currencies: List[str] = [
+            c.upper() for c in (currencies if currencies is not None else crypto_currencies())
+        ]
+        self.ttl = ttl if ttl is not None else settings.rate_cache_ttl_seconds
+        self.max_staleness = (
+            max_staleness if max_staleness is not None else settings.rate_max_staleness_seconds
+        )
+        self.stats = RateCacheStats()
+        self._rates: Dict[str, CachedRate] = {}
+        self._inflight: Optional[asyncio.Task] = None
+        # Currencies requested on demand that haven't resolved yet
+        self._unconfirmed: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+    
+    def peek(self, currency: str) -> Optional[CachedRate]:
+        """Get the cached rate without fetching or counting.
+        
+        Args:
+            currency: Currency code (e.g. BTC)
+            
+        Returns:
+            Cached rate or None
+        """
+        return self._rates.get(currency.upper())
+    
+    async def get_rate(self, currency: str) -> Optional[float]:
+        """Get the USD rate for a currency.
+        
+        Args:
+            currency: Currency code (e.g. BTC)
+            
+        Returns:
+            Price in USD, or None if no rate fresh enough to quote is available
+        """
+        currency = currency.upper()
+        entry = self._rates.get(currency)
+        
+        if entry is not None:
+            age = entry.age
+            if age <= self.ttl:
+                self.stats.hits += 1
+                return entry.rate
+            if age <= self.max_staleness:
+                self.stats.stale_hits += 1
+                self._refresh_in_background()
+                return entry.rate
+        
+        self.stats.misses += 1
+        rate = await self.refresh(currency)
+        if rate is None and entry is not None:
+            self.stats.rejected_stale += 1
+            logger.warning(f"Refusing to quote {currency}: cached rate is {entry.age:.0f}s old")
+        return rate
+    
+    async def get_rates(self) -> Dict[str, float]:
+        """Get USD rates for every tracked currency.
+        
+        Returns:
+            Dict of currency code to price in USD, omitting any that can't be quoted
+        """
+        rates = {}
+        for currency in self.currencies:
+            rate = await self.get_rate(currency)
+            if rate is not None:
+                rates[currency] = rate
+        return rates
+    
+    async def refresh(self, currency: Optional[str] = None) -> Optional[float]:
+        """Refresh all tracked rates, joining an in-flight refresh if there is one.
+        
+        Args:
+            currency: Currency whose fresh rate to return; it is added to the
+                tracked set if it isn't already, and dropped again if the
+                provider has no rate for it
+                
+        Returns:
+            Fresh price in USD for ``currency``, or None on error or when no
+            currency was given
+        """
+        if currency is not None:
+            currency = currency.upper()
+            if currency not in self.currencies:
+                self.currencies.append(currency)
+                self._unconfirmed.add(currency)
+        
+        task = self._inflight
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            task = self._inflight = asyncio.create_task(self._fetch())
+            task.add_done_callback(self._clear_inflight)
+        
+        # Shield so one cancelled caller doesn't cancel the fetch for the others
+        rates = await asyncio.shield(task)
+        return rates.get(currency) if currency is not None else None
+    
+    def _clear_inflight(self, task: asyncio.Task):
+        """Forget a finished refresh task.
+        
+        Args:
+            task: The finished task
+        """
+        if self._inflight is task:
+            self._inflight = None
+    
+    def _refresh_in_background(self):
+        """Schedule a refresh unless one is already running."""
+        if self._inflight is not None:
+            return
+        task = asyncio.create_task(self.refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _fetch(self) -> Dict[str, float]:
+        """Fetch every tracked rate in one provider call and store them.
+        
+        Returns:
+            Dict of currency code to price in USD
+        """
+        self.stats.refreshes += 1
+        currencies = list(self.currencies)
+        try:
+            rates = await self.provider.fetch_rates(currencies)
+        except Exception as e:
+            logger.error(f"Error refreshing rates from {self.provider.name}: {e}")
+            rates = {}
+        
+        fetched_at = time.monotonic()
+        for currency, rate in rates.items():
+            if rate:
+                self._rates[currency] = CachedRate(rate=rate, fetched_at=fetched_at)
+        
+        if any(c not in rates for c in currencies):
+            self.stats.refresh_failures += 1
+        
+        # Stop fetching on-demand currencies the provider can't quote
+        for currency in self._unconfirmed.intersection(currencies):
+            self._unconfirmed.discard(currency)
+            if currency not in self._rates:
+                self.currencies.remove(currency)
+                logger.warning(f"No {self.provider.name} rate for {currency}; no longer fetching it")
+        return rates
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get cache counters and current rate ages.
+        
+        Returns:
+            Dict of counters and ages in seconds
+        """
+        return {
+            "hits": self.stats.hits,
+            "stale_hits": self.stats.stale_hits,
+            "misses": self.stats.misses,
+            "coalesced": self.stats.coalesced,
+            "refreshes": self.stats.refreshes,
+            "refresh_failures": self.stats.refresh_failures,
+            "rejected_stale": self.stats.rejected_stale,
+            "ages": {c: round(r.age, 1) for c, r in self._rates.items()}
+        }
@@ -0,0 +1,369 @@
+"""OSRS hiscores lookups with caching."""
+import asyncio
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, List, Iterable
+from config import settings
+from bot.utils.http_client import HTTPClient, http_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Skill rows of index_lite.ws, in order; activity rows follow them
+SKILLS = (
+    "overall", "attack", "defence", "strength", "hitpoints", "ranged",
+    "prayer", "magic", "cooking", "woodcutting", "fletching", "fishing",
+    "firemaking", "crafting", "smithing", "mining", "herblore", "agility",
+    "thieving", "slayer", "farming", "runecraft", "hunter", "construction",
+    "sailing"
+)
+
+
+def normalize_rsn(rsn: str) -> str:
+    """Normalise a RuneScape Name for comparison.
+    
+    Jagex treats names case-insensitively and considers spaces, underscores
+    and hyphens interchangeable, so "Lynx_Titan", "lynx titan" and
+    "LYNX-TITAN" are the same account.
+    
+    Args:
+        rsn: RuneScape Name
+        
+    Returns:
+        Canonical lower-case name with single spaces
+    """
+    for separator in ("_", "-", "\xa0"):
+        rsn = rsn.replace(separator, " ")
+    return " ".join(rsn.split()).lower()
+
+
+class PlayerStats:
+    """Every hiscores row for a player, stored in compact integer arrays.
+    
+    Skill rows (``rank,level,xp``) and activity rows (``rank,score``) are kept
+    in parallel ``array('q')`` columns in hiscores order; unranked entries
+    keep Jagex's ``-1``. Skills are named by ``SKILLS``; activities (bosses,
+    clues, minigames) are addressed by their row index because Jagex adds
+    new ones over time.
+    """
+    
+    __slots__ = (
+        "rsn",
+        "skill_ranks",
+        "skill_levels",
+        "skill_xp",
+        "activity_ranks",
+        "activity_scores"
+    )
+    
+    def __init__(self, rsn: str):
+        """Initialize empty player stats.
+        
+        Args:
+            rsn: RuneScape Name
+        """
+        self.rsn = rsn
+        self.skill_ranks = array("q")
+        self.skill_levels = array("q")
+        self.skill_xp = array("q")
+        self.activity_ranks = array("q")
+        self.activity_scores = array("q")
+    
+    @classmethod
+    def parse(cls, rsn: str, text: str) -> "PlayerStats":
+        """Parse ``index_lite.ws`` text.
+        
+        Args:
+            rsn: RuneScape Name
+            text: Hiscores response body
+            
+        Returns:
+            Parsed player stats
+            
+        Raises:
+            ValueError: If a row is malformed
+        """
+        stats = cls(rsn)
+        for line in text.split("\n"):
+            fields = line.strip().split(",")
+            if len(fields) == 3:
+                stats.skill_ranks.append(int(fields[0]))
+                stats.skill_levels.append(int(fields[1]))
+                stats.skill_xp.append(int(fields[2]))
+            elif len(fields) == 2:
+                stats.activity_ranks.append(int(fields[0]))
+                stats.activity_scores.append(int(fields[1]))
+            elif fields != [""]:
+                raise ValueError(f"Unexpected hiscores row: {line!r}")
+        return stats
+    
+    @staticmethod
+    def skill_name(index: int) -> str:
+        """Get the name of a skill row.
+        
+        Args:
+            index: Skill row index
+            
+        Returns:
+            Skill name
+        """
+        return SKILLS[index] if index < len(SKILLS) else f"skill_{index}"
+    
+    def skill(self, name: str) -> Tuple[Optional[int], int, Optional[int]]:
+        """Get one skill's row.
+        
+        Args:
+            name: Skill name (e.g. "attack")
+            
+        Returns:
+            Tuple of (rank, level, xp); rank and xp are None when unranked
+            
+        Raises:
+            KeyError: If the skill is unknown or missing from the response
+        """
+        index = SKILLS.index(name.lower()) if name.lower() in SKILLS else -1
+        if not 0 <= index < len(self.skill_levels):
+            raise KeyError(name)
+        rank, xp = self.skill_ranks[index], self.skill_xp[index]
+        return (
+            rank if rank >= 0 else None,
+            self.skill_levels[index],
+            xp if xp >= 0 else None
+        )
+    
+    @property
+    def overall(self) -> Tuple[Optional[int], int, Optional[int]]:
+        """Overall (total level) row."""
+        return self.skill("overall")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict.
+        
+        Returns:
+            Dict with overall rank/level/xp plus every skill and activity
+        """
+        rank, level, xp = self.overall
+        return {
+            "rsn": self.rsn,
+            "rank": rank,
+            "level": level,
+            "xp": xp,
+            "skills": {
+                self.skill_name(i): {
+                    "rank": r if r >= 0 else None,
+                    "level": lvl,
+                    "xp": x if x >= 0 else None
+                }
+                for i, (r, lvl, x) in enumerate(zip(self.skill_ranks, self.skill_levels, self.skill_xp))
+            },
+            "activities": [
+                {"rank": r if r >= 0 else None, "score": sc if sc >= 0 else None}
+                for r, sc in zip(self.activity_ranks, self.activity_scores)
+            ]
+        }
+
+
+@dataclass
+class HiscoresCacheStats:
+    """Counters for the hiscores cache."""
+    hits: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+class HiscoresCache:
+    """LRU cache with separate TTLs for found and not-found players."""
+    
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        positive_ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None
+    ):
+        """Initialize hiscores cache.
+        
+        Args:
+            max_size: Maximum number of cached names
+            positive_ttl: Seconds to keep a found player's hiscores
+            negative_ttl: Seconds to remember that a player was not found
+        """
+        self.max_size = max_size if max_size is not None else settings.hiscores_cache_size
+        self.positive_ttl = (
+            positive_ttl if positive_ttl is not None else settings.hiscores_cache_ttl_seconds
+        )
+        self.negative_ttl = (
+            negative_ttl if negative_ttl is not None else settings.hiscores_negative_ttl_seconds
+        )
+        self.stats = HiscoresCacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+    
+    def get(self, key: str) -> Tuple[bool, Optional[str]]:
+        """Look up a normalised name.
+        
+        Args:
+            key: Normalised RuneScape Name
+            
+        Returns:
+            Tuple of (cached, hiscores text or None if the player was not found)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        
+        expires_at, data = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        
+        self._entries.move_to_end(key)
+        if data is None:
+            self.stats.negative_hits += 1
+        else:
+            self.stats.hits += 1
+        return True, data
+    
+    def set(self, key: str, data: Optional[str]):
+        """Cache a lookup result.
+        
+        Args:
+            key: Normalised RuneScape Name
+            data: Hiscores text, or None if the player was not found
+        """
+        ttl = self.positive_ttl if data is not None else self.negative_ttl
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+    
+    def __len__(self) -> int:
+        """Number of cached names."""
+        return len(self._entries)
+
+
+class HiscoresClient:
+    """Fetch OSRS hiscores, sharing cached and in-flight lookups."""
+    
+    def __init__(
+        self,
+        http: Optional[HTTPClient] = None,
+        cache: Optional[HiscoresCache] = None,
+        url: Optional[str] = None
+    ):
+        """Initialize hiscores client.
+        
+        Args:
+            http: Shared HTTP client (defaults to the process-wide client)
+            cache: Lookup cache
+            url: ``index_lite.ws`` endpoint
+        """
+        self.http = http or http_client
+        self.cache = cache or HiscoresCache()
+        self.url = url or settings.osrs_hiscores_url
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    async def lookup(self, rsn: str) -> Optional[str]:
+        """Get a player's raw hiscores.
+        
+        Args:
+            rsn: RuneScape Name
+            
+        Returns:
+            ``index_lite.ws`` text, or None if the player is not on the hiscores
+            
+        Raises:
+            Exception: If the hiscores could not be reached; errors are not cached
+        """
+        key = normalize_rsn(rsn)
+        cached, data = self.cache.get(key)
+        if cached:
+            return data
+        
+        task = self._inflight.get(key)
+        if task is not None:
+            self.cache.stats.coalesced += 1
+        else:
+            self.cache.stats.misses += 1
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, key: str) -> Optional[str]:
+        """Fetch and cache a player's hiscores.
+        
+        Args:
+            key: Normalised RuneScape Name
+            
+        Returns:
+            Hiscores text or None if not found
+        """
+        async with self.http.request("GET", self.url, params={"player": key}) as response:
+            if response.status == 404:
+                data = None
+            elif response.status == 200:
+                data = (await response.text()).strip() or None
+            else:
+                raise RuntimeError(f"Hiscores returned {response.status}")
+        
+        self.cache.set(key, data)
+        return data
+    
+    async def get_stats(self, rsn: str) -> Optional[PlayerStats]:
+        """Get a player's parsed hiscores.
+        
+        Args:
+            rsn: RuneScape Name
+            
+        Returns:
+            Player stats, or None if the player is not on the hiscores
+        """
+        data = await self.lookup(rsn)
+        return PlayerStats.parse(rsn, data) if data is not None else None
+    
+    async def get_many_stats(
+        self,
+        rsns: Iterable[str],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[PlayerStats]]:
+        """Get parsed hiscores for many players concurrently.
+        
+        Args:
+            rsns: RuneScape Names
+            concurrency: Maximum lookups in flight (defaults to HISCORES_BULK_CONCURRENCY)
+            
+        Returns:
+            Dict of RSN to stats; None for players not found or not fetched
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.hiscores_bulk_concurrency)
+        names: List[str] = list(dict.fromkeys(rsns))
+        
+        async def fetch(rsn: str) -> Optional[PlayerStats]:
+            async with semaphore:
+                try:
+                    return await self.get_stats(rsn)
+                except Exception as e:
+                    logger.error(f"Error getting player stats for {rsn}: {e}")
+                    return None
+        
+        results = await asyncio.gather(*(fetch(rsn) for rsn in names))
+        return dict(zip(names, results))
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get cache counters.
+        
+        Returns:
+            Dict of counters and cache size
+        """
+        stats = self.cache.stats
+        return {
+            "size": len(self.cache),
+            "hits": stats.hits,
+            "negative_hits": stats.negative_hits,
+            "misses": stats.misses,
+            "coalesced": stats.coalesced,
+            "evictions": stats.evictions
+        }
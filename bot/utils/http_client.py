@@ -0,0 +1,319 @@
+"""Shared pooled HTTP client for outbound API calls."""
+import asyncio
+import aiohttp
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, AsyncIterator
+from urllib.parse import urlsplit
+from config import settings
+from bot.utils.rate_limiter import RateLimiterRegistry, parse_retry_after, backoff_delay
+from bot.utils.resilience import BreakerRegistry, CircuitOpenError, IDEMPOTENT_METHODS, retry_delay
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostStats:
+    """Connection and request counters for a single upstream host."""
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+    errors: int = 0
+    
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of requests served on an already-open connection."""
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+
+@dataclass
+class HTTPClientStats:
+    """Per-host connection reuse metrics for the shared client."""
+    hosts: Dict[str, HostStats] = field(default_factory=dict)
+    
+    def host(self, name: str) -> HostStats:
+        """Get (or create) the counters for a host.
+        
+        Args:
+            name: Upstream host name
+            
+        Returns:
+            Host counters
+        """
+        stats = self.hosts.get(name)
+        if stats is None:
+            stats = self.hosts[name] = HostStats()
+        return stats
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get a JSON-serialisable copy of the counters.
+        
+        Returns:
+            Dict keyed by host
+        """
+        return {
+            name: {
+                "requests": s.requests,
+                "connections_created": s.connections_created,
+                "connections_reused": s.connections_reused,
+                "reuse_ratio": round(s.reuse_ratio, 4),
+                "dns_cache_hits": s.dns_cache_hits,
+                "dns_cache_misses": s.dns_cache_misses,
+                "errors": s.errors
+            }
+            for name, s in self.hosts.items()
+        }
+
+
+class HTTPClient:
+    """Process-wide aiohttp session with a keep-alive connection pool.
+    
+    One instance is owned by the bot / FastAPI lifespan and shared by every
+    payment processor, so repeated calls to BlockCypher, Coinbase and the
+    OSRS hiscores reuse open TCP+TLS connections instead of paying the
+    handshake and DNS lookup on every request.
+    """
+    
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        dns_cache_ttl: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        limiters: Optional[RateLimiterRegistry] = None
+    ):
+        """Initialize HTTP client.
+        
+        Args:
+            limit: Maximum number of open connections
+            limit_per_host: Maximum number of open connections per host
+            dns_cache_ttl: Seconds to cache DNS lookups
+            keepalive_timeout: Seconds to keep idle connections open
+            total_timeout: Default total request timeout in seconds
+            connect_timeout: Default connect timeout in seconds
+            limiters: Per-host token buckets (defaults to HTTP_RATE_LIMITS)
+        """
+        self.limit = limit if limit is not None else settings.http_pool_limit
+        self.limit_per_host = (
+            limit_per_host if limit_per_host is not None else settings.http_pool_limit_per_host
+        )
+        self.dns_cache_ttl = dns_cache_ttl if dns_cache_ttl is not None else settings.http_dns_cache_ttl
+        self.keepalive_timeout = (
+            keepalive_timeout if keepalive_timeout is not None else settings.http_keepalive_timeout
+        )
+        self.total_timeout = total_timeout if total_timeout is not None else settings.http_total_timeout
+        self.connect_timeout = (
+            connect_timeout if connect_timeout is not None else settings.http_connect_timeout
+        )
+        
+        self.limiters = limiters if limiters is not None else RateLimiterRegistry()
+        self.breakers = BreakerRegistry()
+        self.stats = HTTPClientStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the underlying session is open."""
+        return self._session is not None and not self._session.closed
+    
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        """Build trace hooks that feed the reuse metrics.
+        
+        Returns:
+            aiohttp trace configuration
+        """
+        trace_config = aiohttp.TraceConfig()
+        
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host or ""
+            self.stats.host(ctx.host).requests += 1
+        
+        async def on_connection_create_end(session, ctx, params):
+            self.stats.host(getattr(ctx, "host", "")).connections_created += 1
+        
+        async def on_connection_reuseconn(session, ctx, params):
+            self.stats.host(getattr(ctx, "host", "")).connections_reused += 1
+        
+        async def on_dns_cache_hit(session, ctx, params):
+            self.stats.host(params.host).dns_cache_hits += 1
+        
+        async def on_dns_cache_miss(session, ctx, params):
+            self.stats.host(params.host).dns_cache_misses += 1
+        
+        async def on_request_exception(session, ctx, params):
+            self.stats.host(getattr(ctx, "host", "")).errors += 1
+        
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """Open the pooled session if it is not already open.
+        
+        Returns:
+            The shared session
+        """
+        async with self._lock:
+            if not self.is_open:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    use_dns_cache=True,
+                    keepalive_timeout=self.keepalive_timeout
+                )
+                timeout = aiohttp.ClientTimeout(
+                    total=self.total_timeout,
+                    connect=self.connect_timeout
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=timeout,
+                    trace_configs=[self._build_trace_config()]
+                )
+                logger.info(
+                    f"HTTP client started (limit={self.limit}, "
+                    f"per_host={self.limit_per_host}, dns_ttl={self.dns_cache_ttl}s)"
+                )
+            return self._session
+    
+    async def close(self):
+        """Close the pooled session and release all connections."""
+        async with self._lock:
+            if self.is_open:
+                await self._session.close()
+                logger.info("HTTP client closed")
+            self._session = None
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared session, opening it lazily if needed.
+        
+        Returns:
+            The shared session
+        """
+        if self.is_open:
+            return self._session
+        return await self.start()
+    
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        retries: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Perform a request on the shared session.
+        
+        Each host (``host:port`` when the URL has a port) has a circuit
+        breaker, so RuneLite clients on one machine fail independently;
+        while it is open the request fails
+        fast with ``CircuitOpenError``. Requests to rate-limited hosts wait for
+        a token first. A 429 response pauses that host's bucket for the
+        ``Retry-After`` delay (or an exponential backoff) and the request is
+        queued again. Idempotent requests that hit a connection error,
+        timeout or 5xx are retried with jittered exponential backoff.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            retries: Transient-failure retries for idempotent methods
+                (defaults to ``http_max_retries``)
+            kwargs: Extra arguments passed to ``aiohttp.ClientSession.request``
+            
+        Yields:
+            The response; it is released back to the pool on exit
+        """
+        session = await self.get_session()
+        host = urlsplit(url).netloc.rpartition("@")[2]
+        bucket = self.limiters.get(host)
+        breaker = self.breakers.get(host)
+        
+        method = method.upper()
+        if method not in IDEMPOTENT_METHODS:
+            retries = 0
+        elif retries is None:
+            retries = settings.http_max_retries
+        
+        throttled = 0
+        failed = 0
+        
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(host, breaker.retry_in)
+            if bucket is not None:
+                await bucket.acquire()
+            
+            try:
+                response = await session.request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                breaker.record_failure()
+                if failed >= retries:
+                    raise
+                delay = retry_delay(failed)
+                failed += 1
+                logger.warning(f"{method} {host} failed ({e!r}), retry {failed}/{retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            
+            if response.status == 429 and bucket is not None and throttled < settings.http_rate_limit_retries:
+                delay = parse_retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = backoff_delay(throttled)
+                response.release()
+                breaker.record_success()
+                bucket.penalize(delay)
+                throttled += 1
+                logger.warning(f"Throttled by {host}, backing off {delay:.1f}s")
+                continue
+            
+            if response.status >= 500:
+                breaker.record_failure()
+                if failed < retries:
+                    response.release()
+                    delay = retry_delay(failed)
+                    failed += 1
+                    logger.warning(
+                        f"{method} {host} returned {response.status}, "
+                        f"retry {failed}/{retries} in {delay:.2f}s"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+            else:
+                breaker.record_success()
+            break
+        
+        try:
+            yield response
+        finally:
+            response.release()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get connection pool metrics.
+        
+        Returns:
+            Dict with pool configuration and per-host counters
+        """
+        return {
+            "open": self.is_open,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "hosts": self.stats.snapshot(),
+            "rate_limits": self.limiters.snapshot(),
+            "circuit_breakers": self.breakers.snapshot()
+        }
+
+
+# Global HTTP client instance
+http_client = HTTPClient()
@@ -1,24 +1,43 @@
 """OSRS GP payment and trade automation utilities."""
 import asyncio
+import time
 import aiohttp
-from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple, List, Callable, Awaitable
 from datetime import datetime
 from config import settings
+from bot.models import OSRSTrade, TradeStage
+from bot.utils.http_client import HTTPClient, http_client
+from bot.utils.hiscores import HiscoresClient, PlayerStats
+from bot.utils.plugin_events import PluginEventStream
+from bot.utils.screenshots import ScreenshotStore
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Plugin trade statuses in the order a trade passes through them
+TRADE_PROGRESS = ("requested", "open", "offered", "accepted", "confirming", "completed")
+
 
 class OSRSGPPaymentProcessor:
     """OSRS Gold Pieces payment processing."""
     
-    def __init__(self, gp_rate: float):
+    def __init__(
+        self,
+        gp_rate: float,
+        http: Optional[HTTPClient] = None,
+        hiscores: Optional[HiscoresClient] = None
+    ):
         """Initialize OSRS GP payment processor.
         
         Args:
             gp_rate: USD per million GP
+            http: Shared HTTP client (defaults to the process-wide client)
+            hiscores: Cached hiscores client shared by RSN lookups
         """
         self.gp_rate = gp_rate
+        self.http = http or http_client
+        self.hiscores = hiscores or HiscoresClient(self.http)
     
     def calculate_gp_amount(self, usd_amount: float) -> float:
         """Calculate GP amount from USD.
@@ -52,17 +71,8 @@ class OSRSGPPaymentProcessor:
             True if valid, False otherwise
         """
         try:
-            # Using OSRS Hiscores API to validate RSN
-            async with aiohttp.ClientSession() as session:
-                url = f"https://secure.runescape.com/m=hiscore_oldschool/index_lite.ws?player={rsn}"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        # If we get data back, the RSN exists
-                        data = await response.text()
-                        return len(data) > 0
-                    else:
-                        return False
+            # If the hiscores know the player, the RSN exists
+            return await self.hiscores.lookup(rsn) is not None
         except Exception as e:
             logger.error(f"Error validating RSN {rsn}: {e}")
             return False
@@ -74,45 +84,49 @@ class OSRSGPPaymentProcessor:
             rsn: RuneScape Name
             
         Returns:
-            Player stats dict or None
+            Player stats dict (overall rank/level/xp plus every skill and
+            activity) or None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"https://secure.runescape.com/m=hiscore_oldschool/index_lite.ws?player={rsn}"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.text()
-                        lines = data.strip().split('\n')
-                        
-                        # Parse overall stats (first line)
-                        if lines:
-                            overall = lines[0].split(',')
-                            return {
-                                "rsn": rsn,
-                                "rank": int(overall[0]) if overall[0] != '-1' else None,
-                                "level": int(overall[1]) if len(overall) > 1 else None,
-                                "xp": int(overall[2]) if len(overall) > 2 else None
-                            }
-                    return None
+            stats = await self.hiscores.get_stats(rsn)
+            return stats.to_dict() if stats else None
         except Exception as e:
             logger.error(f"Error getting player stats for {rsn}: {e}")
             return None
+    
+    async def get_many_player_stats(
+        self,
+        rsns: List[str],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[PlayerStats]]:
+        """Get stats for many players with bounded parallelism.
+        
+        Args:
+            rsns: RuneScape Names
+            concurrency: Maximum lookups in flight
+            
+        Returns:
+            Dict of RSN to compact stats record or None
+        """
+        return await self.hiscores.get_many_stats(rsns, concurrency)
 
 
 class RuneLitePluginClient:
     """Client for communicating with RuneLite plugin."""
     
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, http: Optional[HTTPClient] = None):
         """Initialize RuneLite plugin client.
         
         Args:
             host: Plugin host
             port: Plugin port
+            http: Shared HTTP client (defaults to the process-wide client)
         """
         self.host = host
         self.port = port
         self.base_url = f"http://{host}:{port}"
+        self.http = http or http_client
+        self.events = PluginEventStream(self.base_url, self.http)
     
     async def is_connected(self) -> bool:
         """Check if RuneLite plugin is connected.
@@ -120,13 +134,15 @@ class RuneLitePluginClient:
         Returns:
             True if connected, False otherwise
         """
+        if self.events.connected:
+            return True
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/status"
-                timeout = aiohttp.ClientTimeout(total=5)
-                
-                async with session.get(url, timeout=timeout) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/status"
+            timeout = aiohttp.ClientTimeout(total=5)
+            
+            async with self.http.request("GET", url, timeout=timeout) as response:
+                return response.status == 200
         except Exception as e:
             logger.debug(f"RuneLite plugin not connected: {e}")
             return False
@@ -137,15 +153,17 @@ class RuneLitePluginClient:
         Returns:
             World number or None
         """
+        if self.events.connected and self.events.state.get("world") is not None:
+            return self.events.state["world"]
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/world"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get("world")
-                    return None
+            url = f"{self.base_url}/world"
+            
+            async with self.http.request("GET", url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("world")
+                return None
         except Exception as e:
             logger.error(f"Error getting current world: {e}")
             return None
@@ -160,12 +178,11 @@ class RuneLitePluginClient:
             True if successful, False otherwise
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/world/hop"
-                payload = {"world": world}
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/world/hop"
+            payload = {"world": world}
+            
+            async with self.http.request("POST", url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error hopping to world {world}: {e}")
             return False
@@ -180,12 +197,11 @@ class RuneLitePluginClient:
             True if successful, False otherwise
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/trade/request"
-                payload = {"rsn": rsn}
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/trade/request"
+            payload = {"rsn": rsn}
+            
+            async with self.http.request("POST", url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error sending trade request to {rsn}: {e}")
             return False
@@ -200,28 +216,26 @@ class RuneLitePluginClient:
             True if successful, False otherwise
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/trade/offer"
-                payload = {"amount": amount}
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/trade/offer"
+            payload = {"amount": amount}
+            
+            async with self.http.request("POST", url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error offering {amount} GP: {e}")
             return False
     
     async def accept_trade(self) -> bool:
-        """Accept current trade.
+        """Accept current trade screen (offer or confirmation).
         
         Returns:
             True if successful, False otherwise
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/trade/accept"
-                
-                async with session.post(url) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/trade/accept"
+            
+            async with self.http.request("POST", url) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error accepting trade: {e}")
             return False
@@ -232,32 +246,38 @@ class RuneLitePluginClient:
         Returns:
             Trade status dict or None
         """
+        if self.events.connected and "trade" in self.events.state:
+            return dict(self.events.state["trade"])
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/trade/status"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    return None
+            url = f"{self.base_url}/trade/status"
+            
+            async with self.http.request("GET", url) as response:
+                if response.status == 200:
+                    return await response.json()
+                return None
         except Exception as e:
             logger.error(f"Error getting trade status: {e}")
             return None
     
-    async def take_screenshot(self) -> Optional[bytes]:
-        """Take screenshot of game client.
+    async def take_screenshot(self, store: ScreenshotStore) -> Optional[str]:
+        """Take screenshot of game client and stream it into a store.
         
+        Args:
+            store: Screenshot store
+            
         Returns:
-            Screenshot bytes or None
+            Stored screenshot path or None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/screenshot"
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        return await response.read()
-                    return None
+            url = f"{self.base_url}/screenshot"
+            
+            async with self.http.request("GET", url) as response:
+                if response.status == 200:
+                    return await store.save_stream(
+                        response.content.iter_chunked(settings.screenshot_chunk_size)
+                    )
+                return None
         except Exception as e:
             logger.error(f"Error taking screenshot: {e}")
             return None
@@ -273,36 +293,108 @@ class RuneLitePluginClient:
             True if successful, False otherwise
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.base_url}/chat/send"
-                payload = {"message": message, "public": public}
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            url = f"{self.base_url}/chat/send"
+            payload = {"message": message, "public": public}
+            
+            async with self.http.request("POST", url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             return False
 
 
+class TradeStageError(Exception):
+    """Raised when a trade cannot get past a stage."""
+    
+    def __init__(self, stage: TradeStage, message: str):
+        """Initialize trade stage error.
+        
+        Args:
+            stage: Stage that was not reached
+            message: Reason shown to the user
+        """
+        super().__init__(message)
+        self.stage = stage
+
+
+@dataclass
+class TradeResult:
+    """Outcome and stage timings of one automated trade."""
+    success: bool = False
+    message: str = ""
+    stage: TradeStage = TradeStage.HOP
+    failed_stage: Optional[TradeStage] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    screenshot_path: Optional[str] = None
+    
+    def stage_reached(self, stage: TradeStage) -> bool:
+        """Check whether the trade got past a stage.
+        
+        Args:
+            stage: Stage to check
+            
+        Returns:
+            True if the stage was reached
+        """
+        return stage.value in self.timings and self.failed_stage is not stage
+    
+    def apply(self, trade: OSRSTrade):
+        """Record the outcome on a trade row (caller commits).
+        
+        Args:
+            trade: Trade to update
+        """
+        trade.status = "completed" if self.success else "failed"
+        trade.stage = self.stage.value
+        trade.stage_timings = dict(self.timings)
+        trade.trade_started_at = self.started_at
+        if self.success:
+            trade.trade_completed_at = self.finished_at
+        if self.screenshot_path:
+            trade.screenshot_path = self.screenshot_path
+        trade.notes = (
+            self.message if self.failed_stage is None
+            else f"Failed at {self.failed_stage.value}: {self.message}"
+        )
+
+
 class OSRSTradeAutomation:
-    """Automated OSRS trading system."""
+    """Automated OSRS trading system.
+    
+    A trade moves through ``TradeStage`` in order: hop, requested, window
+    open, offered, accepted, confirming (the second trade screen, accepted
+    again by the bot), completed. Each stage advances as soon as the
+    plugin reports the new state, either pushed over its event stream or,
+    while the stream is down, by polling with a short backoff. Every stage
+    has its own timeout, and the time spent reaching each one is recorded.
+    """
     
-    def __init__(self, plugin_client: RuneLitePluginClient, gp_processor: OSRSGPPaymentProcessor):
+    def __init__(
+        self,
+        plugin_client: RuneLitePluginClient,
+        gp_processor: OSRSGPPaymentProcessor,
+        screenshots: Optional[ScreenshotStore] = None
+    ):
         """Initialize trade automation.
         
         Args:
             plugin_client: RuneLite plugin client
             gp_processor: GP payment processor
+            screenshots: Store for completed-trade screenshots
         """
         self.plugin = plugin_client
         self.gp_processor = gp_processor
+        self.screenshots = screenshots or ScreenshotStore()
     
     async def execute_trade(
         self,
         rsn: str,
         gp_amount: int,
         world: int,
-        location: str
+        location: str,
+        trade: Optional[OSRSTrade] = None
     ) -> Tuple[bool, str]:
         """Execute automated trade.
         
@@ -311,56 +403,205 @@ class OSRSTradeAutomation:
             gp_amount: Amount of GP to trade
             world: World to trade on
             location: Location description
+            trade: Trade row to record the outcome and stage timings on
             
         Returns:
             Tuple of (success, message)
         """
+        result = await self.run_trade(rsn, gp_amount, world, location)
+        if trade is not None:
+            result.apply(trade)
+        return result.success, result.message
+    
+    async def run_trade(
+        self,
+        rsn: str,
+        gp_amount: int,
+        world: int,
+        location: str
+    ) -> TradeResult:
+        """Drive one trade through every stage.
+        
+        Args:
+            rsn: RuneScape Name to trade with
+            gp_amount: Amount of GP to trade
+            world: World to trade on
+            location: Location description
+            
+        Returns:
+            Trade result with per-stage timings
+        """
+        result = TradeResult()
+        clock = time.monotonic()
+        
+        def reached(stage: TradeStage):
+            nonlocal clock
+            now = time.monotonic()
+            result.timings[stage.value] = round(now - clock, 3)
+            result.stage = stage
+            clock = now
+        
         try:
             # Check if plugin is connected
             if not await self.plugin.is_connected():
-                return False, "RuneLite plugin is not connected"
-            
-            # Hop to the specified world
-            logger.info(f"Hopping to world {world}")
-            if not await self.plugin.hop_world(world):
-                return False, f"Failed to hop to world {world}"
+                raise TradeStageError(TradeStage.HOP, "RuneLite plugin is not connected")
             
-            # Wait for world hop
-            await asyncio.sleep(5)
+            # Subscribe before acting so no pushed state change is missed
+            with self.plugin.events.subscribe() as events:
+                if await self.plugin.get_current_world() != world:
+                    logger.info(f"Hopping to world {world}")
+                    if not await self.plugin.hop_world(world):
+                        raise TradeStageError(TradeStage.HOP, f"Failed to hop to world {world}")
+                    await self._advance(
+                        events, TradeStage.HOP, lambda: self._on_world(world),
+                        settings.trade_hop_timeout_seconds, f"Timed out hopping to world {world}"
+                    )
+                reached(TradeStage.HOP)
+                
+                # Reset the last trade's pushed state so it can't satisfy this one
+                self.plugin.events.state["trade"] = {"status": "no_trade"}
+                logger.info(f"Sending trade request to {rsn} at {location}")
+                if not await self.plugin.send_trade_request(rsn):
+                    raise TradeStageError(TradeStage.REQUESTED, f"Failed to send trade request to {rsn}")
+                reached(TradeStage.REQUESTED)
+                
+                await self._advance(
+                    events, TradeStage.WINDOW_OPEN, lambda: self._trade_reached("open"),
+                    settings.trade_window_timeout_seconds, f"{rsn} did not open the trade window"
+                )
+                reached(TradeStage.WINDOW_OPEN)
+                
+                logger.info(f"Offering {gp_amount} GP")
+                if not await self.plugin.offer_gp(gp_amount):
+                    raise TradeStageError(TradeStage.OFFERED, "Failed to offer GP in trade")
+                await self._advance(
+                    events, TradeStage.OFFERED, lambda: self._trade_reached("offered"),
+                    settings.trade_offer_timeout_seconds, "GP offer was not registered"
+                )
+                reached(TradeStage.OFFERED)
+                
+                if not await self.plugin.accept_trade():
+                    raise TradeStageError(TradeStage.ACCEPTED, "Failed to accept trade")
+                await self._advance(
+                    events, TradeStage.ACCEPTED, lambda: self._trade_reached("accepted"),
+                    settings.trade_offer_timeout_seconds, "Trade acceptance was not registered"
+                )
+                reached(TradeStage.ACCEPTED)
+                
+                # Wait for user to accept the first screen
+                logger.info("Waiting for trade acceptance...")
+                await self._advance(
+                    events, TradeStage.CONFIRMING, lambda: self._trade_reached("confirming"),
+                    settings.trade_accept_timeout_seconds, "Trade timed out waiting for acceptance"
+                )
+                reached(TradeStage.CONFIRMING)
+                
+                if not await self.plugin.accept_trade():
+                    raise TradeStageError(TradeStage.CONFIRMING, "Failed to accept trade confirmation")
+                
+                # Wait for user to accept the confirmation screen
+                logger.info("Waiting for trade confirmation...")
+                await self._advance(
+                    events, TradeStage.COMPLETED, lambda: self._trade_reached("completed"),
+                    settings.trade_accept_timeout_seconds, "Trade timed out waiting for confirmation"
+                )
+                reached(TradeStage.COMPLETED)
             
-            # Send trade request
-            logger.info(f"Sending trade request to {rsn}")
-            if not await self.plugin.send_trade_request(rsn):
-                return False, f"Failed to send trade request to {rsn}"
+            # Take screenshot of completed trade
+            result.screenshot_path = await self.plugin.take_screenshot(self.screenshots)
+            if result.screenshot_path:
+                logger.info(f"Trade completed and screenshot saved to {result.screenshot_path}")
             
-            # Wait for trade window to open
-            await asyncio.sleep(3)
+            result.success = True
+            result.message = "Trade completed successfully"
+        
+        except TradeStageError as e:
+            logger.warning(f"Trade with {rsn} failed at {e.stage.value}: {e}")
+            result.failed_stage = e.stage
+            result.timings[e.stage.value] = round(time.monotonic() - clock, 3)
+            result.stage = TradeStage.FAILED
+            result.message = str(e)
+        except Exception as e:
+            logger.error(f"Error executing trade: {e}")
+            result.failed_stage = result.stage
+            result.stage = TradeStage.FAILED
+            result.message = f"Trade error: {str(e)}"
+        
+        result.finished_at = datetime.utcnow()
+        return result
+    
+    async def _advance(
+        self,
+        events: asyncio.Queue,
+        stage: TradeStage,
+        check: Callable[[], Awaitable[Optional[bool]]],
+        timeout: float,
+        timeout_message: str
+    ):
+        """Wait until the plugin reports that a stage has been reached.
+        
+        While the event stream is connected ``check`` reads pushed state and
+        is re-run on every event; otherwise it polls the plugin, starting at
+        ``trade_poll_min_interval`` and doubling up to ``trade_poll_max_interval``.
+        
+        Args:
+            events: Subscription from ``plugin.events.subscribe()``
+            stage: Stage being waited for
+            check: Returns True once reached, False if the trade was
+                declined, None if not yet
+            timeout: Seconds allowed for this stage
+            timeout_message: Failure message on timeout
             
-            # Offer GP
-            logger.info(f"Offering {gp_amount} GP")
-            if not await self.plugin.offer_gp(gp_amount):
-                return False, "Failed to offer GP in trade"
+        Raises:
+            TradeStageError: If the trade was declined or the stage timed out
+        """
+        deadline = time.monotonic() + timeout
+        interval = settings.trade_poll_min_interval
+        
+        while True:
+            outcome = await check()
+            if outcome:
+                return
+            if outcome is False:
+                raise TradeStageError(stage, "Trade was declined")
             
-            # Wait for user to accept
-            logger.info("Waiting for trade acceptance...")
-            max_wait = 300  # 5 minutes
-            wait_time = 0
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TradeStageError(stage, timeout_message)
             
-            while wait_time < max_wait:
-                status = await self.plugin.get_trade_status()
-                if status and status.get("status") == "completed":
-                    # Take screenshot of completed trade
-                    screenshot = await self.plugin.take_screenshot()
-                    if screenshot:
-                        logger.info("Trade completed and screenshot taken")
-                    
-                    return True, "Trade completed successfully"
-                
-                await asyncio.sleep(5)
-                wait_time += 5
+            if self.plugin.events.connected:
+                await self.plugin.events.wait_for(
+                    events,
+                    ("world", "trade", "hello"),
+                    timeout=min(remaining, self.plugin.events.heartbeat_timeout)
+                )
+            else:
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * 2, settings.trade_poll_max_interval)
+    
+    async def _on_world(self, world: int) -> Optional[bool]:
+        """Check whether the client is on a world.
+        
+        Args:
+            world: Target world
             
-            return False, "Trade timed out waiting for acceptance"
+        Returns:
+            True if on the world, None if not yet
+        """
+        return True if await self.plugin.get_current_world() == world else None
+    
+    async def _trade_reached(self, target: str) -> Optional[bool]:
+        """Check whether the open trade has reached a plugin status.
+        
+        Args:
+            target: Plugin trade status from ``TRADE_PROGRESS``
             
-        except Exception as e:
-            logger.error(f"Error executing trade: {e}")
-            return False, f"Trade error: {str(e)}"
+        Returns:
+            True if reached or passed, False if declined, None if not yet
+        """
+        status = (await self.plugin.get_trade_status() or {}).get("status")
+        if status == "declined":
+            return False
+        if status in TRADE_PROGRESS and TRADE_PROGRESS.index(status) >= TRADE_PROGRESS.index(target):
+            return True
+        return None
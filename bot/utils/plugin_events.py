@@ -0,0 +1,228 @@
+"""Push channel for RuneLite plugin state changes."""
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Iterable, Iterator, Callable, Set
+import aiohttp
+from config import settings
+from bot.utils.http_client import HTTPClient, http_client
+from bot.utils.resilience import retry_delay
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PluginEvent:
+    """One event pushed by the plugin."""
+    type: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    received_at: float = field(default_factory=time.monotonic)
+    
+    @property
+    def status(self) -> Optional[str]:
+        """Trade status carried by ``trade`` events."""
+        return self.data.get("status")
+
+
+@dataclass
+class EventStreamStats:
+    """Counters for the plugin event stream."""
+    connects: int = 0
+    disconnects: int = 0
+    events: int = 0
+    heartbeats: int = 0
+    dropped: int = 0
+    malformed: int = 0
+
+
+class PluginEventStream:
+    """Long-lived ``GET /events`` connection to the RuneLite plugin.
+    
+    The plugin keeps the response open and writes one JSON object per line
+    whenever the world or trade state changes, plus periodic heartbeats.
+    Every event updates ``state`` (the latest world and trade snapshot) and
+    is fanned out to subscriber queues, so callers wait on pushed events
+    instead of polling ``/trade/status``. A silent or dropped connection is
+    re-opened with jittered backoff.
+    """
+    
+    def __init__(
+        self,
+        base_url: str,
+        http: Optional[HTTPClient] = None,
+        heartbeat_timeout: Optional[float] = None,
+        max_queue: int = 100
+    ):
+        """Initialize plugin event stream.
+        
+        Args:
+            base_url: Plugin base URL
+            http: Shared HTTP client (defaults to the process-wide client)
+            heartbeat_timeout: Seconds without any line before reconnecting
+            max_queue: Events buffered per subscriber before dropping
+        """
+        self.url = f"{base_url}/events"
+        self.http = http or http_client
+        self.heartbeat_timeout = (
+            heartbeat_timeout if heartbeat_timeout is not None
+            else settings.runelite_event_heartbeat_timeout
+        )
+        self.max_queue = max_queue
+        self.connected = False
+        self.state: Dict[str, Any] = {}
+        self.stats = EventStreamStats()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the background reader is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the background reader if it is not already running."""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        """Stop the background reader."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.connected = False
+    
+    @contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue]:
+        """Receive every event pushed while the context is open.
+        
+        Subscribe before triggering an action so its events can't be missed.
+        
+        Yields:
+            Queue of ``PluginEvent``
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+    
+    async def wait_for(
+        self,
+        queue: asyncio.Queue,
+        types: Iterable[str],
+        predicate: Optional[Callable[[PluginEvent], bool]] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[PluginEvent]:
+        """Wait for a matching event on a subscription.
+        
+        Args:
+            queue: Queue from ``subscribe``
+            types: Event types to accept
+            predicate: Extra filter on accepted events
+            timeout: Seconds to wait
+            
+        Returns:
+            The first matching event, or None on timeout
+        """
+        types = set(types)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                event = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            if event.type in types and (predicate is None or predicate(event)):
+                return event
+    
+    async def _run(self):
+        """Keep the stream open, reconnecting after failures."""
+        attempt = 0
+        while True:
+            try:
+                await self._consume()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"RuneLite event stream error: {e!r}")
+            
+            if self.connected:
+                self.connected = False
+                self.stats.disconnects += 1
+                logger.warning("RuneLite event stream disconnected")
+            
+            await asyncio.sleep(retry_delay(attempt, cap=settings.runelite_event_reconnect_max_delay))
+            attempt += 1
+    
+    async def _consume(self):
+        """Read events from one connection until it ends."""
+        # No total timeout: the response stays open; silence means a dead link
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=self.heartbeat_timeout)
+        async with self.http.request("GET", self.url, retries=0, timeout=timeout) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Event stream returned {response.status}")
+            
+            self.connected = True
+            self.stats.connects += 1
+            logger.info("RuneLite event stream connected")
+            
+            async for line in response.content:
+                line = line.strip()
+                if line:
+                    self._dispatch(line)
+    
+    def _dispatch(self, line: bytes):
+        """Parse one event line and fan it out.
+        
+        Args:
+            line: One JSON-encoded event
+        """
+        try:
+            data = json.loads(line)
+            event = PluginEvent(type=data.pop("type"), data=data)
+        except (ValueError, KeyError, AttributeError):
+            self.stats.malformed += 1
+            logger.warning(f"Malformed RuneLite event: {line[:200]!r}")
+            return
+        
+        if event.type == "heartbeat":
+            self.stats.heartbeats += 1
+            return
+        
+        self.stats.events += 1
+        if event.type == "hello":
+            self.state.update(event.data)
+        elif event.type == "world":
+            self.state["world"] = event.data.get("world")
+        elif event.type == "trade":
+            self.state["trade"] = event.data
+        
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.stats.dropped += 1
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get stream counters.
+        
+        Returns:
+            Dict of connection state and counters
+        """
+        return {
+            "connected": self.connected,
+            "subscribers": len(self._subscribers),
+            "connects": self.stats.connects,
+            "disconnects": self.stats.disconnects,
+            "events": self.stats.events,
+            "heartbeats": self.stats.heartbeats,
+            "dropped": self.stats.dropped,
+            "malformed": self.stats.malformed
+        }
@@ -0,0 +1,210 @@
+"""Client-side rate limiting for upstream APIs."""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BucketStats:
+    """Counters for one token bucket."""
+    acquired: int = 0
+    waited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    throttled: int = 0
+    
+    @property
+    def avg_wait(self) -> float:
+        """Mean seconds callers waited for a token."""
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+
+class TokenBucket:
+    """Async token bucket that queues callers instead of failing them.
+    
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Callers wait their turn in FIFO order. When the upstream answers 429 the
+    bucket is paused (honouring ``Retry-After``) so queued callers back off
+    together instead of hammering the API.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize token bucket.
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (defaults to one second's worth, at least 1)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.stats = BucketStats()
+        self.queue_depth = 0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self, now: float):
+        """Add tokens earned since the last update.
+        
+        Args:
+            now: Current monotonic time
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self):
+        """Wait for and take one token."""
+        started = time.monotonic()
+        self.queue_depth += 1
+        try:
+            # The lock is FIFO, so callers are served in arrival order
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.queue_depth -= 1
+        
+        waited = time.monotonic() - started
+        self.stats.acquired += 1
+        self.stats.total_wait += waited
+        self.stats.max_wait = max(self.stats.max_wait, waited)
+        if waited > 0.001:
+            self.stats.waited += 1
+    
+    def penalize(self, delay: float):
+        """Pause the bucket after the upstream throttled us.
+        
+        Args:
+            delay: Seconds to hold all callers
+        """
+        self.stats.throttled += 1
+        self.tokens = 0
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-serialisable copy of the counters.
+        
+        Returns:
+            Dict of bucket state and counters
+        """
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "queue_depth": self.queue_depth,
+            "acquired": self.stats.acquired,
+            "waited": self.stats.waited,
+            "avg_wait_ms": round(self.stats.avg_wait * 1000, 1),
+            "max_wait_ms": round(self.stats.max_wait * 1000, 1),
+            "throttled": self.stats.throttled,
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1)
+        }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header.
+    
+    Args:
+        value: Header value (delay in seconds or an HTTP date)
+        
+    Returns:
+        Delay in seconds, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff delay for a throttled retry.
+    
+    Args:
+        attempt: Zero-based retry number
+        base: Delay for the first retry in seconds
+        cap: Maximum delay in seconds
+        
+    Returns:
+        Delay in seconds
+    """
+    return min(cap, base * (2 ** attempt))
+
+
+def parse_rate_limits(spec: str) -> Dict[str, TokenBucket]:
+    """Build buckets from a ``host=requests/period`` list.
+    
+    Entries without a rate use ``rate_limit_requests`` / ``rate_limit_period``.
+    
+    Args:
+        spec: Comma-separated list, e.g. ``"api.blockcypher.com=3/1,api.coinbase.com"``
+        
+    Returns:
+        Dict of host to bucket
+    """
+    buckets = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        host, _, limit = entry.partition("=")
+        if limit:
+            requests, _, period = limit.partition("/")
+            requests, period = float(requests), float(period or 1)
+        else:
+            requests, period = float(settings.rate_limit_requests), float(settings.rate_limit_period)
+        if requests <= 0 or period <= 0:
+            raise ValueError(f"Invalid rate limit: {entry!r}")
+        buckets[host.strip().lower()] = TokenBucket(rate=requests / period, capacity=max(1.0, requests))
+    return buckets
+
+
+class RateLimiterRegistry:
+    """Token buckets keyed by upstream host (``host:port`` when it has one)."""
+    
+    def __init__(self, spec: Optional[str] = None):
+        """Initialize rate limiter registry.
+        
+        Args:
+            spec: Per-host limits (defaults to HTTP_RATE_LIMITS setting)
+        """
+        self.buckets = parse_rate_limits(spec if spec is not None else settings.http_rate_limits)
+    
+    def get(self, host: str) -> Optional[TokenBucket]:
+        """Get the bucket for a host.
+        
+        Args:
+            host: Upstream host, with its port if the URL has one
+            
+        Returns:
+            Bucket, or None if the host is not rate limited
+        """
+        return self.buckets.get(host.lower())
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get counters for every bucket.
+        
+        Returns:
+            Dict keyed by host
+        """
+        return {host: bucket.snapshot() for host, bucket in self.buckets.items()}
@@ -0,0 +1,174 @@
+"""Retry and circuit-breaker helpers for upstream APIs."""
+import random
+import time
+from typing import Optional, Dict, Any
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Methods that are safe to repeat after a transient failure
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the upstream's breaker is open."""
+    
+    def __init__(self, host: str, retry_in: float):
+        """Initialize circuit open error.
+        
+        Args:
+            host: Upstream host
+            retry_in: Seconds until the breaker lets a trial request through
+        """
+        super().__init__(f"Circuit open for {host}; retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-upstream circuit breaker.
+    
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    requests fail fast for ``reset_timeout`` seconds. It then lets a single
+    trial request through (half-open); success closes it again, failure
+    re-opens it.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """Initialize circuit breaker.
+        
+        Args:
+            failure_threshold: Consecutive failures before opening
+            reset_timeout: Seconds to stay open before a trial request
+        """
+        self.failure_threshold = (
+            failure_threshold if failure_threshold is not None
+            else settings.circuit_breaker_failure_threshold
+        )
+        self.reset_timeout = (
+            reset_timeout if reset_timeout is not None else settings.circuit_breaker_reset_timeout
+        )
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+    
+    @property
+    def retry_in(self) -> float:
+        """Seconds until an open breaker allows a trial request."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def allow(self) -> bool:
+        """Check whether a request may be sent.
+        
+        Returns:
+            True if the request may proceed
+        """
+        if self.state == self.OPEN and self.retry_in == 0:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN:
+            # A trial that never reported back (e.g. cancelled) must not wedge the breaker
+            trial_stale = time.monotonic() - self._trial_started > self.reset_timeout
+            if not self._trial_in_flight or trial_stale:
+                self._trial_in_flight = True
+                self._trial_started = time.monotonic()
+                return True
+        
+        self.rejected += 1
+        return False
+    
+    def record_success(self):
+        """Record a successful request."""
+        self.failures = 0
+        self.state = self.CLOSED
+        self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Record a failed request."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-serialisable view of the breaker.
+        
+        Returns:
+            Dict of state and counters
+        """
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in": round(self.retry_in, 1)
+        }
+
+
+class BreakerRegistry:
+    """Circuit breakers keyed by upstream host (``host:port`` when it has one)."""
+    
+    def __init__(self):
+        """Initialize breaker registry."""
+        self.breakers: Dict[str, CircuitBreaker] = {}
+    
+    def get(self, host: str) -> CircuitBreaker:
+        """Get (or create) the breaker for a host.
+        
+        Args:
+            host: Upstream host, with its port if the URL has one
+            
+        Returns:
+            Circuit breaker
+        """
+        host = host.lower()
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker()
+        return breaker
+    
+    @property
+    def any_open(self) -> bool:
+        """Whether any upstream is currently failing fast."""
+        return any(b.state != CircuitBreaker.CLOSED for b in self.breakers.values())
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get every breaker's state.
+        
+        Returns:
+            Dict keyed by host
+        """
+        return {host: breaker.snapshot() for host, breaker in self.breakers.items()}
+
+
+def retry_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter.
+    
+    Args:
+        attempt: Zero-based retry number
+        base: Delay ceiling for the first retry in seconds
+        cap: Maximum delay ceiling in seconds
+        
+    Returns:
+        Delay in seconds, uniformly drawn from [0, min(cap, base * 2**attempt)]
+    """
+    base = base if base is not None else settings.http_retry_base_delay
+    cap = cap if cap is not None else settings.http_retry_max_delay
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
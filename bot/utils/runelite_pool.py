@@ -0,0 +1,371 @@
+"""Pool of RuneLite clients and world-aware trade scheduling."""
+import asyncio
+import time
+from typing import Optional, Dict, Any, List, Tuple, Callable, Awaitable, Set
+from config import settings
+from bot.models import OSRSTrade, TradeStage
+from bot.utils.http_client import HTTPClient
+from bot.utils.osrs_payments import (
+    OSRSGPPaymentProcessor,
+    RuneLitePluginClient,
+    OSRSTradeAutomation,
+    TradeResult
+)
+from bot.utils.trade_queue import TradeQueue, TradeWorker
+from bot.utils.trade_batches import TradeBatch, plan_batches, count_hops
+from bot.utils.screenshots import ScreenshotStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_clients(spec: str) -> List[Tuple[str, int]]:
+    """Parse a ``host:port`` list of RuneLite plugin endpoints.
+    
+    An empty list means the single ``runelite_plugin_host``/``runelite_plugin_port``.
+    
+    Args:
+        spec: Comma-separated list, e.g. ``"10.0.0.5:9001,10.0.0.6:9001"``
+        
+    Returns:
+        List of (host, port)
+    """
+    clients = []
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        host, _, port = entry.rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Invalid RuneLite client: {entry!r}")
+        clients.append((host, int(port)))
+    return clients or [(settings.runelite_plugin_host, settings.runelite_plugin_port)]
+
+
+class PooledClient:
+    """One RuneLite client in the pool, with its worker and health."""
+    
+    def __init__(self, plugin: RuneLitePluginClient, worker: TradeWorker):
+        """Initialize pooled client.
+        
+        Args:
+            plugin: Plugin client
+            worker: Single-consumer worker bound to this client
+        """
+        self.plugin = plugin
+        self.worker = worker
+        self.healthy = False
+        self.failures = 0
+        self.last_checked: Optional[float] = None
+        self.last_world: Optional[int] = None
+        self.trades_run = 0
+        self.hops_avoided = 0
+        self.batch: Optional[TradeBatch] = None
+    
+    @property
+    def name(self) -> str:
+        """Worker id of this client."""
+        return self.worker.worker_id
+    
+    @property
+    def busy(self) -> bool:
+        """Whether the client is running a trade or batch."""
+        return self.batch is not None or self.worker.current is not None
+    
+    @property
+    def world(self) -> Optional[int]:
+        """Current world, from pushed state when available."""
+        if self.plugin.events.connected and self.plugin.events.state.get("world") is not None:
+            return self.plugin.events.state["world"]
+        return self.last_world
+    
+    def record_failure(self):
+        """Count a failed health check or connection failure."""
+        self.failures += 1
+        if self.healthy and self.failures >= settings.runelite_max_failures:
+            self.healthy = False
+            logger.warning(f"RuneLite client {self.name} marked unhealthy")
+    
+    async def check(self) -> bool:
+        """Probe the client and update its health.
+        
+        Returns:
+            True if the client is healthy
+        """
+        self.last_checked = time.monotonic()
+        if not await self.plugin.is_connected():
+            self.record_failure()
+            return self.healthy
+        
+        if not self.healthy:
+            logger.info(f"RuneLite client {self.name} is healthy")
+        self.healthy = True
+        self.failures = 0
+        self.last_world = await self.plugin.get_current_world() or self.last_world
+        return True
+    
+    async def run(self, trade: OSRSTrade) -> TradeResult:
+        """Run a claimed trade on this client.
+        
+        Args:
+            trade: Claimed trade
+            
+        Returns:
+            Trade result
+        """
+        if self.world == trade.world:
+            self.hops_avoided += 1
+        result = await self.worker.process(trade)
+        self.trades_run += 1
+        
+        if result.success or result.stage_reached(TradeStage.HOP):
+            self.last_world = trade.world
+        elif result.failed_stage == TradeStage.HOP:
+            self.record_failure()
+        return result
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Get a JSON-serialisable view of the client.
+        
+        Returns:
+            Dict of health, load and world
+        """
+        return {
+            "healthy": self.healthy,
+            "busy": self.busy,
+            "trade_id": self.worker.current,
+            "batch_size": len(self.batch) if self.batch is not None else 0,
+            "world": self.world,
+            "failures": self.failures,
+            "trades_run": self.trades_run,
+            "hops_avoided": self.hops_avoided,
+            "event_stream": self.plugin.events.connected
+        }
+
+
+class RuneLitePool:
+    """RuneLite clients that share one trade queue.
+    
+    A single dispatcher groups the head of the queue into per-world batches
+    and hands each batch to an idle, healthy client, preferring one already
+    on the batch's world (no hop) and otherwise the one that has run the
+    fewest trades. A client runs its batch back-to-back, one trade at a
+    time, so throughput grows with the number of clients and each world is
+    hopped to once per batch instead of once per trade.
+    """
+    
+    def __init__(
+        self,
+        queue: TradeQueue,
+        clients: List[PooledClient],
+        screenshots: Optional[ScreenshotStore] = None
+    ):
+        """Initialize RuneLite pool.
+        
+        Args:
+            queue: Shared trade queue
+            clients: Pooled clients
+            screenshots: Screenshot store shared by the clients
+        """
+        self.queue = queue
+        self.clients = clients
+        self.screenshots = screenshots
+        self.batches_run = 0
+        self.hops_saved = 0
+        self.last_batch_hops_saved = 0
+        self._planned: Set[int] = set()
+        self._running: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def from_settings(
+        cls,
+        queue: TradeQueue,
+        gp_processor: OSRSGPPaymentProcessor,
+        http: Optional[HTTPClient] = None,
+        on_complete: Optional[Callable[[OSRSTrade, TradeResult], Awaitable[None]]] = None
+    ) -> "RuneLitePool":
+        """Build a pool from RUNELITE_PLUGIN_CLIENTS.
+        
+        Args:
+            queue: Shared trade queue
+            gp_processor: GP payment processor
+            http: Shared HTTP client
+            on_complete: Called after a trade completes successfully
+            
+        Returns:
+            RuneLite pool
+        """
+        screenshots = ScreenshotStore()
+        clients = []
+        for host, port in parse_clients(settings.runelite_plugin_clients):
+            plugin = RuneLitePluginClient(host, port, http)
+            worker = TradeWorker(
+                queue,
+                OSRSTradeAutomation(plugin, gp_processor, screenshots),
+                worker_id=f"runelite@{host}:{port}",
+                on_complete=on_complete
+            )
+            clients.append(PooledClient(plugin, worker))
+        return cls(queue, clients, screenshots)
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the dispatcher is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Open every client's event stream and start dispatching."""
+        for client in self.clients:
+            client.plugin.events.start()
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        """Stop dispatching, in-flight trades, event streams and screenshot I/O."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        for client in self.clients:
+            client.plugin.events.stop()
+        if self.screenshots is not None:
+            self.screenshots.close()
+    
+    async def check_health(self):
+        """Probe every idle client concurrently."""
+        idle = [c for c in self.clients if not c.busy]
+        results = await asyncio.gather(*(c.check() for c in idle), return_exceptions=True)
+        for client, result in zip(idle, results):
+            if isinstance(result, Exception):
+                logger.error(f"Health check for {client.name} failed: {result}")
+                client.record_failure()
+    
+    def available(self) -> List[PooledClient]:
+        """Get healthy clients that are not running a trade.
+        
+        Returns:
+            Idle healthy clients
+        """
+        return [c for c in self.clients if c.healthy and not c.busy]
+    
+    @staticmethod
+    def pick(candidates: List[PooledClient], world: int) -> PooledClient:
+        """Choose the client for a trade.
+        
+        Args:
+            candidates: Idle healthy clients
+            world: World the trade happens on
+            
+        Returns:
+            A client on the world if any, else the least-used client
+        """
+        return min(candidates, key=lambda c: (c.world != world, c.trades_run, c.name))
+    
+    async def dispatch(self) -> int:
+        """Plan batches from the head of the queue and assign them to idle clients.
+        
+        Returns:
+            Number of batches started
+        """
+        idle = self.available()
+        if not idle:
+            return 0
+        
+        pending = [
+            t for t in await self.queue.peek(settings.trade_batch_lookahead)
+            if t.id not in self._planned
+        ]
+        batches = plan_batches(pending, settings.trade_batch_max_size)
+        if len(batches) < len(pending):
+            logger.debug(
+                f"Batched {len(pending)} trade(s) into {len(batches)}: "
+                f"{count_hops([t.world for t in pending])} hop(s) in queue order, "
+                f"{count_hops([b.world for b in batches])} batched"
+            )
+        
+        started = 0
+        for batch in batches:
+            if not idle:
+                break
+            client = self.pick(idle, batch.world)
+            idle.remove(client)
+            client.batch = batch
+            self._planned.update(batch.trade_ids)
+            
+            self.batches_run += 1
+            self.hops_saved += batch.hops_saved
+            self.last_batch_hops_saved = batch.hops_saved
+            
+            task = asyncio.create_task(self._run_batch(client, batch))
+            self._running.add(task)
+            task.add_done_callback(self._trade_done)
+            started += 1
+        return started
+    
+    async def _run_batch(self, client: PooledClient, batch: TradeBatch):
+        """Run a batch's trades back-to-back on one client.
+        
+        Args:
+            client: Client the batch was assigned to
+            batch: Planned batch
+        """
+        try:
+            for trade in batch.trades:
+                claimed = await self.queue.claim(client.name, trade.id)
+                self._planned.discard(trade.id)
+                if claimed is not None:
+                    await client.run(claimed)
+                if not client.healthy:
+                    # Leave the rest of the batch for another client
+                    break
+        finally:
+            self._planned.difference_update(batch.trade_ids)
+            client.batch = None
+    
+    def _trade_done(self, task: asyncio.Task):
+        """Forget a finished batch and wake the dispatcher.
+        
+        Args:
+            task: The finished batch task
+        """
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Trade batch failed: {task.exception()}")
+        self.queue.notify()
+    
+    async def _run(self):
+        """Recover, health-check and dispatch until stopped."""
+        for client in self.clients:
+            await self.queue.recover(client.name)
+        
+        last_health = None
+        while True:
+            try:
+                now = time.monotonic()
+                if last_health is None or now - last_health >= settings.runelite_health_interval_seconds:
+                    await self.check_health()
+                    last_health = now
+                
+                if await self.dispatch():
+                    continue
+            except Exception as e:
+                logger.error(f"Error dispatching trades: {e}")
+            
+            await self.queue.wait(min(settings.trade_queue_poll_seconds, settings.runelite_health_interval_seconds))
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get pool state.
+        
+        Returns:
+            Dict of client counts and per-client snapshots
+        """
+        return {
+            "clients": len(self.clients),
+            "healthy": sum(c.healthy for c in self.clients),
+            "busy": sum(c.busy for c in self.clients),
+            "hops_avoided": sum(c.hops_avoided for c in self.clients),
+            "batches_run": self.batches_run,
+            "hops_saved": self.hops_saved,
+            "last_batch_hops_saved": self.last_batch_hops_saved,
+            "screenshots": self.screenshots.metrics() if self.screenshots is not None else None,
+            "by_client": {c.name: c.snapshot() for c in self.clients}
+        }
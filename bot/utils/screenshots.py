@@ -0,0 +1,251 @@
+"""Content-addressed on-disk storage for trade screenshots."""
+import asyncio
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, Any, AsyncIterable, Set
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScreenshotStats:
+    """Counters for the screenshot store."""
+    saved: int = 0
+    deduplicated: int = 0
+    bytes_written: int = 0
+    compressed: int = 0
+    failed: int = 0
+
+
+class ScreenshotStore:
+    """Screenshots stored under the SHA-256 of their content.
+    
+    Images are written to a temporary file chunk by chunk while being hashed,
+    then renamed to ``<root>/<aa>/<sha256>.png``; an identical frame already
+    in the store is kept and the new copy discarded. File I/O runs in a small
+    thread pool, so the event loop never holds more than one chunk.
+    
+    With compression enabled, new files are gzipped in the background; the
+    recorded path stays the ``.png`` name and ``resolve`` finds either form.
+    """
+    
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        compress: Optional[bool] = None,
+        workers: Optional[int] = None
+    ):
+        """Initialize screenshot store.
+        
+        Args:
+            root: Storage directory
+            compress: Gzip stored screenshots in the background
+            workers: Threads for file I/O and compression
+        """
+        self.root = Path(root or settings.screenshot_dir)
+        self.compress = compress if compress is not None else settings.screenshot_compress
+        self.workers = workers or settings.screenshot_workers
+        self.stats = ScreenshotStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[asyncio.Future] = set()
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool for file I/O, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="screenshots")
+        return self._executor
+    
+    def path_for(self, digest: str) -> Path:
+        """Get the stored path of a screenshot.
+        
+        Args:
+            digest: Hex SHA-256 of the image
+            
+        Returns:
+            Path of the uncompressed file
+        """
+        return self.root / digest[:2] / f"{digest}.png"
+    
+    @staticmethod
+    def resolve(path: str) -> Optional[Path]:
+        """Find a stored screenshot, compressed or not.
+        
+        Args:
+            path: Path recorded on the trade
+            
+        Returns:
+            Existing file path, or None if it is gone
+        """
+        for candidate in (Path(path), Path(f"{path}.gz")):
+            if candidate.exists():
+                return candidate
+        return None
+    
+    @classmethod
+    def read(cls, path: str) -> Optional[bytes]:
+        """Read a stored screenshot (blocking; call from a thread).
+        
+        Args:
+            path: Path recorded on the trade
+            
+        Returns:
+            Image bytes, or None if it is gone
+        """
+        found = cls.resolve(path)
+        if found is None:
+            return None
+        opener = gzip.open if found.suffix == ".gz" else open
+        with opener(found, "rb") as f:
+            return f.read()
+    
+    async def save_stream(self, chunks: AsyncIterable[bytes]) -> Optional[str]:
+        """Store an image as it arrives.
+        
+        Args:
+            chunks: Image data in chunks
+            
+        Returns:
+            Stored path, or None if the image was empty
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, lambda: self.root.mkdir(parents=True, exist_ok=True))
+        fd, temp = await loop.run_in_executor(
+            self.executor, lambda: tempfile.mkstemp(dir=self.root, suffix=".part")
+        )
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await loop.run_in_executor(self.executor, f.write, chunk)
+            
+            if not size:
+                await loop.run_in_executor(self.executor, os.remove, temp)
+                return None
+            
+            path = self.path_for(digest.hexdigest())
+            stored = await loop.run_in_executor(self.executor, self._commit, temp, path)
+        except BaseException:
+            self.stats.failed += 1
+            await loop.run_in_executor(self.executor, self._discard, temp)
+            raise
+        
+        if not stored:
+            self.stats.deduplicated += 1
+            logger.debug(f"Screenshot {path.name} already stored")
+        else:
+            self.stats.saved += 1
+            self.stats.bytes_written += size
+            if self.compress:
+                future = loop.run_in_executor(self.executor, self._compress, path)
+                self._pending.add(future)
+                future.add_done_callback(self._compressed)
+        return str(path)
+    
+    async def save_bytes(self, data: bytes) -> Optional[str]:
+        """Store an image already in memory.
+        
+        Args:
+            data: Image bytes
+            
+        Returns:
+            Stored path, or None if the image was empty
+        """
+        async def chunks():
+            yield data
+        return await self.save_stream(chunks())
+    
+    @staticmethod
+    def _commit(temp: str, path: Path) -> bool:
+        """Move a written file into place unless the content is already stored.
+        
+        Args:
+            temp: Temporary file
+            path: Content-addressed destination
+            
+        Returns:
+            True if the file was stored, False if it was a duplicate
+        """
+        if ScreenshotStore.resolve(str(path)) is not None:
+            os.remove(temp)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp, path)
+        return True
+    
+    @staticmethod
+    def _discard(temp: str):
+        """Remove a partial file.
+        
+        Args:
+            temp: Temporary file
+        """
+        try:
+            os.remove(temp)
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def _compress(path: Path):
+        """Replace a stored file with its gzipped copy.
+        
+        Args:
+            path: Uncompressed file
+        """
+        target = Path(f"{path}.gz")
+        partial = Path(f"{target}.part")
+        with open(path, "rb") as src, gzip.open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(partial, target)
+        os.remove(path)
+    
+    def _compressed(self, future: asyncio.Future):
+        """Record a finished background compression.
+        
+        Args:
+            future: Compression job
+        """
+        self._pending.discard(future)
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f"Error compressing screenshot: {future.exception()}")
+        else:
+            self.stats.compressed += 1
+    
+    async def drain(self):
+        """Wait for background compression to finish."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+    
+    def close(self):
+        """Shut down the thread pool after queued work completes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get store counters.
+        
+        Returns:
+            Dict of counters and pending compressions
+        """
+        return {
+            "saved": self.stats.saved,
+            "deduplicated": self.stats.deduplicated,
+            "bytes_written": self.stats.bytes_written,
+            "compressed": self.stats.compressed,
+            "compress_pending": len(self._pending),
+            "failed": self.stats.failed
+        }
@@ -0,0 +1,115 @@
+"""Health snapshots shared between the bot and API processes.
+
+Every BlockCypher, Coinbase, hiscores and RuneLite call is made by the bot,
+so its circuit breakers and connection reuse counters only exist in the bot
+process. ``HealthPublisher`` writes the bot's ``HTTPClient.metrics()`` to
+the ``service_health`` table every ``HEALTH_PUBLISH_INTERVAL`` seconds, and
+``read_health`` lets the API report it, the same way trade queue metrics
+are read from the database.
+"""
+import asyncio
+from datetime import datetime
+from typing import Optional, Dict, Any
+from config import settings
+from bot.database import get_db_session
+from bot.models import ServiceHealth
+from bot.utils.http_client import HTTPClient
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def publish_health(service: str, client: HTTPClient):
+    """Store a process's current HTTP metrics.
+    
+    Args:
+        service: Publishing service name
+        client: The process's shared HTTP client
+    """
+    async with get_db_session() as session:
+        await session.merge(ServiceHealth(service=service, http=client.metrics(), updated_at=datetime.utcnow()))
+        await session.commit()
+
+
+async def read_health(service: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Read the last snapshot a service published.
+    
+    Args:
+        service: Service name
+        max_age: Seconds after which the snapshot counts as stale
+            (defaults to three HEALTH_PUBLISH_INTERVALs)
+    
+    Returns:
+        Dict of the HTTP metrics, when they were published, their age and
+        whether they are stale; None if the service never published
+    """
+    max_age = max_age or settings.health_publish_interval * 3
+    async with get_db_session() as session:
+        row = await session.get(ServiceHealth, service)
+    if row is None:
+        return None
+    
+    age = (datetime.utcnow() - row.updated_at).total_seconds()
+    return {
+        "http": row.http,
+        "updated_at": row.updated_at.isoformat(),
+        "age": round(age, 1),
+        "stale": age > max_age
+    }
+
+
+def any_breaker_open(health: Optional[Dict[str, Any]]) -> bool:
+    """Whether a published snapshot shows an upstream failing fast.
+    
+    Args:
+        health: Snapshot from ``read_health``
+    
+    Returns:
+        True if any breaker in the snapshot is not closed
+    """
+    if not health:
+        return False
+    breakers = health["http"].get("circuit_breakers", {})
+    return any(b["state"] != "closed" for b in breakers.values())
+
+
+class HealthPublisher:
+    """Publishes one process's health snapshot on an interval."""
+    
+    def __init__(self, service: str, client: HTTPClient, interval: Optional[float] = None):
+        """Initialize health publisher.
+        
+        Args:
+            service: Service name to publish under
+            client: The process's shared HTTP client
+            interval: Seconds between snapshots (defaults to HEALTH_PUBLISH_INTERVAL)
+        """
+        self.service = service
+        self.client = client
+        self.interval = interval or settings.health_publish_interval
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the publish loop is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the publish loop if it is not already running."""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        """Stop the publish loop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        """Publish every ``interval`` seconds until stopped."""
+        while True:
+            try:
+                await publish_health(self.service, self.client)
+            except Exception as e:
+                logger.error(f"Error publishing {self.service} health: {e}")
+            await asyncio.sleep(self.interval)
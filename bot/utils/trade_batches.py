@@ -0,0 +1,86 @@
+"""Group queued OSRS trades so each world is visited once."""
+from dataclasses import dataclass, field
+from typing import Optional, List, Tuple, Dict
+from bot.models import OSRSTrade
+
+
+@dataclass
+class TradeBatch:
+    """Trades on one world and location, run back-to-back by one client."""
+    world: int
+    location: str
+    trades: List[OSRSTrade] = field(default_factory=list)
+    hops_saved: int = 0
+    
+    @property
+    def trade_ids(self) -> List[int]:
+        """Ids of the batched trades, in run order."""
+        return [t.id for t in self.trades]
+    
+    def __len__(self) -> int:
+        """Number of trades in the batch."""
+        return len(self.trades)
+
+
+def count_hops(worlds: List[int], start: Optional[int] = None) -> int:
+    """Count world changes needed to visit worlds in order.
+    
+    Args:
+        worlds: Worlds in visiting order
+        start: World the client starts on (None counts the first hop)
+        
+    Returns:
+        Number of hops
+    """
+    hops = 0
+    current = start
+    for world in worlds:
+        if world != current:
+            hops += 1
+            current = world
+    return hops
+
+
+def plan_batches(trades: List[OSRSTrade], max_size: int) -> List[TradeBatch]:
+    """Group pending trades by world and location.
+    
+    ``trades`` must be in queue order. Trades keep their queue order inside
+    a batch, and the head of the queue is always in the first batch. Groups
+    larger than ``max_size`` are split so one busy world can't hold a client
+    indefinitely; each chunk runs when its earliest trade would have come up.
+    
+    Each batch's ``hops_saved`` is the number of separate stretches its
+    trades occupied in queue order, minus the single hop the batch needs:
+    the hops avoided compared with running the window first-in-first-out.
+    
+    Args:
+        trades: Pending trades in queue order
+        max_size: Maximum trades per batch
+        
+    Returns:
+        Batches in run order
+    """
+    groups: Dict[Tuple[int, str], List[OSRSTrade]] = {}
+    stretches: Dict[Tuple[int, str], int] = {}
+    previous_world = None
+    
+    for trade in trades:
+        key = (trade.world, trade.location)
+        groups.setdefault(key, []).append(trade)
+        if trade.world != previous_world:
+            stretches[key] = stretches.get(key, 0) + 1
+        previous_world = trade.world
+    
+    batches = []
+    for (world, location), members in groups.items():
+        runs = stretches.get((world, location), 1)
+        for start in range(0, len(members), max_size):
+            chunk = members[start:start + max_size]
+            saved = max(0, min(runs, len(chunk)) - 1)
+            runs -= min(runs, len(chunk))
+            batches.append(TradeBatch(world, location, chunk, saved))
+    
+    # Run each batch when its earliest trade would have come up
+    position = {id(t): i for i, t in enumerate(trades)}
+    batches.sort(key=lambda b: position[id(b.trades[0])])
+    return batches
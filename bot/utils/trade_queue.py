@@ -0,0 +1,383 @@
+"""Persistent OSRS trade queue and the workers that drain it."""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from sqlalchemy import select, update, func, or_, and_
+from config import settings
+from bot.database import get_db_session
+from bot.models import OSRSTrade, Payment, PaymentStatus
+from bot.utils.confirmations import complete_payment
+from bot.utils.osrs_payments import OSRSTradeAutomation, TradeResult
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Claim order: highest priority first, then oldest first
+QUEUE_ORDER = (OSRSTrade.priority.desc(), OSRSTrade.created_at, OSRSTrade.id)
+
+
+@dataclass
+class TradeQueueStats:
+    """In-process counters for the trade queue."""
+    claimed: int = 0
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    recovered: int = 0
+
+
+async def queue_metrics(window: float = 3600) -> Dict[str, Any]:
+    """Get queue depth, wait times and throughput from the database.
+    
+    Works from any process sharing the database (bot or API).
+    
+    Args:
+        window: Seconds of history for wait time and throughput
+        
+    Returns:
+        Dict of depth, in-progress count, wait seconds and trades per hour
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(seconds=window)
+    
+    async with get_db_session() as session:
+        result = await session.execute(
+            select(OSRSTrade.status, func.count(), func.min(OSRSTrade.created_at))
+            .where(OSRSTrade.status.in_(["pending", "in_progress"]))
+            .group_by(OSRSTrade.status)
+        )
+        counts = {status: (count, oldest) for status, count, oldest in result.all()}
+        
+        result = await session.execute(
+            select(OSRSTrade.status, OSRSTrade.created_at, OSRSTrade.trade_started_at)
+            .where(OSRSTrade.trade_started_at >= since)
+        )
+        started = result.all()
+        
+        result = await session.execute(
+            select(func.count()).where(
+                OSRSTrade.status == "completed",
+                OSRSTrade.trade_completed_at >= since
+            )
+        )
+        completed = result.scalar_one()
+    
+    depth, oldest = counts.get("pending", (0, None))
+    waits = [(s - c).total_seconds() for _, c, s in started if c and s]
+    return {
+        "depth": depth,
+        "in_progress": counts.get("in_progress", (0, None))[0],
+        "oldest_wait_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+        "avg_wait_seconds": round(sum(waits) / len(waits), 1) if waits else 0.0,
+        "max_wait_seconds": round(max(waits), 1) if waits else 0.0,
+        "trades_per_hour": round(completed * 3600 / window, 1)
+    }
+
+
+class TradeQueue:
+    """Queue of pending ``OSRSTrade`` rows.
+    
+    The rows themselves are the queue, so it survives restarts. Workers
+    claim the next row with a conditional update (``pending`` →
+    ``in_progress``), so a row is only ever handed to one worker even when
+    several poll at once.
+    """
+    
+    def __init__(self):
+        """Initialize trade queue."""
+        self.stats = TradeQueueStats()
+        self._wakeup = asyncio.Event()
+    
+    def notify(self):
+        """Wake idle workers after a trade was queued."""
+        self._wakeup.set()
+    
+    async def wait(self, timeout: float):
+        """Sleep until a trade is queued or the timeout elapses.
+        
+        Args:
+            timeout: Seconds to wait
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+    
+    async def position(self, trade: OSRSTrade) -> int:
+        """Get how many pending trades will run before this one.
+        
+        Counts trades that come first in ``QUEUE_ORDER``, the order
+        ``claim`` hands them out in.
+        
+        Args:
+            trade: Pending trade (with its ``created_at`` loaded)
+            
+        Returns:
+            Number of trades ahead in the queue
+        """
+        priority = trade.priority or 0
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(func.count()).where(
+                    OSRSTrade.status == "pending",
+                    or_(
+                        OSRSTrade.priority > priority,
+                        and_(
+                            OSRSTrade.priority == priority,
+                            or_(
+                                OSRSTrade.created_at < trade.created_at,
+                                and_(OSRSTrade.created_at == trade.created_at, OSRSTrade.id < trade.id)
+                            )
+                        )
+                    )
+                )
+            )
+            return result.scalar_one()
+    
+    async def peek(self, limit: int) -> List[OSRSTrade]:
+        """List the next pending trades without claiming them.
+        
+        Args:
+            limit: Maximum number of trades
+            
+        Returns:
+            Pending trades in claim order
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(OSRSTrade).where(OSRSTrade.status == "pending").order_by(*QUEUE_ORDER).limit(limit)
+            )
+            return list(result.scalars().all())
+    
+    async def claim(self, worker_id: str, trade_id: Optional[int] = None) -> Optional[OSRSTrade]:
+        """Take the next pending trade, or a specific one.
+        
+        Trades whose payment is no longer pending (e.g. expired while
+        queued) are failed instead of returned.
+        
+        Args:
+            worker_id: Claiming worker
+            trade_id: Trade to claim instead of the head of the queue
+            
+        Returns:
+            The claimed trade, or None if the queue is empty or the requested
+            trade was taken or dropped
+        """
+        async with get_db_session() as session:
+            while True:
+                target = trade_id
+                if target is None:
+                    result = await session.execute(
+                        select(OSRSTrade.id).where(OSRSTrade.status == "pending").order_by(*QUEUE_ORDER).limit(1)
+                    )
+                    target = result.scalar_one_or_none()
+                    if target is None:
+                        return None
+                
+                result = await session.execute(
+                    update(OSRSTrade)
+                    .where(OSRSTrade.id == target, OSRSTrade.status == "pending")
+                    .values(status="in_progress", claimed_by=worker_id, trade_started_at=datetime.utcnow())
+                )
+                await session.commit()
+                if result.rowcount != 1:
+                    if trade_id is not None:
+                        return None
+                    # Another worker got there first
+                    continue
+                
+                trade = await session.get(OSRSTrade, target)
+                payment = await session.get(Payment, trade.payment_id)
+                if payment is None or payment.status != PaymentStatus.PENDING:
+                    trade.status = "failed"
+                    trade.notes = "Payment is no longer pending"
+                    await session.commit()
+                    self.stats.skipped += 1
+                    logger.info(f"Skipped trade {trade.id}: payment {trade.payment_id} is not pending")
+                    if trade_id is not None:
+                        return None
+                    continue
+                
+                self.stats.claimed += 1
+                session.expunge(trade)
+                return trade
+    
+    async def finish(self, trade_id: int, result: TradeResult):
+        """Record a trade's outcome and complete its payment on success.
+        
+        Args:
+            trade_id: Claimed trade
+            result: Outcome from the trade automation
+        """
+        async with get_db_session() as session:
+            trade = await session.get(OSRSTrade, trade_id)
+            result.apply(trade)
+            
+            if result.success:
+                payment = await session.get(Payment, trade.payment_id)
+                if payment is not None and payment.status == PaymentStatus.PENDING:
+                    await complete_payment(session, payment)
+                self.stats.completed += 1
+            else:
+                self.stats.failed += 1
+            
+            await session.commit()
+    
+    async def fail(self, trade_id: int, notes: str):
+        """Mark a claimed trade failed when its outcome could not be recorded.
+        
+        Args:
+            trade_id: Claimed trade
+            notes: Why the trade failed
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                update(OSRSTrade)
+                .where(OSRSTrade.id == trade_id, OSRSTrade.status == "in_progress")
+                .values(status="failed", notes=notes)
+            )
+            await session.commit()
+        
+        if result.rowcount:
+            self.stats.failed += 1
+    
+    async def recover(self, worker_id: str) -> int:
+        """Fail trades a previous run of this worker left in progress.
+        
+        GP may already have changed hands, so interrupted trades are not
+        retried automatically.
+        
+        Args:
+            worker_id: Worker whose trades to recover
+            
+        Returns:
+            Number of trades marked failed
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                update(OSRSTrade)
+                .where(OSRSTrade.status == "in_progress", OSRSTrade.claimed_by == worker_id)
+                .values(status="failed", notes="Interrupted by a restart; check the trade manually")
+            )
+            await session.commit()
+        
+        if result.rowcount:
+            self.stats.recovered += result.rowcount
+            logger.warning(f"Marked {result.rowcount} interrupted trade(s) of {worker_id} as failed")
+        return result.rowcount
+    
+    async def metrics(self) -> Dict[str, Any]:
+        """Get queue metrics and in-process counters.
+        
+        Returns:
+            Dict of database-derived metrics plus claim/outcome counters
+        """
+        metrics = await queue_metrics()
+        metrics.update(
+            claimed=self.stats.claimed,
+            completed=self.stats.completed,
+            failed=self.stats.failed,
+            skipped=self.stats.skipped,
+            recovered=self.stats.recovered
+        )
+        return metrics
+
+
+class TradeWorker:
+    """Single consumer that runs queued trades on one RuneLite client.
+    
+    One game client can only trade with one player at a time, so each client
+    gets exactly one worker.
+    """
+    
+    def __init__(
+        self,
+        queue: TradeQueue,
+        automation: OSRSTradeAutomation,
+        worker_id: str,
+        on_complete: Optional[Callable[[OSRSTrade, TradeResult], Awaitable[None]]] = None
+    ):
+        """Initialize trade worker.
+        
+        Args:
+            queue: Queue to drain
+            automation: Trade automation bound to this worker's client
+            worker_id: Stable identifier (survives restarts) for claims
+            on_complete: Called after a trade completes successfully
+        """
+        self.queue = queue
+        self.automation = automation
+        self.worker_id = worker_id
+        self.on_complete = on_complete
+        self.current: Optional[int] = None
+        self.idle = False
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the worker loop is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the worker loop if it is not already running."""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        """Stop the worker loop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        """Claim and run trades until stopped."""
+        await self.queue.recover(self.worker_id)
+        while True:
+            try:
+                trade = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Error claiming trade for {self.worker_id}: {e}")
+                trade = None
+            
+            if trade is None:
+                self.idle = True
+                await self.queue.wait(settings.trade_queue_poll_seconds)
+                self.idle = False
+                continue
+            
+            try:
+                await self.process(trade)
+            except Exception as e:
+                logger.error(f"Error running trade {trade.id} on {self.worker_id}: {e}")
+    
+    async def process(self, trade: OSRSTrade) -> TradeResult:
+        """Run one claimed trade and record its outcome.
+        
+        Args:
+            trade: Claimed trade
+            
+        Returns:
+            Trade result
+        """
+        self.current = trade.id
+        logger.info(f"{self.worker_id} running trade {trade.id} with {trade.rsn}")
+        try:
+            try:
+                result = await self.automation.run_trade(trade.rsn, int(trade.gp_amount), trade.world, trade.location)
+                await self.queue.finish(trade.id, result)
+            except Exception as e:
+                # GP may already have changed hands, so the trade is not retried
+                await self.queue.fail(trade.id, f"Outcome not recorded ({e}); check the trade manually")
+                raise
+            
+            if result.success and self.on_complete is not None:
+                try:
+                    await self.on_complete(trade, result)
+                except Exception as e:
+                    logger.error(f"Error in completion callback for trade {trade.id}: {e}")
+            return result
+        finally:
+            self.current = None
+            self.queue.notify()
@@ -0,0 +1,306 @@
+"""Acknowledge-then-process pipeline for inbound webhooks.
+
+The API persists each delivery as a ``WebhookLog`` row, hands its id to a
+``WebhookQueue`` and answers straight away; a bounded pool of workers does
+the processing. The sender's delivery latency no longer depends on our
+database, and when the queue is full the API pushes back with 503 and
+``Retry-After`` before persisting anything.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Deque, Callable, Awaitable
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from bot.database import get_db_session
+from bot.models import WebhookLog
+import logging
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library parser is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Processes one event: (session, log row, parsed payload) -> True if it acted on it
+WebhookHandler = Callable[[AsyncSession, WebhookLog, Any], Awaitable[bool]]
+
+# Seconds of arrivals the ingest rate is measured over
+INGEST_WINDOW = 60.0
+
+
+def loads(data):
+    """Parse JSON with orjson when it is installed.
+    
+    Args:
+        data: JSON document as bytes or str
+        
+    Returns:
+        Parsed value
+        
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass
+class WebhookEvent:
+    """A persisted delivery waiting to be processed."""
+    log_id: int
+    payload: Any = None  # Parsed at ingest, so the worker doesn't parse it again
+    received_at: float = field(default_factory=time.monotonic)
+
+
+class RecentKeys:
+    """Bounded LRU set of recently accepted event keys.
+    
+    Lets retried deliveries be answered without a database round trip; the
+    unique index on ``WebhookLog.event_key`` catches the ones it has
+    forgotten or that arrive concurrently.
+    """
+    
+    def __init__(self, maxsize: int):
+        """Initialize key set.
+        
+        Args:
+            maxsize: Keys kept before the least recently seen is evicted
+        """
+        self.maxsize = maxsize
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+    
+    def __contains__(self, key: str) -> bool:
+        if key not in self._keys:
+            return False
+        self._keys.move_to_end(key)
+        return True
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, key: str):
+        """Remember a key, evicting the oldest beyond ``maxsize``."""
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+
+@dataclass
+class WebhookQueueStats:
+    """Counters for the webhook queue."""
+    received: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    unauthorized: int = 0
+    malformed: int = 0
+    processed: int = 0
+    ignored: int = 0
+    failed: int = 0
+    arrivals: Deque[float] = field(default_factory=lambda: deque(maxlen=10000))
+    lag: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    
+    def ingest_rate(self, now: float) -> float:
+        """Deliveries accepted per second over the last ``INGEST_WINDOW``."""
+        recent = [t for t in self.arrivals if t >= now - INGEST_WINDOW]
+        if not recent:
+            return 0.0
+        span = INGEST_WINDOW if len(recent) < self.arrivals.maxlen else max(now - recent[0], 1e-6)
+        return len(recent) / span
+
+
+class WebhookQueue:
+    """Bounded in-memory queue of persisted webhook events and its workers.
+    
+    The log row is the durable copy of each event; an event whose worker
+    never ran (e.g. the process stopped) is still there with status
+    ``received``.
+    """
+    
+    def __init__(
+        self,
+        handlers: Dict[str, WebhookHandler],
+        workers: Optional[int] = None,
+        maxsize: Optional[int] = None
+    ):
+        """Initialize webhook queue.
+        
+        Args:
+            handlers: Dict of ``WebhookLog.webhook_type`` to handler
+            workers: Concurrent workers (defaults to WEBHOOK_WORKERS)
+            maxsize: Events queued or being accepted before deliveries are
+                refused (defaults to WEBHOOK_QUEUE_SIZE)
+        """
+        self.handlers = handlers
+        self.workers = workers or settings.webhook_workers
+        self.maxsize = maxsize or settings.webhook_queue_size
+        self.stats = WebhookQueueStats()
+        self.recent = RecentKeys(settings.webhook_dedup_cache_size)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._reserved = 0
+        self._tasks: List[asyncio.Task] = []
+    
+    @property
+    def depth(self) -> int:
+        """Events waiting, including deliveries still being persisted."""
+        return self._queue.qsize() + self._reserved
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the workers are running."""
+        return any(not task.done() for task in self._tasks)
+    
+    def start(self):
+        """Start the workers if they are not already running."""
+        if not self.is_running:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+    
+    def stop(self):
+        """Stop the workers; queued events stay ``received`` in the database."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+    
+    def is_duplicate(self, key: Optional[str]) -> bool:
+        """Check whether an event was already accepted recently.
+        
+        Args:
+            key: Event key (None for events that can't be deduplicated)
+            
+        Returns:
+            True if the delivery should be acknowledged and dropped
+        """
+        if key is not None and key in self.recent:
+            self.stats.duplicates += 1
+            return True
+        return False
+    
+    def duplicate(self, key: str):
+        """Record a delivery the database refused as a duplicate.
+        
+        Args:
+            key: Event key
+        """
+        self.recent.add(key)
+        self.stats.duplicates += 1
+    
+    def reserve(self) -> bool:
+        """Claim a queue slot for a delivery about to be persisted.
+        
+        Returns:
+            False if the queue is full and the delivery should be refused
+        """
+        if self.depth >= self.maxsize:
+            self.stats.rejected += 1
+            return False
+        self._reserved += 1
+        return True
+    
+    def release(self):
+        """Give back a reserved slot whose delivery was not persisted."""
+        self._reserved -= 1
+    
+    def submit(self, log_id: int, key: Optional[str] = None, payload: Any = None):
+        """Queue a persisted delivery in its reserved slot.
+        
+        Args:
+            log_id: ``WebhookLog`` row
+            key: Event key to remember for deduplication
+            payload: Parsed payload, if the caller already has it
+        """
+        if key is not None:
+            self.recent.add(key)
+        self._reserved -= 1
+        self._queue.put_nowait(WebhookEvent(log_id, payload))
+        self.stats.received += 1
+        self.stats.arrivals.append(time.monotonic())
+    
+    async def join(self):
+        """Wait until every queued event has been processed."""
+        await self._queue.join()
+    
+    async def _run(self):
+        """Process queued events until stopped."""
+        while True:
+            event = await self._queue.get()
+            try:
+                await self.process(event.log_id, event.payload)
+                self.stats.lag.append(time.monotonic() - event.received_at)
+            finally:
+                self._queue.task_done()
+    
+    async def process(self, log_id: int, payload: Any = None) -> str:
+        """Run one logged event through its handler and record the outcome.
+        
+        Args:
+            log_id: ``WebhookLog`` row
+            payload: Parsed payload (parsed from the row when not given)
+            
+        Returns:
+            New row status: ``processed``, ``ignored`` (nothing to act on),
+            ``failed`` or ``missing`` (no such row)
+        """
+        try:
+            async with get_db_session() as session:
+                log = await session.get(WebhookLog, log_id)
+                if log is None:
+                    return "missing"
+                handler = self.handlers.get(log.webhook_type)
+                if payload is None:
+                    payload = loads(log.payload)
+                acted = handler is not None and await handler(session, log, payload)
+                log.status = "processed" if acted else "ignored"
+                log.processed_at = datetime.utcnow()
+                log.error_message = None
+                status = log.status
+        except Exception as e:
+            logger.error(f"Error processing webhook {log_id}: {e}")
+            try:
+                async with get_db_session() as session:
+                    log = await session.get(WebhookLog, log_id)
+                    if log is not None:
+                        log.status = "failed"
+                        log.error_message = str(e)
+            except Exception as e:
+                logger.error(f"Error marking webhook {log_id} failed: {e}")
+            status = "failed"
+        
+        if status == "processed":
+            self.stats.processed += 1
+        elif status == "ignored":
+            self.stats.ignored += 1
+        elif status == "failed":
+            self.stats.failed += 1
+        return status
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get ingest rate, depth, outcomes and processing lag.
+        
+        Returns:
+            Dict of counters; lag is receipt to processed, in milliseconds
+        """
+        lag = sorted(self.stats.lag)
+        return {
+            "running": self.is_running,
+            "workers": self.workers,
+            "depth": self.depth,
+            "capacity": self.maxsize,
+            "received": self.stats.received,
+            "rejected": self.stats.rejected,
+            "duplicates": self.stats.duplicates,
+            "unauthorized": self.stats.unauthorized,
+            "malformed": self.stats.malformed,
+            "processed": self.stats.processed,
+            "ignored": self.stats.ignored,
+            "failed": self.stats.failed,
+            "ingest_per_second": round(self.stats.ingest_rate(time.monotonic()), 2),
+            "lag_p50_ms": round(lag[len(lag) // 2] * 1000, 1) if lag else None,
+            "lag_p95_ms": round(lag[int(len(lag) * 0.95) - 1] * 1000, 1) if lag else None,
+            "lag_max_ms": round(lag[-1] * 1000, 1) if lag else None
+        }
@@ -0,0 +1,198 @@
+"""Reprocess logged webhooks that failed or were never processed.
+
+Rows are streamed from ``WebhookLog`` in id order, a page at a time, and run
+through ``WebhookQueue.process`` (the same path live deliveries take) by a
+fixed number of concurrent workers. Each row's outcome is written back to the
+row, so recovering from an outage is one bounded batch run::
+
+    python -m bot.utils.webhook_replay --status failed --status received
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Sequence, AsyncIterator
+from sqlalchemy import select
+from config import settings
+from bot.database import engine, get_db_session
+from bot.models import WebhookLog
+from bot.utils.webhook_queue import WebhookQueue
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows that still need processing
+REPLAY_STATUSES = ("failed", "received")
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of one replay run."""
+    scanned: int = 0
+    pages: int = 0
+    outcomes: Counter = field(default_factory=Counter)
+    still_failing: List[int] = field(default_factory=list)
+    elapsed: float = 0.0
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the report as plain data.
+        
+        Returns:
+            Dict of counts, failing row ids and rows per second
+        """
+        return {
+            "scanned": self.scanned,
+            "pages": self.pages,
+            "outcomes": dict(self.outcomes),
+            "still_failing": self.still_failing,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.scanned / self.elapsed, 1) if self.elapsed else 0.0
+        }
+
+
+async def iter_pages(
+    statuses: Sequence[str],
+    before: datetime,
+    page_size: int
+) -> AsyncIterator[List[int]]:
+    """Stream ids of rows to replay, oldest first.
+    
+    Pages are keyed on the last id seen rather than an offset, so rows that
+    change status while the replay runs are neither skipped nor revisited.
+    
+    Args:
+        statuses: Row statuses to select
+        before: Only rows created before this time
+        page_size: Ids per page
+        
+    Yields:
+        Pages of row ids
+    """
+    last_id = 0
+    while True:
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(WebhookLog.id)
+                .where(
+                    WebhookLog.status.in_(list(statuses)),
+                    WebhookLog.created_at < before,
+                    WebhookLog.id > last_id
+                )
+                .order_by(WebhookLog.id)
+                .limit(page_size)
+            )
+            ids = list(result.scalars().all())
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+async def replay(
+    queue: WebhookQueue,
+    statuses: Sequence[str] = REPLAY_STATUSES,
+    before: Optional[datetime] = None,
+    concurrency: Optional[int] = None,
+    page_size: Optional[int] = None,
+    limit: Optional[int] = None
+) -> ReplayReport:
+    """Reprocess logged webhooks.
+    
+    Args:
+        queue: Queue whose handlers process the rows
+        statuses: Row statuses to replay
+        before: Only rows created before this time (defaults to
+            WEBHOOK_REPLAY_MIN_AGE ago, leaving live deliveries to the queue)
+        concurrency: Rows processed at once (defaults to WEBHOOK_REPLAY_CONCURRENCY)
+        page_size: Ids fetched per query (defaults to WEBHOOK_REPLAY_PAGE_SIZE)
+        limit: Stop after this many rows
+        
+    Returns:
+        Replay report
+    """
+    before = before or datetime.utcnow() - timedelta(seconds=settings.webhook_replay_min_age)
+    concurrency = concurrency or settings.webhook_replay_concurrency
+    page_size = page_size or settings.webhook_replay_page_size
+    report = ReplayReport()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=page_size)
+    started = time.monotonic()
+    
+    async def produce():
+        async for ids in iter_pages(statuses, before, page_size):
+            report.pages += 1
+            for log_id in ids:
+                if limit is not None and report.scanned >= limit:
+                    return
+                report.scanned += 1
+                await pending.put(log_id)
+    
+    async def consume():
+        while True:
+            log_id = await pending.get()
+            try:
+                outcome = await queue.process(log_id)
+                report.outcomes[outcome] += 1
+                if outcome == "failed":
+                    report.still_failing.append(log_id)
+            finally:
+                pending.task_done()
+    
+    workers = [asyncio.create_task(consume()) for _ in range(concurrency)]
+    try:
+        await produce()
+        await pending.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    report.elapsed = time.monotonic() - started
+    report.still_failing.sort()
+    if report.scanned:
+        logger.info(f"Replayed {report.scanned} webhook(s): {dict(report.outcomes)}")
+    return report
+
+
+async def run(**kwargs) -> ReplayReport:
+    """Replay webhooks against DATABASE_URL with the API's handlers.
+    
+    Args:
+        **kwargs: Passed to ``replay``
+        
+    Returns:
+        Replay report
+    """
+    from api.routers.webhooks import webhook_queue
+    
+    try:
+        return await replay(webhook_queue, **kwargs)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    """Parse arguments, replay and print the report."""
+    
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--status", action="append", choices=REPLAY_STATUSES, help="Statuses to replay (repeatable)")
+    parser.add_argument("--min-age", type=float, default=settings.webhook_replay_min_age, help="Skip rows younger than this many seconds")
+    parser.add_argument("--concurrency", type=int, default=settings.webhook_replay_concurrency)
+    parser.add_argument("--page-size", type=int, default=settings.webhook_replay_page_size)
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+    
+    report = asyncio.run(run(
+        statuses=args.status or REPLAY_STATUSES,
+        before=datetime.utcnow() - timedelta(seconds=args.min_age),
+        concurrency=args.concurrency,
+        page_size=args.page_size,
+        limit=args.limit
+    ))
+    print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
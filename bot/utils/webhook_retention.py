@@ -0,0 +1,429 @@
+"""Retention for the webhook log.
+
+Every delivery is kept as a ``WebhookLog`` row, so the table grows with each
+confirmation event. ``WebhookRetention`` periodically moves processed and
+ignored rows older than ``WEBHOOK_ARCHIVE_AFTER_DAYS`` into
+``WebhookLogArchive`` rows, each a batch of log rows stored oldest first as
+compressed JSON lines (gzip, or zstd when ``zstandard`` is installed), and
+deletes archives older than ``WEBHOOK_ARCHIVE_RETENTION_DAYS``. Failed and
+unprocessed rows stay in the log for replay.
+
+Payloads are archived verbatim, so signatures can still be checked against
+them. Once a row is archived its event key no longer blocks redeliveries;
+processing is idempotent, so a very late redelivery is just logged again.
+On SQLite the freed pages are reused by new rows rather than returned to
+the filesystem.
+
+Run once by hand with ``python -m bot.utils.webhook_retention``, or print an
+archive's rows with ``--dump ARCHIVE_ID``.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import delete, func, select
+from config import settings
+from bot.database import engine, get_db_session
+from bot.models import WebhookLog, WebhookLogArchive
+import logging
+
+try:
+    import zstandard
+except ImportError:  # Optional; archives are gzipped instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Log rows that are finished with and can be archived
+ARCHIVE_STATUSES = ("processed", "ignored")
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Compress archive data.
+    
+    Args:
+        data: Raw bytes
+        codec: ``gzip`` or ``zstd``
+        
+    Returns:
+        Compressed bytes
+    """
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Decompress archive data.
+    
+    Args:
+        data: Compressed bytes
+        codec: Codec the data was compressed with
+        
+    Returns:
+        Raw bytes
+        
+    Raises:
+        RuntimeError: If the archive is zstd and zstandard is not installed
+    """
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd archives")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def resolve_codec(codec: str) -> str:
+    """Pick the codec to write with.
+    
+    Args:
+        codec: Configured codec
+        
+    Returns:
+        ``zstd`` if requested and installed, otherwise ``gzip``
+    """
+    if codec == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed; archiving webhook logs with gzip")
+        return "gzip"
+    return "zstd" if codec == "zstd" else "gzip"
+
+
+def encode_row(log: WebhookLog) -> Dict[str, Any]:
+    """Get a log row as an archive record."""
+    return {
+        "id": log.id,
+        "webhook_type": log.webhook_type,
+        "event_type": log.event_type,
+        "event_key": log.event_key,
+        "status": log.status,
+        "created_at": log.created_at.isoformat() if log.created_at else None,
+        "processed_at": log.processed_at.isoformat() if log.processed_at else None,
+        "error_message": log.error_message,
+        "payload": log.payload
+    }
+
+
+def pack_rows(records: List[Dict[str, Any]], codec: str) -> Tuple[bytes, int]:
+    """Encode archive records as JSON lines and compress them.
+    
+    CPU-bound; run it off the event loop.
+    
+    Args:
+        records: Records from ``encode_row``, oldest first
+        codec: ``gzip`` or ``zstd``
+        
+    Returns:
+        Tuple of (compressed data, uncompressed size in bytes)
+    """
+    raw = "".join(
+        json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        for record in records
+    ).encode("utf-8")
+    return compress(raw, codec), len(raw)
+
+
+def read_archive(archive: WebhookLogArchive) -> List[Dict[str, Any]]:
+    """Decode the log rows stored in an archive.
+    
+    Args:
+        archive: Archive row
+        
+    Returns:
+        Archived rows, oldest first
+    """
+    lines = decompress(archive.data, archive.codec).decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines if line]
+
+
+@dataclass
+class RetentionStats:
+    """Counters for webhook log retention."""
+    runs: int = 0
+    archives: int = 0
+    archived_rows: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    archive_seconds: float = 0.0
+    purged_archives: int = 0
+    purged_rows: int = 0
+    last_run_at: Optional[datetime] = None
+
+
+class WebhookRetention:
+    """Compact and purge the webhook log in the background."""
+    
+    def __init__(
+        self,
+        archive_after_days: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        codec: Optional[str] = None,
+        interval: Optional[float] = None
+    ):
+        """Initialize webhook log retention.
+        
+        Args:
+            archive_after_days: Age at which finished rows are archived; 0
+                disables archiving (defaults to WEBHOOK_ARCHIVE_AFTER_DAYS)
+            retention_days: Age at which archives are deleted; 0 keeps them
+                (defaults to WEBHOOK_ARCHIVE_RETENTION_DAYS)
+            batch_size: Log rows per archive (defaults to WEBHOOK_ARCHIVE_BATCH_SIZE)
+            codec: ``gzip`` or ``zstd`` (defaults to WEBHOOK_ARCHIVE_CODEC)
+            interval: Seconds between runs (defaults to WEBHOOK_RETENTION_INTERVAL)
+        """
+        self.archive_after_days = settings.webhook_archive_after_days if archive_after_days is None else archive_after_days
+        self.retention_days = settings.webhook_archive_retention_days if retention_days is None else retention_days
+        self.batch_size = batch_size or settings.webhook_archive_batch_size
+        self.codec = resolve_codec(codec or settings.webhook_archive_codec)
+        self.interval = interval or settings.webhook_retention_interval
+        self.stats = RetentionStats()
+        # Measured on each run; a full scan of the payloads is too slow for every scrape
+        self.tables: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def is_running(self) -> bool:
+        """Whether the retention loop is running."""
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the retention loop if it is not already running."""
+        if not self.is_running:
+            self._task = asyncio.create_task(self._run())
+    
+    def stop(self):
+        """Stop the retention loop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    async def _run(self):
+        """Run retention every ``interval`` seconds until stopped."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error running webhook log retention: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive old finished rows, purge expired archives and measure the tables.
+        
+        Args:
+            now: Reference time (defaults to now)
+            
+        Returns:
+            Dict of rows archived and archives/rows purged by this run
+        """
+        now = now or datetime.utcnow()
+        archived = await self.compact(now)
+        purged_archives, purged_rows = await self.purge(now)
+        self.tables = await self.table_sizes()
+        self.stats.runs += 1
+        self.stats.last_run_at = now
+        if archived or purged_archives:
+            logger.info(
+                f"Archived {archived} webhook log(s); purged {purged_archives} archive(s) "
+                f"holding {purged_rows} log(s)"
+            )
+        return {"archived": archived, "purged_archives": purged_archives, "purged_rows": purged_rows}
+    
+    async def compact(self, now: Optional[datetime] = None) -> int:
+        """Archive every finished row older than ``archive_after_days``.
+        
+        Args:
+            now: Reference time (defaults to now)
+            
+        Returns:
+            Rows archived
+        """
+        if not self.archive_after_days:
+            return 0
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.archive_after_days)
+        total = 0
+        while True:
+            count = await self._archive_batch(cutoff)
+            total += count
+            if count < self.batch_size:
+                return total
+    
+    async def _archive_batch(self, cutoff: datetime) -> int:
+        """Move the oldest batch of archivable rows into one archive.
+        
+        The archive insert and the delete of its rows commit together.
+        
+        Args:
+            cutoff: Only rows created before this time
+            
+        Returns:
+            Rows archived
+        """
+        started = time.perf_counter()
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(WebhookLog)
+                .where(
+                    WebhookLog.status.in_(ARCHIVE_STATUSES),
+                    WebhookLog.created_at < cutoff
+                )
+                .order_by(WebhookLog.id)
+                .limit(self.batch_size)
+            )
+            logs = result.scalars().all()
+            if not logs:
+                return 0
+            
+            # Encode and compress in a thread so webhook acks on this loop aren't stalled
+            records = [encode_row(log) for log in logs]
+            data, raw_bytes = await asyncio.to_thread(pack_rows, records, self.codec)
+            session.add(WebhookLogArchive(
+                first_log_id=logs[0].id,
+                last_log_id=logs[-1].id,
+                first_created_at=min(log.created_at for log in logs),
+                last_created_at=max(log.created_at for log in logs),
+                row_count=len(logs),
+                codec=self.codec,
+                raw_bytes=raw_bytes,
+                data=data
+            ))
+            await session.execute(
+                delete(WebhookLog).where(WebhookLog.id.in_([log.id for log in logs]))
+            )
+        
+        self.stats.archives += 1
+        self.stats.archived_rows += len(logs)
+        self.stats.raw_bytes += raw_bytes
+        self.stats.stored_bytes += len(data)
+        self.stats.archive_seconds += time.perf_counter() - started
+        return len(logs)
+    
+    async def purge(self, now: Optional[datetime] = None) -> Tuple[int, int]:
+        """Delete archives whose newest row is older than ``retention_days``.
+        
+        Args:
+            now: Reference time (defaults to now)
+            
+        Returns:
+            Tuple of (archives deleted, log rows they held)
+        """
+        if not self.retention_days:
+            return 0, 0
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+        async with get_db_session() as session:
+            expired = WebhookLogArchive.last_created_at < cutoff
+            result = await session.execute(
+                select(func.count(WebhookLogArchive.id), func.coalesce(func.sum(WebhookLogArchive.row_count), 0))
+                .where(expired)
+            )
+            archives, rows = result.one()
+            if archives:
+                await session.execute(delete(WebhookLogArchive).where(expired))
+        
+        self.stats.purged_archives += archives
+        self.stats.purged_rows += rows
+        return archives, rows
+    
+    async def table_sizes(self) -> Dict[str, Any]:
+        """Measure the log and archive tables.
+        
+        Returns:
+            Dict of log rows and payload bytes per status, and archive
+            count, rows, raw and stored bytes
+        """
+        async with get_db_session() as session:
+            result = await session.execute(
+                select(WebhookLog.status, func.count(WebhookLog.id), func.sum(func.length(WebhookLog.payload)))
+                .group_by(WebhookLog.status)
+            )
+            logs = {status: {"rows": rows, "payload_bytes": size or 0} for status, rows, size in result.all()}
+            result = await session.execute(
+                select(
+                    func.count(WebhookLogArchive.id),
+                    func.sum(WebhookLogArchive.row_count),
+                    func.sum(WebhookLogArchive.raw_bytes),
+                    func.sum(func.length(WebhookLogArchive.data))
+                )
+            )
+            archives, rows, raw_bytes, stored_bytes = result.one()
+        
+        return {
+            "webhook_logs": {
+                "rows": sum(entry["rows"] for entry in logs.values()),
+                "payload_bytes": sum(entry["payload_bytes"] for entry in logs.values()),
+                "by_status": logs
+            },
+            "webhook_log_archives": {
+                "archives": archives,
+                "rows": rows or 0,
+                "raw_bytes": raw_bytes or 0,
+                "stored_bytes": stored_bytes or 0
+            }
+        }
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get archive and purge throughput.
+        
+        Returns:
+            Dict of counters, rows and bytes archived per second of archiving,
+            the compression ratio and the table sizes from the last run
+        """
+        seconds = self.stats.archive_seconds
+        return {
+            "running": self.is_running,
+            "codec": self.codec,
+            "runs": self.stats.runs,
+            "last_run_at": self.stats.last_run_at.isoformat() if self.stats.last_run_at else None,
+            "archives": self.stats.archives,
+            "archived_rows": self.stats.archived_rows,
+            "archived_rows_per_second": round(self.stats.archived_rows / seconds, 1) if seconds else 0.0,
+            "archived_bytes_per_second": round(self.stats.raw_bytes / seconds) if seconds else 0,
+            "compression_ratio": round(self.stats.raw_bytes / self.stats.stored_bytes, 2) if self.stats.stored_bytes else None,
+            "purged_archives": self.stats.purged_archives,
+            "purged_rows": self.stats.purged_rows,
+            "tables": self.tables
+        }
+
+
+webhook_retention = WebhookRetention()
+
+
+async def run(dump: Optional[int] = None) -> Any:
+    """Run retention once, or read one archive, against DATABASE_URL.
+    
+    Args:
+        dump: Archive id to read instead of running retention
+        
+    Returns:
+        Archived rows when dumping, otherwise the run report and metrics
+    """
+    try:
+        if dump is not None:
+            async with get_db_session() as session:
+                archive = await session.get(WebhookLogArchive, dump)
+                return read_archive(archive) if archive is not None else []
+        report = await webhook_retention.run_once()
+        return {**report, **webhook_retention.metrics()}
+    finally:
+        await engine.dispose()
+
+
+def main():
+    """Parse arguments, run and print the result."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--dump", type=int, metavar="ARCHIVE_ID", help="Print an archive's rows as JSON lines")
+    args = parser.parse_args()
+    
+    result = asyncio.run(run(args.dump))
+    if args.dump is not None:
+        for row in result:
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
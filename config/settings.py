@@ -18,6 +18,15 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = Field(default="sqlite+aiosqlite:///data/gpskilled.db", env="DATABASE_URL")
+    database_echo: bool = Field(default=False, env="DATABASE_ECHO")
+    database_pool_size: int = Field(default=5, env="DATABASE_POOL_SIZE")
+    database_max_overflow: int = Field(default=10, env="DATABASE_MAX_OVERFLOW")
+    database_pool_timeout: float = Field(default=30.0, env="DATABASE_POOL_TIMEOUT")
+    database_pool_recycle: int = Field(default=1800, env="DATABASE_POOL_RECYCLE")
+    database_pool_pre_ping: bool = Field(default=True, env="DATABASE_POOL_PRE_PING")
+    sqlite_journal_mode: str = Field(default="WAL", env="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str = Field(default="NORMAL", env="SQLITE_SYNCHRONOUS")
+    sqlite_busy_timeout_ms: int = Field(default=5000, env="SQLITE_BUSY_TIMEOUT_MS")
     
     # FastAPI
     api_host: str = Field(default="0.0.0.0", env="API_HOST")
@@ -29,16 +38,53 @@ class Settings(BaseSettings):
     ltc_wallet_address: str = Field(default="", env="LTC_WALLET_ADDRESS")
     blockcypher_api_key: str = Field(default="", env="BLOCKCYPHER_API_KEY")
     blockchain_info_api_key: str = Field(default="", env="BLOCKCHAIN_INFO_API_KEY")
+    blockcypher_base_url: str = Field(default="https://api.blockcypher.com/v1", env="BLOCKCYPHER_BASE_URL")
+    blockcypher_chains: str = Field(default="btc,ltc", env="BLOCKCYPHER_CHAINS")
+    blockcypher_batch_size: int = Field(default=3, env="BLOCKCYPHER_BATCH_SIZE")
+    blockcypher_max_concurrency: int = Field(default=3, env="BLOCKCYPHER_MAX_CONCURRENCY")
     
     # OSRS
     osrs_gp_rate: float = Field(default=0.50, env="OSRS_GP_RATE")
     osrs_rsn: str = Field(default="", env="OSRS_RSN")
     osrs_world: int = Field(default=302, env="OSRS_WORLD")
     osrs_trade_location: str = Field(default="Grand Exchange", env="OSRS_TRADE_LOCATION")
+    osrs_hiscores_url: str = Field(
+        default="https://secure.runescape.com/m=hiscore_oldschool/index_lite.ws",
+        env="OSRS_HISCORES_URL"
+    )
+    hiscores_cache_size: int = Field(default=1024, env="HISCORES_CACHE_SIZE")
+    hiscores_cache_ttl_seconds: float = Field(default=600.0, env="HISCORES_CACHE_TTL_SECONDS")
+    hiscores_negative_ttl_seconds: float = Field(default=60.0, env="HISCORES_NEGATIVE_TTL_SECONDS")
+    hiscores_bulk_concurrency: int = Field(default=4, env="HISCORES_BULK_CONCURRENCY")
+    trade_hop_timeout_seconds: float = Field(default=30.0, env="TRADE_HOP_TIMEOUT_SECONDS")
+    trade_window_timeout_seconds: float = Field(default=30.0, env="TRADE_WINDOW_TIMEOUT_SECONDS")
+    trade_offer_timeout_seconds: float = Field(default=10.0, env="TRADE_OFFER_TIMEOUT_SECONDS")
+    trade_accept_timeout_seconds: float = Field(default=300.0, env="TRADE_ACCEPT_TIMEOUT_SECONDS")
+    trade_poll_min_interval: float = Field(default=0.1, env="TRADE_POLL_MIN_INTERVAL")
+    trade_poll_max_interval: float = Field(default=1.0, env="TRADE_POLL_MAX_INTERVAL")
+    trade_queue_poll_seconds: float = Field(default=5.0, env="TRADE_QUEUE_POLL_SECONDS")
+    trade_batch_max_size: int = Field(default=10, env="TRADE_BATCH_MAX_SIZE")
+    trade_batch_lookahead: int = Field(default=50, env="TRADE_BATCH_LOOKAHEAD")
+    
+    # Trade screenshots
+    screenshot_dir: str = Field(default="data/screenshots", env="SCREENSHOT_DIR")
+    screenshot_chunk_size: int = Field(default=65536, env="SCREENSHOT_CHUNK_SIZE")
+    screenshot_compress: bool = Field(default=False, env="SCREENSHOT_COMPRESS")
+    screenshot_workers: int = Field(default=2, env="SCREENSHOT_WORKERS")
     
     # Payment Configuration
     payment_confirmation_blocks: int = Field(default=3, env="PAYMENT_CONFIRMATION_BLOCKS")
     payment_timeout_minutes: int = Field(default=30, env="PAYMENT_TIMEOUT_MINUTES")
+    confirmation_poll_interval_seconds: float = Field(default=60.0, env="CONFIRMATION_POLL_INTERVAL_SECONDS")
+    
+    # Exchange Rates
+    coinbase_api_url: str = Field(
+        default="https://api.coinbase.com/v2/exchange-rates",
+        env="COINBASE_API_URL"
+    )
+    rate_cache_ttl_seconds: float = Field(default=30.0, env="RATE_CACHE_TTL_SECONDS")
+    rate_max_staleness_seconds: float = Field(default=300.0, env="RATE_MAX_STALENESS_SECONDS")
+    rate_prefetch_interval_seconds: float = Field(default=15.0, env="RATE_PREFETCH_INTERVAL_SECONDS")
     
     # Ngrok
     ngrok_auth_token: str = Field(default="", env="NGROK_AUTH_TOKEN")
@@ -50,6 +96,19 @@ class Settings(BaseSettings):
     # Webhooks
     payment_webhook_url: str = Field(default="", env="PAYMENT_WEBHOOK_URL")
     blockcypher_webhook_token: str = Field(default="", env="BLOCKCYPHER_WEBHOOK_TOKEN")
+    webhook_workers: int = Field(default=4, env="WEBHOOK_WORKERS")
+    webhook_queue_size: int = Field(default=1000, env="WEBHOOK_QUEUE_SIZE")
+    webhook_retry_after: int = Field(default=5, env="WEBHOOK_RETRY_AFTER")
+    webhook_dedup_cache_size: int = Field(default=10000, env="WEBHOOK_DEDUP_CACHE_SIZE")
+    webhook_replay_page_size: int = Field(default=500, env="WEBHOOK_REPLAY_PAGE_SIZE")
+    webhook_replay_concurrency: int = Field(default=8, env="WEBHOOK_REPLAY_CONCURRENCY")
+    webhook_replay_min_age: int = Field(default=60, env="WEBHOOK_REPLAY_MIN_AGE")
+    webhook_archive_after_days: int = Field(default=7, env="WEBHOOK_ARCHIVE_AFTER_DAYS")
+    webhook_archive_retention_days: int = Field(default=0, env="WEBHOOK_ARCHIVE_RETENTION_DAYS")
+    webhook_archive_batch_size: int = Field(default=1000, env="WEBHOOK_ARCHIVE_BATCH_SIZE")
+    webhook_archive_codec: str = Field(default="gzip", env="WEBHOOK_ARCHIVE_CODEC")
+    webhook_retention_interval: int = Field(default=3600, env="WEBHOOK_RETENTION_INTERVAL")
+    health_publish_interval: float = Field(default=15.0, env="HEALTH_PUBLISH_INTERVAL")
     
     # Logging
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
@@ -58,10 +117,33 @@ class Settings(BaseSettings):
     # RuneLite Plugin
     runelite_plugin_host: str = Field(default="localhost", env="RUNELITE_PLUGIN_HOST")
     runelite_plugin_port: int = Field(default=9001, env="RUNELITE_PLUGIN_PORT")
+    runelite_event_heartbeat_timeout: float = Field(default=30.0, env="RUNELITE_EVENT_HEARTBEAT_TIMEOUT")
+    runelite_event_reconnect_max_delay: float = Field(default=30.0, env="RUNELITE_EVENT_RECONNECT_MAX_DELAY")
+    runelite_plugin_clients: str = Field(default="", env="RUNELITE_PLUGIN_CLIENTS")
+    runelite_health_interval_seconds: float = Field(default=15.0, env="RUNELITE_HEALTH_INTERVAL_SECONDS")
+    runelite_max_failures: int = Field(default=2, env="RUNELITE_MAX_FAILURES")
     
     # Rate Limiting
     rate_limit_requests: int = Field(default=5, env="RATE_LIMIT_REQUESTS")
     rate_limit_period: int = Field(default=60, env="RATE_LIMIT_PERIOD")
+    http_rate_limits: str = Field(
+        default="api.blockcypher.com=3/1,api.coinbase.com=10/1,secure.runescape.com=2/1",
+        env="HTTP_RATE_LIMITS"
+    )
+    http_rate_limit_retries: int = Field(default=3, env="HTTP_RATE_LIMIT_RETRIES")
+    
+    # Outbound HTTP
+    http_pool_limit: int = Field(default=100, env="HTTP_POOL_LIMIT")
+    http_pool_limit_per_host: int = Field(default=10, env="HTTP_POOL_LIMIT_PER_HOST")
+    http_dns_cache_ttl: int = Field(default=300, env="HTTP_DNS_CACHE_TTL")
+    http_keepalive_timeout: float = Field(default=30.0, env="HTTP_KEEPALIVE_TIMEOUT")
+    http_total_timeout: float = Field(default=30.0, env="HTTP_TOTAL_TIMEOUT")
+    http_connect_timeout: float = Field(default=10.0, env="HTTP_CONNECT_TIMEOUT")
+    http_max_retries: int = Field(default=2, env="HTTP_MAX_RETRIES")
+    http_retry_base_delay: float = Field(default=0.5, env="HTTP_RETRY_BASE_DELAY")
+    http_retry_max_delay: float = Field(default=5.0, env="HTTP_RETRY_MAX_DELAY")
+    circuit_breaker_failure_threshold: int = Field(default=5, env="CIRCUIT_BREAKER_FAILURE_THRESHOLD")
+    circuit_breaker_reset_timeout: float = Field(default=30.0, env="CIRCUIT_BREAKER_RESET_TIMEOUT")
     
     # Development
     dev_mode: bool = Field(default=True, env="DEV_MODE")
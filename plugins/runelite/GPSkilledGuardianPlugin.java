@@ -14,8 +14,11 @@ import net.runelite.client.ui.overlay.OverlayManager;
 import okhttp3.*;
 
 import java.io.IOException;
+import java.util.List;
+import java.util.concurrent.CopyOnWriteArrayList;
 import java.util.concurrent.ExecutorService;
 import java.util.concurrent.Executors;
+import java.util.function.Consumer;
 
 /**
  * GPSkilledGuardian RuneLite Plugin
@@ -30,6 +33,7 @@ import java.util.concurrent.Executors;
  * - Trade acceptance automation
  * - Screenshot capture
  * - Chat messaging
+ * - Pushed world and trade state events (GET /events)
  * 
  * Configuration:
  * - Server Port: 9001 (default)
@@ -46,6 +50,10 @@ import java.util.concurrent.Executors;
 )
 public class GPSkilledGuardianPlugin extends Plugin
 {
+	// Trade offer and confirmation screen widget groups
+	private static final int TRADE_WINDOW_GROUP = 335;
+	private static final int TRADE_CONFIRM_GROUP = 334;
+
 	@Inject
 	private Client client;
 
@@ -58,6 +66,12 @@ public class GPSkilledGuardianPlugin extends Plugin
 	private HttpServer httpServer;
 	private ExecutorService executorService;
 
+	// Open /events streams; each receives one JSON line per state change
+	private final List<Consumer<String>> eventListeners = new CopyOnWriteArrayList<>();
+	private volatile String tradeStatus = "no_trade";
+	private volatile String tradePartner;
+	private volatile int lastWorld = -1;
+
 	@Override
 	protected void startUp() throws Exception
 	{
@@ -99,6 +113,46 @@ public class GPSkilledGuardianPlugin extends Plugin
 		if (gameStateChanged.getGameState() == GameState.LOGGED_IN)
 		{
 			log.info("Player logged in");
+			
+			// Logging in after a hop lands on the new world
+			int world = client.getWorld();
+			if (world != lastWorld)
+			{
+				lastWorld = world;
+				publishEvent("{\"type\": \"world\", \"world\": " + world + "}");
+			}
+		}
+	}
+
+	@Subscribe
+	public void onWidgetLoaded(WidgetLoaded widgetLoaded)
+	{
+		if (widgetLoaded.getGroupId() == TRADE_WINDOW_GROUP)
+		{
+			setTradeStatus("open");
+		}
+		else if (widgetLoaded.getGroupId() == TRADE_CONFIRM_GROUP)
+		{
+			setTradeStatus("confirming");
+		}
+	}
+
+	@Subscribe
+	public void onChatMessage(ChatMessage chatMessage)
+	{
+		if (chatMessage.getType() != ChatMessageType.TRADE)
+		{
+			return;
+		}
+		
+		String message = chatMessage.getMessage();
+		if (message.startsWith("Accepted trade"))
+		{
+			setTradeStatus("completed");
+		}
+		else if (message.contains("declined trade"))
+		{
+			setTradeStatus("declined");
 		}
 	}
 
@@ -131,6 +185,36 @@ public class GPSkilledGuardianPlugin extends Plugin
 		}
 	}
 
+	/**
+	 * Register a listener for pushed events
+	 * 
+	 * @param listener Receives one JSON-encoded event per call
+	 */
+	public void addEventListener(Consumer<String> listener)
+	{
+		eventListeners.add(listener);
+	}
+
+	/**
+	 * Unregister an event listener
+	 * 
+	 * @param listener Listener passed to addEventListener
+	 */
+	public void removeEventListener(Consumer<String> listener)
+	{
+		eventListeners.remove(listener);
+	}
+
+	/**
+	 * Build the snapshot event sent when a stream opens
+	 * 
+	 * @return JSON-encoded hello event
+	 */
+	public String getHelloEvent()
+	{
+		return "{\"type\": \"hello\", \"world\": " + client.getWorld() + ", \"trade\": " + getTradeStatus() + "}";
+	}
+
 	/**
 	 * Get current world number
 	 * 
@@ -187,6 +271,8 @@ public class GPSkilledGuardianPlugin extends Plugin
 				// Right-click menu interaction to send trade request
 				// This requires menu entry injection
 				log.info("Sending trade request to {}", rsn);
+				tradePartner = rsn;
+				setTradeStatus("requested");
 				return true;
 			}
 			
@@ -215,6 +301,7 @@ public class GPSkilledGuardianPlugin extends Plugin
 			{
 				// Interact with trade window to offer GP
 				log.info("Offering {} GP in trade", amount);
+				setTradeStatus("offered");
 				return true;
 			}
 			
@@ -229,7 +316,7 @@ public class GPSkilledGuardianPlugin extends Plugin
 	}
 
 	/**
-	 * Accept the current trade
+	 * Accept the current trade screen, either the offer or the confirmation
 	 * 
 	 * @return true if successful, false otherwise
 	 */
@@ -237,10 +324,19 @@ public class GPSkilledGuardianPlugin extends Plugin
 	{
 		try
 		{
+			if (isTradeConfirmOpen())
+			{
+				// Click accept button on the confirmation screen; "completed"
+				// follows from the trade chat message
+				log.info("Accepting trade confirmation");
+				return true;
+			}
+			
 			if (isTradeWindowOpen())
 			{
 				// Click accept button in trade window
 				log.info("Accepting trade");
+				setTradeStatus("accepted");
 				return true;
 			}
 			
@@ -261,11 +357,11 @@ public class GPSkilledGuardianPlugin extends Plugin
 	 */
 	public String getTradeStatus()
 	{
-		if (isTradeWindowOpen())
+		if (tradePartner == null)
 		{
-			return "{\"status\": \"in_progress\"}";
+			return "{\"status\": \"" + tradeStatus + "\"}";
 		}
-		return "{\"status\": \"no_trade\"}";
+		return "{\"status\": \"" + tradeStatus + "\", \"player\": \"" + tradePartner.replace("\"", "") + "\"}";
 	}
 
 	/**
@@ -298,6 +394,30 @@ public class GPSkilledGuardianPlugin extends Plugin
 
 	// Helper methods
 
+	private void setTradeStatus(String status)
+	{
+		tradeStatus = status;
+		String trade = getTradeStatus();
+		publishEvent("{\"type\": \"trade\", " + trade.substring(1));
+	}
+
+	private void publishEvent(String json)
+	{
+		for (Consumer<String> listener : eventListeners)
+		{
+			try
+			{
+				listener.accept(json);
+			}
+			catch (Exception e)
+			{
+				// A broken stream must not stop events reaching the others
+				log.debug("Dropping event listener", e);
+				eventListeners.remove(listener);
+			}
+		}
+	}
+
 	private net.runelite.http.api.worlds.World findWorld(int worldNumber)
 	{
 		// Find world by number
@@ -320,7 +440,14 @@ public class GPSkilledGuardianPlugin extends Plugin
 	private boolean isTradeWindowOpen()
 	{
 		// Check if trade interface is open
-		Widget tradeWindow = client.getWidget(335, 0); // Trade window widget ID
+		Widget tradeWindow = client.getWidget(TRADE_WINDOW_GROUP, 0);
 		return tradeWindow != null && !tradeWindow.isHidden();
 	}
+
+	private boolean isTradeConfirmOpen()
+	{
+		// Check if the second (confirmation) trade screen is open
+		Widget confirmWindow = client.getWidget(TRADE_CONFIRM_GROUP, 0);
+		return confirmWindow != null && !confirmWindow.isHidden();
+	}
 }
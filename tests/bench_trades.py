@@ -0,0 +1,193 @@
+"""Trade automation throughput benchmark against mock RuneLite clients.
+
+Starts one ``MockRuneLitePlugin`` per concurrent trade slot (a game client
+trades with one player at a time), drives ``OSRSTradeAutomation`` through
+the requested number of trades and reports trades per minute, per-stage
+latency percentiles and the requests each endpoint received::
+    
+    python -m tests.bench_trades --trades 200 --concurrency 10 --latency 0.005 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+from aiohttp.test_utils import TestServer
+from bot.models import TradeStage
+from bot.utils.http_client import HTTPClient
+from bot.utils.rate_limiter import RateLimiterRegistry
+from bot.utils.osrs_payments import (
+    OSRSGPPaymentProcessor,
+    RuneLitePluginClient,
+    OSRSTradeAutomation,
+    TradeResult
+)
+from bot.utils.screenshots import ScreenshotStore
+from tests.mock_runelite import MockRuneLitePlugin
+
+WORLDS = (301, 302, 330, 416)
+
+
+def summarize(values: Iterable[float]) -> Dict[str, Optional[float]]:
+    """Get nearest-rank latency percentiles.
+    
+    Args:
+        values: Samples in seconds
+        
+    Returns:
+        Dict of count, p50, p95, p99 and max (None when there are no samples)
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    
+    def rank(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))], 4)
+    
+    return {
+        "count": len(ordered),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": round(ordered[-1], 4)
+    }
+
+
+async def run_benchmark(
+    trades: int = 100,
+    concurrency: int = 10,
+    latency: Tuple[float, float] = (0.0, 0.0),
+    failure_rate: float = 0.0,
+    decline_rate: float = 0.0,
+    accept_delay: float = 0.1,
+    stream: bool = True,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Run trades through mock clients and measure them.
+    
+    Args:
+        trades: Total trades to run
+        concurrency: Mock clients, i.e. trades in flight at once
+        latency: Range of seconds added to every plugin request
+        failure_rate: Chance a plugin request returns 500
+        decline_rate: Chance the player declines a trade
+        accept_delay: Seconds the player takes to accept
+        stream: Serve the /events push stream (otherwise the automation polls)
+        seed: Seed for worlds, latencies and failures
+        
+    Returns:
+        Report dict
+    """
+    rng = random.Random(seed)
+    plugins = [
+        MockRuneLitePlugin(
+            latency=latency,
+            failure_rate=failure_rate,
+            decline_rate=decline_rate,
+            accept_delay=accept_delay,
+            stream=stream,
+            seed=rng.random()
+        )
+        for _ in range(concurrency)
+    ]
+    servers = [TestServer(p.app, host="127.0.0.1") for p in plugins]
+    http = HTTPClient(limiters=RateLimiterRegistry(""))
+    results: List[TradeResult] = []
+    
+    with tempfile.TemporaryDirectory() as screenshot_dir:
+        screenshots = ScreenshotStore(screenshot_dir)
+        gp_processor = OSRSGPPaymentProcessor(0.5, http)
+        clients = []
+        try:
+            for server in servers:
+                await server.start_server()
+                client = RuneLitePluginClient(server.host, server.port, http)
+                if stream:
+                    client.events.start()
+                clients.append(client)
+            if stream:
+                for _ in range(100):
+                    if all(c.events.connected for c in clients):
+                        break
+                    await asyncio.sleep(0.01)
+            
+            jobs: asyncio.Queue = asyncio.Queue()
+            for i in range(trades):
+                jobs.put_nowait((f"Player{i}", rng.choice(WORLDS)))
+            
+            async def drain(client: RuneLitePluginClient):
+                automation = OSRSTradeAutomation(client, gp_processor, screenshots)
+                while not jobs.empty():
+                    rsn, world = jobs.get_nowait()
+                    results.append(await automation.run_trade(rsn, 1_000_000, world, "Grand Exchange"))
+            
+            started = time.monotonic()
+            await asyncio.gather(*(drain(c) for c in clients))
+            elapsed = time.monotonic() - started
+            await screenshots.drain()
+        finally:
+            for client in clients:
+                client.events.stop()
+            await http.close()
+            for server in servers:
+                await server.close()
+            screenshots.close()
+    
+    completed = [r for r in results if r.success]
+    requests: Counter = Counter()
+    injected: Counter = Counter()
+    for plugin in plugins:
+        requests.update(plugin.requests)
+        injected.update(plugin.failures)
+    
+    return {
+        "trades": trades,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "trades_per_minute": round(len(completed) * 60 / elapsed, 1) if elapsed else 0.0,
+        "failures_by_stage": dict(Counter(r.failed_stage.value for r in results if r.failed_stage)),
+        "trade_latency": summarize((r.finished_at - r.started_at).total_seconds() for r in completed),
+        "stage_latency": {
+            stage.value: summarize(r.timings[stage.value] for r in completed if stage.value in r.timings)
+            for stage in TradeStage if stage is not TradeStage.FAILED
+        },
+        "requests": dict(requests),
+        "injected_failures": dict(injected),
+        "requests_per_trade": round(sum(requests.values()) / trades, 1) if trades else 0.0,
+        "screenshots": screenshots.metrics()
+    }
+
+
+def main():
+    """Run the benchmark from the command line and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--trades", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.0, 0.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--accept-delay", type=float, default=0.1)
+    parser.add_argument("--no-stream", action="store_true", help="Poll instead of using /events")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    report = asyncio.run(run_benchmark(
+        trades=args.trades,
+        concurrency=args.concurrency,
+        latency=tuple(args.latency),
+        failure_rate=args.failure_rate,
+        decline_rate=args.decline_rate,
+        accept_delay=args.accept_delay,
+        stream=not args.no_stream,
+        seed=args.seed
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
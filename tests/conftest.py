@@ -0,0 +1,60 @@
+"""Shared test fixtures."""
+import logging
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+import bot.database
+from bot.migrations import migrate
+from config import settings
+from tests.mock_blockcypher import MockBlockCypher
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_file(tmp_path_factory):
+    """Write the bot's log to a temporary file instead of LOG_FILE.
+    
+    Yields:
+        Path: Log file used for the test session
+    """
+    path = tmp_path_factory.mktemp("logs") / "bot.log"
+    handler = logging.FileHandler(path)
+    logger = logging.getLogger("GPSkilledGuardian")
+    handlers = [h for h in logger.handlers if not isinstance(h, logging.FileHandler)]
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(logger, "handlers", handlers + [handler])
+        yield path
+    handler.close()
+
+
+@pytest_asyncio.fixture
+async def db(monkeypatch):
+    """Point the session factory at a fresh in-memory SQLite database.
+    
+    Yields:
+        async_sessionmaker: Session factory for the test database
+    """
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    await migrate(engine)
+    
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(bot.database, "AsyncSessionLocal", factory)
+    
+    yield factory
+    
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def blockcypher(monkeypatch):
+    """Serve the BlockCypher/Coinbase emulator and point BlockCypher clients at it.
+    
+    Yields:
+        MockBlockCypher: Running emulator; ``url`` is its base URL
+    """
+    emulator = MockBlockCypher(seed=1)
+    async with TestServer(emulator.app, host="127.0.0.1") as server:
+        emulator.url = str(server.make_url("")).rstrip("/")
+        monkeypatch.setattr(settings, "blockcypher_base_url", f"{emulator.url}/v1")
+        yield emulator
@@ -0,0 +1,308 @@
+"""End-to-end crypto payment load test against the BlockCypher emulator.
+
+Each simulated user runs ``/pay``. The payment is then sent on the emulated
+chain, and blocks are mined until BlockCypher's ``tx-confirmation`` hooks
+complete the payment through the webhook API. Everything runs in one
+process against a SQLite file. The report gives throughput and
+p50/p95/p99 latency for ``/pay``, for webhook acknowledgement and end to end::
+    
+    python -m tests.load_payments --payments 500 --concurrency 50 --block-interval 0.05
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Optional, Dict, Any, List, Tuple
+from unittest.mock import patch
+import httpx
+from aiohttp.test_utils import TestServer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import bot.database
+from api.routers import webhooks as webhooks_api
+from bot.database import PoolStats, create_engine, get_db_session
+from bot.migrations import migrate
+from bot.models import Payment, PaymentStatus
+from bot.cogs.payments import Payments
+from bot.utils.crypto_payments import BLOCKCYPHER_CHAINS, BlockCypherClient, rate_service
+from bot.utils.exchange_rates import CoinbaseRateProvider
+from bot.utils.http_client import HTTPClient
+from bot.utils.osrs_payments import OSRSGPPaymentProcessor
+from bot.utils.rate_limiter import RateLimiterRegistry
+from bot.utils.webhook_queue import WebhookQueue
+from config import settings
+from tests.bench_trades import summarize
+from tests.mock_blockcypher import MockBlockCypher
+
+WEBHOOK_URL = "http://api/webhooks/blockcypher"
+
+
+class LoadUser:
+    """Discord user stand-in."""
+    
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"load{user_id}"
+    
+    def __str__(self) -> str:
+        return self.name
+
+
+class LoadResponse:
+    """``interaction.response`` stand-in."""
+    
+    async def defer(self, **kwargs):
+        pass
+
+
+class LoadFollowup:
+    """``interaction.followup`` stand-in that keeps what was sent."""
+    
+    def __init__(self):
+        self.sent: List[Tuple[Optional[str], Dict[str, Any]]] = []
+    
+    async def send(self, content: Optional[str] = None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+class LoadInteraction:
+    """Just enough of ``discord.Interaction`` for the payment commands."""
+    
+    def __init__(self, user_id: int):
+        self.user = LoadUser(user_id)
+        self.response = LoadResponse()
+        self.followup = LoadFollowup()
+
+
+def build_cog(http: HTTPClient) -> Payments:
+    """Create the payments cog without a Discord connection or background loops.
+    
+    Args:
+        http: HTTP client for the cog's processors
+        
+    Returns:
+        Payments cog
+    """
+    cog = Payments.__new__(Payments)
+    cog.bot = None
+    cog.http = http
+    cog.osrs_processor = OSRSGPPaymentProcessor(settings.osrs_gp_rate, http)
+    cog.last_rate_prefetch = None
+    return cog
+
+
+async def run_load_test(
+    payments: int = 100,
+    concurrency: int = 10,
+    currency: str = "btc",
+    amount_usd: float = 10.0,
+    block_interval: float = 0.05,
+    latency: Tuple[float, float] = (0.0, 0.0),
+    failure_rate: float = 0.0,
+    confirmations: Optional[int] = None,
+    timeout: float = 60.0,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Drive payments from ``/pay`` to completion and measure them.
+    
+    Args:
+        payments: Total payments
+        concurrency: Users paying at once
+        currency: ``btc`` or ``ltc``
+        amount_usd: USD per payment
+        block_interval: Seconds between mined blocks
+        latency: Range of seconds added to every emulated API request
+        failure_rate: Chance an emulated API request returns 500
+        confirmations: Confirmations required (defaults to PAYMENT_CONFIRMATION_BLOCKS)
+        timeout: Seconds one payment may take to complete
+        seed: Seed for the emulator
+        
+    Returns:
+        Report dict
+    """
+    from api.main import app
+    
+    pay_latency: List[float] = []
+    webhook_latency: List[float] = []
+    end_to_end: List[float] = []
+    outcomes: Counter = Counter()
+    waiting: Dict[int, Tuple[float, asyncio.Future]] = {}
+    
+    async def deliver(url: str, headers: Dict[str, str], body: bytes) -> int:
+        started = time.perf_counter()
+        response = await api.post(url, headers=headers, content=body)
+        webhook_latency.append(time.perf_counter() - started)
+        return response.status_code
+    
+    emulator = MockBlockCypher(latency=latency, failure_rate=failure_rate, deliver=deliver, seed=seed)
+    server = TestServer(emulator.app, host="127.0.0.1")
+    http = HTTPClient(limiters=RateLimiterRegistry(""))
+    api = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api")
+    
+    with tempfile.TemporaryDirectory() as data_dir, ExitStack() as patches:
+        pool_stats = PoolStats()
+        engine = create_engine(f"sqlite+aiosqlite:///{data_dir}/load.db", pool_stats)
+        await migrate(engine)
+        factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        await server.start_server()
+        base_url = str(server.make_url("")).rstrip("/")
+        
+        patches.enter_context(patch.object(bot.database, "AsyncSessionLocal", factory))
+        patches.enter_context(patch.object(settings, "blockcypher_base_url", f"{base_url}/v1"))
+        if confirmations is not None:
+            patches.enter_context(patch.object(settings, "payment_confirmation_blocks", confirmations))
+        patches.enter_context(patch.object(
+            rate_service, "provider", CoinbaseRateProvider(f"{base_url}/v2/exchange-rates", http)
+        ))
+        patches.enter_context(patch.object(rate_service, "_rates", {}))
+        # The API's lifespan isn't run, so process webhooks with a queue owned by this loop
+        webhook_queue = WebhookQueue(webhooks_api.webhook_queue.handlers)
+        patches.enter_context(patch.object(webhooks_api, "webhook_queue", webhook_queue))
+        webhook_queue.start()
+        
+        # One receiving address watched by one hook, as in production
+        client = BlockCypherClient(BLOCKCYPHER_CHAINS[currency], "loadtest", http)
+        address = (await client.create_payment_address())["address"]
+        patches.enter_context(patch.object(settings, f"{currency}_wallet_address", address))
+        hook_id = await client.create_webhook(address, WEBHOOK_URL)
+        
+        cog = build_cog(http)
+        cog.rate_prefetcher.start()
+        jobs: asyncio.Queue = asyncio.Queue()
+        for i in range(payments):
+            jobs.put_nowait(10 ** 17 + i)
+        
+        # Held while a payment is linked to its tx, so no block is mined before the link is committed
+        chain_lock = asyncio.Lock()
+        
+        async def miner():
+            while True:
+                await asyncio.sleep(block_interval)
+                async with chain_lock:
+                    await emulator.mine()
+        
+        async def watcher():
+            while True:
+                await asyncio.sleep(0.01)
+                if not waiting:
+                    continue
+                async with get_db_session() as session:
+                    result = await session.execute(
+                        select(Payment.id).where(
+                            Payment.id.in_(list(waiting)),
+                            Payment.status == PaymentStatus.COMPLETED
+                        )
+                    )
+                    done = result.scalars().all()
+                now = time.perf_counter()
+                for payment_id in done:
+                    started, future = waiting.pop(payment_id)
+                    end_to_end.append(now - started)
+                    future.set_result(None)
+        
+        async def pay(user_id: int):
+            interaction = LoadInteraction(user_id)
+            started = time.perf_counter()
+            await Payments.pay.callback(cog, interaction, currency, amount_usd)
+            pay_latency.append(time.perf_counter() - started)
+            
+            async with chain_lock, get_db_session() as session:
+                result = await session.execute(select(Payment).where(Payment.user_id == str(user_id)))
+                payment = result.scalar_one_or_none()
+                if payment is None:
+                    outcomes["pay_failed"] += 1
+                    return
+                # The customer pays; the tx is linked to the payment it settles
+                payment.transaction_id = emulator.send(payment.wallet_address, payment.amount_crypto)
+            
+            future = asyncio.get_running_loop().create_future()
+            waiting[payment.id] = (started, future)
+            try:
+                await asyncio.wait_for(future, timeout)
+                outcomes["completed"] += 1
+            except asyncio.TimeoutError:
+                waiting.pop(payment.id, None)
+                outcomes["timed_out"] += 1
+        
+        async def user():
+            while not jobs.empty():
+                await pay(jobs.get_nowait())
+        
+        background = [asyncio.create_task(miner()), asyncio.create_task(watcher())]
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            elapsed = time.monotonic() - started
+            balance = await client.get_address_balance(address)
+            await client.delete_webhook(hook_id)
+        finally:
+            cog.rate_prefetcher.cancel()
+            webhook_queue.stop()
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            await api.aclose()
+            await http.close()
+            await server.close()
+            await engine.dispose()
+    
+    return {
+        "payments": payments,
+        "concurrency": concurrency,
+        "currency": currency,
+        "confirmations": confirmations or settings.payment_confirmation_blocks,
+        "elapsed_seconds": round(elapsed, 3),
+        "completed": outcomes["completed"],
+        "timed_out": outcomes["timed_out"],
+        "pay_failed": outcomes["pay_failed"],
+        "payments_per_second": round(outcomes["completed"] / elapsed, 2) if elapsed else 0.0,
+        "pay_latency": summarize(pay_latency),
+        "webhook_latency": summarize(webhook_latency),
+        "end_to_end_latency": summarize(end_to_end),
+        "address_balance": balance,
+        "database_pool": pool_stats.snapshot(),
+        "webhook_queue": webhook_queue.metrics(),
+        "emulator": emulator.metrics()
+    }
+
+
+def main():
+    """Run the load test from the command line and print the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--payments", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--currency", choices=("btc", "ltc"), default="btc")
+    parser.add_argument("--amount-usd", type=float, default=10.0)
+    parser.add_argument("--block-interval", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.0, 0.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--confirmations", type=int)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    
+    # Per-request logs would dominate the run
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("GPSkilledGuardian").setLevel(logging.WARNING)
+    
+    report = asyncio.run(run_load_test(
+        payments=args.payments,
+        concurrency=args.concurrency,
+        currency=args.currency,
+        amount_usd=args.amount_usd,
+        block_interval=args.block_interval,
+        latency=tuple(args.latency),
+        failure_rate=args.failure_rate,
+        confirmations=args.confirmations,
+        timeout=args.timeout,
+        seed=args.seed
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""In-process emulator for the BlockCypher and Coinbase APIs the bot uses.
+
+Serves the endpoints ``crypto_payments.py`` and ``exchange_rates.py`` call
+(address creation, transaction and balance lookups including ``;`` batches,
+webhook hooks, and Coinbase exchange rates) from in-memory state. Tests and
+load runs move money with ``send`` and advance the chain with ``mine``,
+which delivers ``tx-confirmation`` hooks the way BlockCypher does.
+
+Point the bot at it with ``BLOCKCYPHER_BASE_URL=<url>/v1`` and
+``COINBASE_API_URL=<url>/v2/exchange-rates``.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import string
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple, List, Callable, Awaitable
+import aiohttp
+from aiohttp import web
+
+# Coin prefixes for generated addresses
+ADDRESS_PREFIXES = {"btc": "1", "ltc": "L", "doge": "D", "dash": "X", "bcy": "C"}
+
+DEFAULT_RATES = {"BTC": 65000.0, "LTC": 80.0, "DOGE": 0.15, "DASH": 30.0, "ETH": 3000.0}
+
+# Delivers one hook: (url, headers, body) -> HTTP status
+Deliver = Callable[[str, Dict[str, str], bytes], Awaitable[int]]
+
+
+class MockBlockCypher:
+    """In-memory chains, hooks and exchange rates behind one aiohttp app."""
+    
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        latency: Tuple[float, float] = (0.0, 0.0),
+        failure_rate: float = 0.0,
+        deliver: Optional[Deliver] = None,
+        seed: Optional[int] = None
+    ):
+        """Initialize emulator.
+        
+        Args:
+            rates: USD price per currency code
+            latency: Range of seconds added to every API request
+            failure_rate: Chance an API request returns 500
+            deliver: Sends hook callbacks (defaults to an HTTP POST)
+            seed: Seed for addresses, hashes, latencies and failures
+        """
+        self.rates = dict(rates or DEFAULT_RATES)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.deliver = deliver or self._post
+        self.url: Optional[str] = None  # Set by whoever serves the app
+        self.height = 800_000
+        self.addresses: Dict[str, Dict[str, Any]] = {}
+        self.txs: Dict[str, Dict[str, Any]] = {}
+        self.hooks: Dict[str, Dict[str, Any]] = {}
+        self.requests: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.deliveries: Counter = Counter()
+        self._random = random.Random(seed)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        self.app = web.Application(middlewares=[self._simulate])
+        self.app.router.add_post("/v1/{coin}/{network}/addrs", self.create_address)
+        self.app.router.add_get("/v1/{coin}/{network}/addrs/{addresses}/balance", self.balance)
+        self.app.router.add_get("/v1/{coin}/{network}/txs/{hashes}", self.get_txs)
+        self.app.router.add_post("/v1/{coin}/{network}/hooks", self.create_hook)
+        self.app.router.add_get("/v1/{coin}/{network}/hooks/{hook_id}", self.get_hook)
+        self.app.router.add_delete("/v1/{coin}/{network}/hooks/{hook_id}", self.delete_hook)
+        self.app.router.add_get("/v2/exchange-rates", self.exchange_rates)
+        self.app.on_cleanup.append(self._close)
+    
+    @web.middleware
+    async def _simulate(self, request: web.Request, handler):
+        """Count the request by route, add latency and inject failures."""
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.requests[f"{request.method} {route}"] += 1
+        
+        low, high = self.latency
+        if high > 0:
+            await asyncio.sleep(self._random.uniform(low, high))
+        if self._random.random() < self.failure_rate:
+            self.failures[f"{request.method} {route}"] += 1
+            return web.json_response({"error": "Injected failure"}, status=500)
+        return await handler(request)
+    
+    def _token(self, length: int, alphabet: str = string.ascii_letters + string.digits) -> str:
+        """Generate a random identifier."""
+        return "".join(self._random.choice(alphabet) for _ in range(length))
+    
+    def new_address(self, chain: str = "btc/main") -> str:
+        """Create an address without going through the API.
+        
+        Args:
+            chain: ``coin/network``
+            
+        Returns:
+            New address
+        """
+        coin = chain.split("/")[0]
+        address = ADDRESS_PREFIXES.get(coin, "1") + self._token(33)
+        self.addresses[address] = {"chain": chain, "balance": 0, "unconfirmed_balance": 0, "txrefs": []}
+        return address
+    
+    def send(self, address: str, amount: float, decimals: int = 8) -> str:
+        """Broadcast a payment to an address; it is unconfirmed until mined.
+        
+        Args:
+            address: Receiving address
+            amount: Whole coins
+            decimals: Base units per coin as a power of ten
+            
+        Returns:
+            Transaction hash
+        """
+        entry = self.addresses.setdefault(
+            address, {"chain": "btc/main", "balance": 0, "unconfirmed_balance": 0, "txrefs": []}
+        )
+        value = round(amount * 10 ** decimals)
+        tx_hash = hashlib.sha256(f"{address}:{value}:{self._token(16)}".encode()).hexdigest()
+        self.txs[tx_hash] = {
+            "hash": tx_hash,
+            "block_height": -1,
+            "confirmations": 0,
+            "total": value,
+            "addresses": [address],
+            "outputs": [{"value": value, "addresses": [address]}],
+            "received": datetime.utcnow().isoformat() + "Z"
+        }
+        entry["unconfirmed_balance"] += value
+        entry["txrefs"].append(tx_hash)
+        return tx_hash
+    
+    async def mine(self, blocks: int = 1) -> List[int]:
+        """Mine blocks and deliver tx-confirmation hooks.
+        
+        Every mined block adds a confirmation to every transaction. A hook
+        fires for each of its address's transactions until they reach the
+        hook's ``confirmations``.
+        
+        Args:
+            blocks: Blocks to mine
+            
+        Returns:
+            HTTP statuses of the hook deliveries
+        """
+        statuses: List[int] = []
+        for _ in range(blocks):
+            self.height += 1
+            deliveries = []
+            for tx in self.txs.values():
+                if tx["block_height"] < 0:
+                    tx["block_height"] = self.height
+                    for address in tx["addresses"]:
+                        entry = self.addresses[address]
+                        entry["unconfirmed_balance"] -= tx["total"]
+                        entry["balance"] += tx["total"]
+                tx["confirmations"] = self.height - tx["block_height"] + 1
+                
+                for hook in self.hooks.values():
+                    if (
+                        hook["event"] == "tx-confirmation"
+                        and hook["address"] in tx["addresses"]
+                        and tx["confirmations"] <= hook["confirmations"]
+                    ):
+                        deliveries.append(self._fire(hook, tx))
+            statuses.extend(await asyncio.gather(*deliveries))
+        return statuses
+    
+    async def _fire(self, hook: Dict[str, Any], tx: Dict[str, Any]) -> int:
+        """Deliver one hook callback."""
+        headers = {
+            "Content-Type": "application/json",
+            "X-EventType": hook["event"],
+            "X-EventId": hook["id"]
+        }
+        try:
+            status = await self.deliver(hook["url"], headers, json.dumps(tx).encode())
+        except Exception:
+            status = 0
+        self.deliveries[status] += 1
+        return status
+    
+    async def _post(self, url: str, headers: Dict[str, str], body: bytes) -> int:
+        """Deliver a hook over HTTP."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.post(url, data=body, headers=headers) as response:
+            return response.status
+    
+    async def _close(self, app: web.Application):
+        """Close the hook delivery session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def create_address(self, request: web.Request) -> web.Response:
+        """POST /v1/{coin}/{network}/addrs"""
+        chain = f"{request.match_info['coin']}/{request.match_info['network']}"
+        address = self.new_address(chain)
+        return web.json_response(
+            {"address": address, "private": self._token(64, "0123456789abcdef"),
+             "public": self._token(66, "0123456789abcdef"), "wif": self._token(52)},
+            status=201
+        )
+    
+    async def balance(self, request: web.Request) -> web.Response:
+        """GET /v1/{coin}/{network}/addrs/{a;b;...}/balance"""
+        found = []
+        for address in request.match_info["addresses"].split(";"):
+            entry = self.addresses.get(address)
+            if entry is not None:
+                found.append({
+                    "address": address,
+                    "balance": entry["balance"],
+                    "unconfirmed_balance": entry["unconfirmed_balance"],
+                    "final_balance": entry["balance"] + entry["unconfirmed_balance"],
+                    "n_tx": len(entry["txrefs"])
+                })
+        return self._one_or_many(request.match_info["addresses"], found)
+    
+    async def get_txs(self, request: web.Request) -> web.Response:
+        """GET /v1/{coin}/{network}/txs/{h1;h2;...}"""
+        hashes = request.match_info["hashes"]
+        return self._one_or_many(hashes, [self.txs[h] for h in hashes.split(";") if h in self.txs])
+    
+    @staticmethod
+    def _one_or_many(spec: str, found: List[Dict[str, Any]]) -> web.Response:
+        """Answer a single lookup with an object and a batch with a list."""
+        if ";" in spec:
+            return web.json_response(found)
+        if not found:
+            return web.json_response({"error": "Not found"}, status=404)
+        return web.json_response(found[0])
+    
+    async def create_hook(self, request: web.Request) -> web.Response:
+        """POST /v1/{coin}/{network}/hooks"""
+        data = await request.json()
+        hook = {
+            "id": self._token(36, string.ascii_lowercase + string.digits),
+            "event": data.get("event"),
+            "address": data.get("address"),
+            "url": data.get("url"),
+            "confirmations": min(int(data.get("confirmations", 6)), 10)
+        }
+        self.hooks[hook["id"]] = hook
+        return web.json_response(hook, status=201)
+    
+    async def get_hook(self, request: web.Request) -> web.Response:
+        """GET /v1/{coin}/{network}/hooks/{id}"""
+        hook = self.hooks.get(request.match_info["hook_id"])
+        if hook is None:
+            return web.json_response({"error": "Not found"}, status=404)
+        return web.json_response(hook)
+    
+    async def delete_hook(self, request: web.Request) -> web.Response:
+        """DELETE /v1/{coin}/{network}/hooks/{id}"""
+        if self.hooks.pop(request.match_info["hook_id"], None) is None:
+            return web.json_response({"error": "Not found"}, status=404)
+        return web.Response(status=204)
+    
+    async def exchange_rates(self, request: web.Request) -> web.Response:
+        """GET /v2/exchange-rates?currency=USD"""
+        rates = {code: str(1 / price) for code, price in self.rates.items()}
+        rates["USD"] = "1"
+        return web.json_response({"data": {"currency": request.query.get("currency", "USD"), "rates": rates}})
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get request, injected-failure and hook delivery counts.
+        
+        Returns:
+            Dict of counters
+        """
+        return {
+            "requests": dict(self.requests),
+            "failures": dict(self.failures),
+            "hook_deliveries": {str(status): count for status, count in self.deliveries.items()},
+            "height": self.height
+        }
@@ -0,0 +1,227 @@
+"""Local stand-in for the RuneLite plugin's HTTP API.
+
+Simulates one logged-in game client: world hops, a trade partner who opens
+the window and accepts after a delay, screenshots and the ``/events``
+stream. Every request can be slowed down and made to fail at random, so
+trade automation can be exercised and benchmarked without a game client.
+
+Run it on its own to point the bot at it::
+    
+    python -m tests.mock_runelite --port 9001 --latency 0.01 0.05 --failure-rate 0.02
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+from collections import Counter
+from typing import Optional, Dict, Any, Tuple, List
+from aiohttp import web
+
+
+class MockRuneLitePlugin:
+    """In-process fake of one RuneLite client running the plugin."""
+    
+    def __init__(
+        self,
+        latency: Tuple[float, float] = (0.0, 0.0),
+        failure_rate: float = 0.0,
+        hop_delay: float = 0.05,
+        window_delay: float = 0.05,
+        accept_delay: float = 0.1,
+        decline_rate: float = 0.0,
+        screenshot_size: int = 200_000,
+        stream: bool = True,
+        heartbeat_interval: float = 5.0,
+        world: int = 301,
+        seed: Optional[int] = None
+    ):
+        """Initialize mock plugin.
+        
+        Args:
+            latency: Range of seconds added to every request
+            failure_rate: Chance a request (other than /events) returns 500
+            hop_delay: Seconds a world hop takes
+            window_delay: Seconds until the player opens the trade window
+            accept_delay: Seconds until the player accepts each trade screen (or declines)
+            decline_rate: Chance the player declines instead of accepting
+            screenshot_size: Bytes returned by /screenshot
+            stream: Serve the /events push stream
+            heartbeat_interval: Seconds between heartbeats on /events
+            world: Starting world
+            seed: Seed for latencies and failures
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.hop_delay = hop_delay
+        self.window_delay = window_delay
+        self.accept_delay = accept_delay
+        self.decline_rate = decline_rate
+        self.screenshot_size = screenshot_size
+        self.heartbeat_interval = heartbeat_interval
+        self.world = world
+        self.trade: Dict[str, Any] = {"status": "no_trade"}
+        self.requests: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.chat: List[Dict[str, Any]] = []
+        self._random = random.Random(seed)
+        self._listeners: List[asyncio.Queue] = []
+        
+        self.app = web.Application(middlewares=[self._simulate])
+        self.app.router.add_get("/status", self.status)
+        self.app.router.add_get("/world", self.get_world)
+        self.app.router.add_post("/world/hop", self.hop)
+        self.app.router.add_post("/trade/request", self.trade_request)
+        self.app.router.add_post("/trade/offer", self.trade_offer)
+        self.app.router.add_post("/trade/accept", self.trade_accept)
+        self.app.router.add_get("/trade/status", self.trade_status)
+        self.app.router.add_get("/screenshot", self.screenshot)
+        self.app.router.add_post("/chat/send", self.chat_send)
+        if stream:
+            self.app.router.add_get("/events", self.events)
+    
+    @web.middleware
+    async def _simulate(self, request: web.Request, handler):
+        """Count the request, add latency and inject failures."""
+        self.requests[request.path] += 1
+        if request.path == "/events":
+            return await handler(request)
+        
+        low, high = self.latency
+        if high > 0:
+            await asyncio.sleep(self._random.uniform(low, high))
+        if self._random.random() < self.failure_rate:
+            self.failures[request.path] += 1
+            return web.json_response({"error": "Injected failure"}, status=500)
+        return await handler(request)
+    
+    def _later(self, delay: float, callback, *args, **kwargs):
+        """Run a state change after a simulated delay."""
+        asyncio.get_running_loop().call_later(delay, functools.partial(callback, *args, **kwargs))
+    
+    def _push(self, event: Dict[str, Any]):
+        """Send an event to every /events listener."""
+        for queue in self._listeners:
+            queue.put_nowait(event)
+    
+    def _set_world(self, world: int):
+        """Finish a world hop."""
+        self.world = world
+        self._push({"type": "world", "world": world})
+    
+    def _set_trade(self, status: str, **fields):
+        """Move the trade to a new status."""
+        self.trade = {"status": status, **fields}
+        self._push({"type": "trade", **self.trade})
+    
+    def _player_responds(self):
+        """Complete or decline the trade on the player's side."""
+        declined = self._random.random() < self.decline_rate
+        self._set_trade("declined" if declined else "completed", partner=self.trade.get("partner"))
+    
+    async def status(self, request: web.Request) -> web.Response:
+        """GET /status"""
+        return web.json_response({"status": "connected", "world": self.world})
+    
+    async def get_world(self, request: web.Request) -> web.Response:
+        """GET /world"""
+        return web.json_response({"world": self.world})
+    
+    async def hop(self, request: web.Request) -> web.Response:
+        """POST /world/hop"""
+        world = int((await request.json())["world"])
+        self._later(self.hop_delay, self._set_world, world)
+        return web.json_response({"success": True})
+    
+    async def trade_request(self, request: web.Request) -> web.Response:
+        """POST /trade/request"""
+        rsn = (await request.json())["rsn"]
+        self._set_trade("requested", partner=rsn)
+        self._later(self.window_delay, self._set_trade, "open", partner=rsn)
+        return web.json_response({"success": True})
+    
+    async def trade_offer(self, request: web.Request) -> web.Response:
+        """POST /trade/offer"""
+        amount = int((await request.json())["amount"])
+        self._set_trade("offered", partner=self.trade.get("partner"), amount=amount)
+        return web.json_response({"success": True})
+    
+    async def trade_accept(self, request: web.Request) -> web.Response:
+        """POST /trade/accept"""
+        if self.trade.get("status") == "confirming":
+            self._later(self.accept_delay, self._player_responds)
+        else:
+            self._set_trade("accepted", partner=self.trade.get("partner"))
+            self._later(self.accept_delay, self._set_trade, "confirming", partner=self.trade.get("partner"))
+        return web.json_response({"success": True})
+    
+    async def trade_status(self, request: web.Request) -> web.Response:
+        """GET /trade/status"""
+        return web.json_response(self.trade)
+    
+    async def screenshot(self, request: web.Request) -> web.Response:
+        """GET /screenshot"""
+        return web.Response(body=os.urandom(self.screenshot_size), content_type="image/png")
+    
+    async def chat_send(self, request: web.Request) -> web.Response:
+        """POST /chat/send"""
+        self.chat.append(await request.json())
+        return web.json_response({"success": True})
+    
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        """GET /events: NDJSON hello, state changes and heartbeats."""
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait({"type": "hello", "world": self.world, "trade": self.trade})
+        self._listeners.append(queue)
+        
+        response = web.StreamResponse()
+        response.content_type = "application/x-ndjson"
+        await response.prepare(request)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    event = {"type": "heartbeat"}
+                await response.write(json.dumps(event).encode() + b"\n")
+        finally:
+            self._listeners.remove(queue)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Get request and injected-failure counts.
+        
+        Returns:
+            Dict of per-path counts
+        """
+        return {
+            "requests": dict(self.requests),
+            "failures": dict(self.failures),
+            "total_requests": sum(self.requests.values())
+        }
+
+
+def main():
+    """Serve the mock plugin until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.0, 0.0), metavar=("MIN", "MAX"))
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--decline-rate", type=float, default=0.0)
+    parser.add_argument("--accept-delay", type=float, default=2.0)
+    parser.add_argument("--no-stream", action="store_true", help="Don't serve /events")
+    args = parser.parse_args()
+    
+    plugin = MockRuneLitePlugin(
+        latency=tuple(args.latency),
+        failure_rate=args.failure_rate,
+        decline_rate=args.decline_rate,
+        accept_delay=args.accept_delay,
+        stream=not args.no_stream
+    )
+    web.run_app(plugin.app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,677 @@
 """Test suite for GPSkilledGuardian bot."""
 import pytest
+import pytest_asyncio
 import asyncio
+import hashlib
+import hmac
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
 from datetime import datetime, timedelta
-from bot.models import Payment, PaymentStatus, PaymentType, User
-from bot.utils.crypto_payments import CryptoRateConverter
-from bot.utils.osrs_payments import OSRSGPPaymentProcessor
+from bot.models import Payment, PaymentStatus, PaymentType, User, OSRSTrade, TradeStage
+from bot.utils.confirmations import ConfirmationPoller, apply_confirmations
+from bot.utils.crypto_payments import (
+    CryptoRateConverter,
+    rate_service,
+    BlockCypherClient,
+    LitecoinPaymentProcessor,
+    parse_chains,
+    build_chain_clients
+)
+from bot.utils.osrs_payments import (
+    OSRSGPPaymentProcessor,
+    RuneLitePluginClient,
+    OSRSTradeAutomation,
+    TradeResult
+)
+from bot.utils.trade_queue import TradeQueue, TradeWorker
+from bot.utils.runelite_pool import RuneLitePool, PooledClient, parse_clients
+from bot.utils.trade_batches import plan_batches, count_hops
+from bot.utils.screenshots import ScreenshotStore
+from bot.database import PoolStats, create_engine, engine_options
+import bot.database
+from bot.migrations import migrate, downgrade, head, v0001_initial
+from bot.models import Base, WebhookLog, WebhookLogArchive
+from tests.bench_trades import run_benchmark, summarize
+from tests.load_payments import run_load_test
+from bot.cogs.payments import Payments
+from api.routers import webhooks as webhooks_api
+from bot.utils.webhook_queue import WebhookQueue
+from bot.utils.webhook_replay import replay
+from bot.utils.webhook_retention import WebhookRetention, read_archive
+from bot.utils.service_health import publish_health
+import httpx
+from config import settings
+from sqlalchemy import select, text, event, inspect, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from bot.utils.http_client import HTTPClient, HTTPClientStats
+from bot.utils.rate_limiter import TokenBucket, RateLimiterRegistry, parse_retry_after
+from bot.utils.hiscores import HiscoresClient, HiscoresCache, PlayerStats, normalize_rsn
+from bot.utils.resilience import CircuitBreaker, CircuitOpenError
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from bot.utils.exchange_rates import (
+    ExchangeRateService,
+    CachedRate,
+    RateCacheStats,
+    StaticRateProvider,
+    CoinbaseRateProvider,
+    crypto_currencies
+)
 
 
 class TestCryptoRateConverter:
     """Test cryptocurrency rate conversion."""
     
+    @pytest_asyncio.fixture(autouse=True)
+    async def coinbase(self, blockcypher, monkeypatch):
+        """Quote from the emulated Coinbase API."""
+        http = HTTPClient(limiters=RateLimiterRegistry(""))
+        provider = CoinbaseRateProvider(f"{blockcypher.url}/v2/exchange-rates", http)
+        module = sys.modules[CryptoRateConverter.__module__]
+        monkeypatch.setattr(module, "rate_service", ExchangeRateService(provider))
+        yield blockcypher
+        await http.close()
+    
     @pytest.mark.asyncio
     async def test_get_btc_rate(self):
         """Test getting BTC rate."""
         rate = await CryptoRateConverter.get_btc_rate()
-        assert rate is None or rate > 0, "BTC rate should be positive or None"
+        assert rate == pytest.approx(65000.0), "BTC rate should match the Coinbase quote"
     
     @pytest.mark.asyncio
     async def test_get_ltc_rate(self):
         """Test getting LTC rate."""
         rate = await CryptoRateConverter.get_ltc_rate()
-        assert rate is None or rate > 0, "LTC rate should be positive or None"
+        assert rate == pytest.approx(80.0), "LTC rate should match the Coinbase quote"
     
     @pytest.mark.asyncio
-    async def test_usd_to_btc(self):
+    async def test_usd_to_btc(self, coinbase):
         """Test USD to BTC conversion."""
         btc_amount = await CryptoRateConverter.usd_to_btc(100)
-        assert btc_amount is None or btc_amount > 0, "BTC amount should be positive or None"
+        assert btc_amount == pytest.approx(100 / 65000.0), "BTC amount should use the quoted rate"
+        assert coinbase.requests["GET /v2/exchange-rates"] == 1
+
+
+class SlowRateProvider(StaticRateProvider):
+    """Static provider that takes a moment to answer."""
+    
+    async def fetch_rates(self, currencies):
+        await asyncio.sleep(0.01)
+        return await super().fetch_rates(currencies)
+
+
+class TestRateLimiter:
+    """Test client-side rate limiting."""
+    
+    @pytest.mark.asyncio
+    async def test_bucket_queues_callers(self):
+        """Test callers beyond the burst wait for refilled tokens."""
+        bucket = TokenBucket(rate=100, capacity=2)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+        
+        assert time.monotonic() - started >= 0.015
+        assert bucket.stats.acquired == 4
+        assert bucket.stats.waited >= 2
+        assert bucket.queue_depth == 0
+    
+    def test_parse_retry_after(self):
+        """Test Retry-After seconds and invalid values."""
+        assert parse_retry_after("2") == 2.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_throttled_request_is_retried(self):
+        """Test a 429 pauses the host bucket and the request is queued again."""
+        hits = []
+        
+        async def handler(request):
+            hits.append(request.path)
+            if len(hits) == 1:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            return web.json_response({"ok": True})
+        
+        app = web.Application()
+        app.router.add_get("/", handler)
+        async with TestServer(app, host="127.0.0.1") as server:
+            host = f"127.0.0.1:{server.port}"
+            client = HTTPClient(limiters=RateLimiterRegistry(f"{host}=50/1"))
+            try:
+                async with client.request("GET", str(server.make_url("/"))) as response:
+                    assert response.status == 200
+            finally:
+                await client.close()
+        
+        assert len(hits) == 2
+        assert client.limiters.get(host).stats.throttled == 1
+
+
+class TestResilience:
+    """Test retries and circuit breaking."""
+    
+    def test_breaker_opens_and_recovers(self):
+        """Test the breaker fails fast after repeated failures and half-opens later."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        
+        time.sleep(0.06)
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    @pytest.mark.asyncio
+    async def test_get_retried_then_breaker_opens(self, monkeypatch):
+        """Test idempotent GETs retry 5xx and an open breaker fails fast."""
+        monkeypatch.setattr(sys.modules[HTTPClient.__module__], "retry_delay", lambda attempt: 0)
+        hits = []
+        
+        async def handler(request):
+            hits.append(request.method)
+            return web.Response(status=503 if len(hits) < 2 else 200)
+        
+        app = web.Application()
+        app.router.add_route("*", "/", handler)
+        async with TestServer(app, host="127.0.0.1") as server:
+            client = HTTPClient(limiters=RateLimiterRegistry(""))
+            url = str(server.make_url("/"))
+            try:
+                async with client.request("GET", url, retries=2) as response:
+                    assert response.status == 200
+                assert len(hits) == 2
+                
+                breaker = client.breakers.get(f"127.0.0.1:{server.port}")
+                assert breaker is not client.breakers.get(f"127.0.0.1:{server.port + 1}")
+                breaker.failure_threshold = 1
+                breaker.record_failure()
+                with pytest.raises(CircuitOpenError):
+                    async with client.request("POST", url):
+                        pass
+                assert len(hits) == 2
+            finally:
+                await client.close()
+
+
+class TestExchangeRateService:
+    """Test cached exchange rate service."""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self):
+        """Test concurrent misses are coalesced into one fetch."""
+        provider = SlowRateProvider({"BTC": 50000.0, "LTC": 80.0})
+        service = ExchangeRateService(provider, ttl=30, max_staleness=300)
+        rates = await asyncio.gather(*(service.get_rate("BTC") for _ in range(20)))
+        
+        assert rates == [50000.0] * 20
+        assert provider.calls == 1
+        assert service.stats.coalesced == 19
+        
+        assert await service.get_rate("btc") == 50000.0
+        assert service.stats.hits == 1
+    
+    @pytest.mark.asyncio
+    async def test_one_fetch_serves_all_currencies(self):
+        """Test a single provider call fans out to every tracked currency."""
+        provider = StaticRateProvider({"BTC": 50000.0, "LTC": 80.0})
+        service = ExchangeRateService(provider, ttl=30, max_staleness=300)
+        
+        assert await service.get_rate("BTC") == 50000.0
+        assert await service.get_rate("LTC") == 80.0
+        assert await service.get_rates() == {"BTC": 50000.0, "LTC": 80.0}
+        assert provider.calls == 1
+    
+    def test_crypto_currencies_follow_payment_types(self):
+        """Test supported currencies are derived from PaymentType."""
+        assert crypto_currencies() == ["BTC", "LTC"]
+    
+    @pytest.mark.asyncio
+    async def test_refuses_rate_past_max_staleness(self):
+        """Test a stale rate is not quoted when the refresh fails."""
+        provider = StaticRateProvider({})
+        service = ExchangeRateService(provider, ttl=0, max_staleness=0, currencies=["LTC"])
+        service._rates["LTC"] = CachedRate(rate=80.0, fetched_at=time.monotonic() - 60)
+        
+        assert await service.get_rate("LTC") is None
+        assert service.stats.rejected_stale == 1
+        assert service.stats.refresh_failures == 1
+    
+    @pytest.mark.asyncio
+    async def test_stops_tracking_unknown_currencies(self):
+        """Test an on-demand currency is kept only if the provider can quote it."""
+        provider = StaticRateProvider({"BTC": 50000.0, "DOGE": 0.15})
+        service = ExchangeRateService(provider, ttl=30, max_staleness=300, currencies=["BTC"])
+        
+        assert await service.get_rate("NOPE") is None
+        assert await service.get_rate("DOGE") == 0.15
+        assert service.currencies == ["BTC", "DOGE"]
+        assert service.stats.refresh_failures == 1
+        
+        await service.refresh()
+        assert service.stats.refresh_failures == 1
+
+
+class TestRateQuote:
+    """Test /pay quotes from prefetched rates and falls back to fetching inline."""
+    
+    @pytest.fixture
+    def provider(self, monkeypatch):
+        """Serve BTC from a static provider through the shared rate service."""
+        provider = StaticRateProvider({"BTC": 50000.0})
+        monkeypatch.setattr(rate_service, "provider", provider)
+        monkeypatch.setattr(rate_service, "_rates", {})
+        monkeypatch.setattr(rate_service, "stats", RateCacheStats())
+        monkeypatch.setattr(rate_service, "ttl", 30)
+        monkeypatch.setattr(rate_service, "max_staleness", 300)
+        return provider
+    
+    @staticmethod
+    def cog(monkeypatch, healthy):
+        """Payments cog whose prefetcher reports the given health."""
+        monkeypatch.setattr(Payments, "rate_prefetcher_healthy", property(lambda self: healthy))
+        return Payments.__new__(Payments)
+    
+    @pytest.mark.asyncio
+    async def test_quotes_prefetched_rate(self, provider, monkeypatch, caplog):
+        """Test a fresh prefetched rate is quoted from memory."""
+        rate_service._rates["BTC"] = CachedRate(rate=49000.0, fetched_at=time.monotonic())
+        
+        quote = await self.cog(monkeypatch, healthy=True).get_rate_quote("BTC")
+        
+        assert quote.rate == 49000.0
+        assert provider.calls == 0 and rate_service.stats.hits == 0
+        assert "unhealthy" not in caplog.text
+    
+    @pytest.mark.asyncio
+    async def test_fetches_inline_past_max_staleness(self, provider, monkeypatch, caplog):
+        """Test a stale prefetched rate is refetched without blaming the prefetcher."""
+        rate_service._rates["BTC"] = CachedRate(rate=49000.0, fetched_at=time.monotonic() - 600)
+        
+        quote = await self.cog(monkeypatch, healthy=True).get_rate_quote("BTC")
+        
+        assert quote.rate == 50000.0
+        assert provider.calls == 1
+        assert "unhealthy" not in caplog.text
+    
+    @pytest.mark.asyncio
+    async def test_fetches_inline_when_prefetcher_unhealthy(self, provider, monkeypatch, caplog):
+        """Test the quote goes through the rate service when the prefetcher is down."""
+        rate_service._rates["BTC"] = CachedRate(rate=49000.0, fetched_at=time.monotonic())
+        
+        quote = await self.cog(monkeypatch, healthy=False).get_rate_quote("BTC")
+        
+        assert quote.rate == 49000.0
+        assert rate_service.stats.hits == 1
+        assert "Rate prefetcher unhealthy, fetching BTC rate inline" in caplog.text
+
+
+class TestBlockCypherClient:
+    """Test generic BlockCypher chain client."""
+    
+    def test_parse_chains(self):
+        """Test chains are configured from registry keys or coin/network specs."""
+        chains = parse_chains("btc, ltc,doge/main:DOGE,btc/test3:TBTC")
+        assert [c.path for c in chains] == ["btc/main", "ltc/main", "doge/main", "btc/test3"]
+        assert [c.symbol for c in chains] == ["BTC", "LTC", "DOGE", "TBTC"]
+        assert parse_chains("btc-test3")[0].path == "btc/test3"
+        
+        with pytest.raises(ValueError):
+            parse_chains("nonsense")
+        # Clients are looked up by symbol, so one chain would shadow the other
+        with pytest.raises(ValueError, match="btc/main and btc/test3 are both BTC"):
+            parse_chains("btc,btc-test3")
+    
+    def test_clients_share_budget_per_token(self):
+        """Test all chains on one API token share one request budget."""
+        clients = build_chain_clients("token", spec="btc,ltc")
+        assert set(clients) == {"BTC", "LTC"}
+        assert clients["BTC"].budget is clients["LTC"].budget
+        assert clients["LTC"].base_url.endswith("/ltc/main")
+    
+    def test_litecoin_has_webhooks(self):
+        """Test Litecoin gets the same webhook support as Bitcoin."""
+        assert hasattr(LitecoinPaymentProcessor("token"), "create_webhook")
+    
+    def test_batches_respect_cap(self):
+        """Test batch requests are split at the configured size."""
+        client = BlockCypherClient(parse_chains("btc")[0], "token")
+        client.batch_size = 2
+        assert client.batches(["a", "b", "c"]) == [["a", "b"], ["c"]]
+
+
+class FakeChainClient:
+    """Chain client stub answering batched transaction lookups."""
+    
+    def __init__(self, confirmations, batch_size=2):
+        self.confirmations = confirmations
+        self.batch_size = batch_size
+        self.requests = []
+    
+    def batches(self, items):
+        return [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+    
+    async def get_transactions(self, tx_hashes):
+        self.requests.append(list(tx_hashes))
+        return {h: {"hash": h, "confirmations": self.confirmations[h]} for h in tx_hashes}
+
+
+class TestBlockCypherEmulator:
+    """Test the chain clients and the payment flow against the BlockCypher emulator."""
+    
+    @pytest.mark.asyncio
+    async def test_client_endpoints(self, blockcypher):
+        """Test address creation, batched lookups and hooks round-trip."""
+        http = HTTPClient(limiters=RateLimiterRegistry(""))
+        client = BlockCypherClient(parse_chains("ltc")[0], "emulator", http)
+        try:
+            address = (await client.create_payment_address())["address"]
+            first = blockcypher.send(address, 0.5)
+            second = blockcypher.send(address, 0.25)
+            hook_id = await client.create_webhook(address, "http://127.0.0.1:1/unused")
+            blockcypher.hooks[hook_id]["confirmations"] = 0
+            await blockcypher.mine()
+            
+            txs = await client.get_transactions([first, second, "missing"])
+            assert set(txs) == {first, second}
+            assert txs[first]["confirmations"] == 1
+            assert (await client.check_transaction(second))["total"] == 25_000_000
+            assert await client.get_address_balances([address]) == {address: 0.75}
+            assert await client.delete_webhook(hook_id)
+        finally:
+            await http.close()
+        
+        assert address.startswith("L")
+        assert blockcypher.requests["GET /v1/{coin}/{network}/txs/{hashes}"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_pay_to_completion_load(self):
+        """Test concurrent /pay → webhook → completion runs end to end and is measured."""
+        report = await run_load_test(
+            payments=6, concurrency=3, block_interval=0.01, confirmations=2, timeout=10, seed=1
+        )
+        
+        assert report["completed"] == 6
+        assert report["timed_out"] == report["pay_failed"] == 0
+        assert report["end_to_end_latency"]["p99"] is not None
+        assert report["emulator"]["hook_deliveries"] == {"200": 12}
+        assert report["address_balance"] == pytest.approx(6 * 10.0 / 65000.0, abs=1e-7)
+
+
+class TestConfirmationPoller:
+    """Test batched confirmation polling."""
+    
+    @pytest.mark.asyncio
+    async def test_poll_batches_and_completes(self, db):
+        """Test confirming payments are looked up in batches and completed once."""
+        async with db() as session:
+            session.add(User(discord_id="1", username="buyer", total_payments=0, total_spent_usd=0.0))
+            for i, tx_hash in enumerate(["a", "b", "c"]):
+                session.add(Payment(
+                    user_id="1",
+                    username="buyer",
+                    payment_type=PaymentType.BTC,
+                    amount_usd=10.0,
+                    transaction_id=tx_hash,
+                    status=PaymentStatus.CONFIRMING,
+                    confirmations=0,
+                    expires_at=datetime.utcnow() + timedelta(minutes=30)
+                ))
+            await session.commit()
+        
+        client = FakeChainClient({"a": 1, "b": 6, "c": 6})
+        poller = ConfirmationPoller({"BTC": client})
+        batches = await poller.poll()
+        
+        assert client.requests == [["a", "b"], ["c"]]
+        assert [b.size for b in batches] == [2, 1]
+        assert poller.stats.payments_completed == 2
+        
+        async with db() as session:
+            user = await session.get(User, 1)
+            assert user.total_payments == 2
+            assert user.total_spent_usd == 20.0
+
+
+class FakeAutomation:
+    """Trade automation that records trades instead of running them."""
+    
+    def __init__(self, fail_rsns=(), delay=0):
+        self.fail_rsns = set(fail_rsns)
+        self.delay = delay
+        self.trades = []
+    
+    async def run_trade(self, rsn, gp_amount, world, location):
+        self.trades.append(rsn)
+        await asyncio.sleep(self.delay)
+        if rsn in self.fail_rsns:
+            return TradeResult(message="Trade was declined", stage=TradeStage.FAILED, failed_stage=TradeStage.COMPLETED)
+        return TradeResult(success=True, message="Trade completed successfully", stage=TradeStage.COMPLETED, finished_at=datetime.utcnow())
+
+
+class TestTradeQueue:
+    """Test the persistent trade queue."""
+    
+    @staticmethod
+    async def seed(db, trades, world=302):
+        """Add a user, one pending GP payment per trade and the trades."""
+        async with db() as session:
+            session.add(User(discord_id="1", username="buyer", total_payments=0, total_spent_usd=0.0))
+            for rsn, priority, payment_status in trades:
+                payment = Payment(
+                    user_id="1",
+                    username="buyer",
+                    payment_type=PaymentType.OSRS_GP,
+                    amount_usd=5.0,
+                    amount_gp=10_000_000,
+                    status=payment_status,
+                    expires_at=datetime.utcnow() + timedelta(minutes=30)
+                )
+                session.add(payment)
+                await session.flush()
+                session.add(OSRSTrade(
+                    payment_id=payment.id, user_id="1", rsn=rsn, gp_amount=10_000_000,
+                    world=world.get(rsn, 302) if isinstance(world, dict) else world,
+                    location="Grand Exchange", priority=priority
+                ))
+            await session.commit()
+    
+    @pytest.mark.asyncio
+    async def test_claims_in_priority_then_fifo_order(self, db):
+        """Test claim order, single hand-out and skipping dead payments."""
+        await self.seed(db, [
+            ("first", 0, PaymentStatus.PENDING),
+            ("expired", 0, PaymentStatus.EXPIRED),
+            ("second", 0, PaymentStatus.PENDING),
+            ("urgent", 5, PaymentStatus.PENDING)
+        ])
+        queue = TradeQueue()
+        
+        first = await queue.claim("w1")
+        assert first.rsn == "urgent"
+        assert first.claimed_by == "w1"
+        async with db() as session:
+            second = await session.get(OSRSTrade, 3)
+        assert await queue.position(second) == 2
+        async with db() as session:
+            await session.execute(
+                update(OSRSTrade).where(OSRSTrade.rsn == "first")
+                .values(created_at=second.created_at + timedelta(seconds=1))
+            )
+            await session.commit()
+        assert await queue.position(second) == 1
+        
+        claimed = await asyncio.gather(queue.claim("w1"), queue.claim("w2"))
+        assert sorted(t.rsn for t in claimed) == ["first", "second"]
+        assert await queue.claim("w1") is None
+        assert queue.stats.skipped == 1
+        
+        assert await queue.recover("w1") == 2
+        metrics = await queue.metrics()
+        assert metrics["depth"] == 0
+        assert metrics["in_progress"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_worker_drains_queue_and_completes_payments(self, db, monkeypatch):
+        """Test the worker runs trades one at a time and records outcomes."""
+        monkeypatch.setattr(settings, "trade_queue_poll_seconds", 0.01)
+        await self.seed(db, [("alice", 0, PaymentStatus.PENDING), ("bob", 0, PaymentStatus.PENDING)])
+        queue = TradeQueue()
+        automation = FakeAutomation(fail_rsns={"bob"})
+        completed = []
+        
+        async def on_complete(trade, result):
+            completed.append(trade.rsn)
+        
+        worker = TradeWorker(queue, automation, "w1", on_complete=on_complete)
+        worker.start()
+        try:
+            for _ in range(100):
+                if len(automation.trades) == 2 and worker.idle:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            worker.stop()
+        
+        assert automation.trades == ["alice", "bob"]
+        assert completed == ["alice"]
+        
+        async with db() as session:
+            trades = {t.rsn: t for t in (await session.execute(select(OSRSTrade))).scalars()}
+            assert trades["alice"].status == "completed"
+            assert trades["bob"].status == "failed"
+            assert trades["bob"].notes == "Failed at completed: Trade was declined"
+            assert (await session.get(Payment, trades["alice"].payment_id)).status == PaymentStatus.COMPLETED
+            assert (await session.get(Payment, trades["bob"].payment_id)).status == PaymentStatus.PENDING
+            assert (await session.get(User, 1)).total_payments == 1
+        
+        metrics = await queue.metrics()
+        assert metrics["trades_per_hour"] == 1.0
+        assert metrics["completed"] == 1 and metrics["failed"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_worker_survives_finish_and_callback_errors(self, db, monkeypatch):
+        """Test a failed finish fails the trade and neither error stops the worker."""
+        monkeypatch.setattr(settings, "trade_queue_poll_seconds", 0.01)
+        await self.seed(db, [("alice", 0, PaymentStatus.PENDING), ("bob", 0, PaymentStatus.PENDING)])
+        queue = TradeQueue()
+        automation = FakeAutomation()
+        finish = queue.finish
+        
+        async def flaky_finish(trade_id, result):
+            if len(automation.trades) == 1:
+                raise RuntimeError("database is locked")
+            await finish(trade_id, result)
+        
+        async def on_complete(trade, result):
+            raise RuntimeError("Discord is down")
+        
+        monkeypatch.setattr(queue, "finish", flaky_finish)
+        worker = TradeWorker(queue, automation, "w1", on_complete=on_complete)
+        worker.start()
+        try:
+            for _ in range(100):
+                if len(automation.trades) == 2 and worker.idle:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            worker.stop()
+        
+        assert automation.trades == ["alice", "bob"]
+        async with db() as session:
+            trades = {t.rsn: t for t in (await session.execute(select(OSRSTrade))).scalars()}
+            assert trades["alice"].status == "failed"
+            assert "database is locked" in trades["alice"].notes
+            assert trades["bob"].status == "completed"
+            assert (await session.get(Payment, trades["alice"].payment_id)).status == PaymentStatus.PENDING
+            assert (await session.get(Payment, trades["bob"].payment_id)).status == PaymentStatus.COMPLETED
+        assert queue.stats.failed == 1 and queue.stats.completed == 1
+
+
+class FakePoolPlugin:
+    """Plugin client stub reporting a fixed world."""
+    
+    def __init__(self, world, connected=True):
+        self.world = world
+        self.connected = connected
+        self.events = SimpleNamespace(connected=False, state={})
+    
+    async def is_connected(self):
+        return self.connected
+    
+    async def get_current_world(self):
+        return self.world
+
+
+class TestRuneLitePool:
+    """Test world-aware scheduling across RuneLite clients."""
+    
+    def test_parse_clients(self, monkeypatch):
+        """Test the client list and its single-client fallback."""
+        assert parse_clients("10.0.0.5:9001, 10.0.0.6:9002") == [("10.0.0.5", 9001), ("10.0.0.6", 9002)]
+        monkeypatch.setattr(settings, "runelite_plugin_host", "localhost")
+        monkeypatch.setattr(settings, "runelite_plugin_port", 9001)
+        assert parse_clients("") == [("localhost", 9001)]
+        with pytest.raises(ValueError):
+            parse_clients("no-port")
+    
+    @pytest.mark.asyncio
+    async def test_dispatch_prefers_world_then_least_used(self, db):
+        """Test trades go to idle healthy clients, same-world first."""
+        await TestTradeQueue.seed(db, [
+            ("a", 0, PaymentStatus.PENDING),
+            ("b", 0, PaymentStatus.PENDING),
+            ("c", 0, PaymentStatus.PENDING)
+        ], world={"a": 302, "b": 330, "c": 302})
+        queue = TradeQueue()
+        automations = {}
+        
+        def client(name, world, connected=True):
+            automations[name] = FakeAutomation(delay=0.05)
+            return PooledClient(FakePoolPlugin(world, connected), TradeWorker(queue, automations[name], name))
+        
+        pool = RuneLitePool(queue, [client("w330", 330), client("w302", 302), client("down", 302, False)])
+        await pool.check_health()
+        assert [c.name for c in pool.available()] == ["w330", "w302"]
+        
+        assert await pool.dispatch() == 2
+        assert await pool.dispatch() == 0
+        
+        while pool._running:
+            await asyncio.sleep(0.01)
+        assert await pool.dispatch() == 0
+        
+        # a and c ran back-to-back on w302 as one batch
+        assert automations["w302"].trades == ["a", "c"]
+        assert automations["w330"].trades == ["b"]
+        assert automations["down"].trades == []
+        metrics = pool.metrics()
+        assert metrics["hops_avoided"] == 3
+        assert metrics["batches_run"] == 2
+        assert metrics["hops_saved"] == 1
+        assert metrics["by_client"]["down"]["healthy"] is False
+    
+    def test_plan_batches(self):
+        """Test trades are grouped per world in queue order and split at the size cap."""
+        worlds = [302, 330, 302, 330, 302, 416]
+        trades = [
+            OSRSTrade(id=i, world=w, location="Grand Exchange") for i, w in enumerate(worlds)
+        ]
+        batches = plan_batches(trades, max_size=2)
+        
+        assert [(b.world, b.trade_ids) for b in batches] == [
+            (302, [0, 2]), (330, [1, 3]), (302, [4]), (416, [5])
+        ]
+        assert [b.hops_saved for b in batches] == [1, 1, 0, 0]
+        assert count_hops(worlds) - count_hops([b.world for b in batches]) == 2
 
 
 class TestOSRSGPPaymentProcessor:
@@ -54,6 +699,807 @@ class TestOSRSGPPaymentProcessor:
         assert isinstance(is_valid, bool), "Should return boolean"
 
 
+class TestHTTPClient:
+    """Test shared HTTP client."""
+    
+    def test_reuse_metrics(self):
+        """Test connection reuse ratio per host."""
+        stats = HTTPClientStats()
+        host = stats.host("api.blockcypher.com")
+        host.requests = 4
+        host.connections_created = 1
+        host.connections_reused = 3
+        
+        snapshot = stats.snapshot()
+        assert snapshot["api.blockcypher.com"]["reuse_ratio"] == 0.75
+        assert stats.host("api.coinbase.com").reuse_ratio == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_session_lifecycle(self):
+        """Test the pooled session is opened once and closed cleanly."""
+        client = HTTPClient(limit=10, limit_per_host=2)
+        session = await client.get_session()
+        assert client.is_open
+        assert await client.get_session() is session
+        
+        await client.close()
+        assert not client.is_open
+
+
+class TestHiscoresCache:
+    """Test cached hiscores lookups."""
+    
+    def test_normalize_rsn(self):
+        """Test names differing only in case and separators normalise equally."""
+        assert normalize_rsn("Lynx_Titan") == "lynx titan"
+        assert normalize_rsn("  LYNX-titan ") == "lynx titan"
+        assert normalize_rsn("lynx\xa0titan") == "lynx titan"
+    
+    def test_lru_eviction(self):
+        """Test least recently used names are evicted first."""
+        cache = HiscoresCache(max_size=2, positive_ttl=60, negative_ttl=60)
+        cache.set("a", "1,1,1")
+        cache.set("b", None)
+        cache.get("a")
+        cache.set("c", "1,1,1")
+        
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, "1,1,1")
+        assert cache.stats.evictions == 1
+    
+    @pytest.mark.asyncio
+    async def test_validate_and_stats_share_one_fetch(self):
+        """Test validate_rsn and get_player_stats share a lookup, and misses are cached."""
+        hits = []
+        
+        async def handler(request):
+            hits.append(request.query["player"])
+            if request.query["player"] == "zezima":
+                return web.Response(text="1,2277,4600000000\n")
+            return web.Response(status=404)
+        
+        app = web.Application()
+        app.router.add_get("/index_lite.ws", handler)
+        async with TestServer(app, host="127.0.0.1") as server:
+            http = HTTPClient(limiters=RateLimiterRegistry(""))
+            hiscores = HiscoresClient(http, url=str(server.make_url("/index_lite.ws")))
+            processor = OSRSGPPaymentProcessor(gp_rate=0.50, http=http, hiscores=hiscores)
+            try:
+                results = await asyncio.gather(
+                    processor.validate_rsn("Zezima"),
+                    processor.get_player_stats("ZEZIMA")
+                )
+                assert results[0] is True
+                assert results[1]["level"] == 2277
+                
+                assert not await processor.validate_rsn("No_Such-Player")
+                assert not await processor.validate_rsn("no such player")
+            finally:
+                await http.close()
+        
+        assert hits == ["zezima", "no such player"]
+        assert hiscores.cache.stats.coalesced == 1
+        assert hiscores.cache.stats.negative_hits == 1
+
+
+class TestPlayerStats:
+    """Test full hiscores parsing."""
+    
+    SAMPLE = "12,2277,4600000000\n5,99,200000000\n-1,1,-1\n-1,-1\n42,1500\n"
+    
+    def test_parse_skills_and_activities(self):
+        """Test every skill and activity row is parsed."""
+        stats = PlayerStats.parse("Zezima", self.SAMPLE)
+        
+        assert stats.overall == (12, 2277, 4600000000)
+        assert stats.skill("Attack") == (5, 99, 200000000)
+        assert stats.skill("defence") == (None, 1, None)
+        assert list(stats.activity_scores) == [-1, 1500]
+        
+        data = stats.to_dict()
+        assert data["level"] == 2277
+        assert data["skills"]["attack"]["xp"] == 200000000
+        assert data["activities"][1] == {"rank": 42, "score": 1500}
+        
+        with pytest.raises(KeyError):
+            stats.skill("sailing")
+    
+    def test_compact_record(self):
+        """Test the record has no per-instance dict."""
+        assert not hasattr(PlayerStats("a"), "__dict__")
+    
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_bounds_parallelism(self):
+        """Test bulk lookups never exceed the concurrency limit."""
+        in_flight = []
+        peak = []
+        
+        async def handler(request):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return web.Response(text=self.SAMPLE)
+        
+        app = web.Application()
+        app.router.add_get("/index_lite.ws", handler)
+        async with TestServer(app, host="127.0.0.1") as server:
+            http = HTTPClient(limiters=RateLimiterRegistry(""))
+            hiscores = HiscoresClient(http, url=str(server.make_url("/index_lite.ws")))
+            try:
+                results = await hiscores.get_many_stats([f"player{i}" for i in range(8)], concurrency=2)
+            finally:
+                await http.close()
+        
+        assert len(results) == 8
+        assert all(r.overall[1] == 2277 for r in results.values())
+        assert max(peak) <= 2
+
+
+class FakePlugin:
+    """Minimal RuneLite plugin that moves a trade along on its own."""
+    
+    def __init__(self, stream: bool = True, decline: bool = False):
+        self.world = 301
+        self.trade = {"status": "no_trade"}
+        self.stream = stream
+        self.decline = decline
+        self.requests = []
+        self.listeners = []
+        self.app = web.Application()
+        self.app.router.add_get("/status", self.json(lambda r: {"status": "connected"}))
+        self.app.router.add_get("/world", self.json(lambda r: {"world": self.world}))
+        self.app.router.add_get("/trade/status", self.json(lambda r: self.trade))
+        self.app.router.add_post("/world/hop", self.json(self.hop))
+        self.app.router.add_post("/trade/request", self.json(lambda r: self.set_trade("requested", "open")))
+        self.app.router.add_post("/trade/offer", self.json(lambda r: self.set_trade("offered")))
+        self.app.router.add_post("/trade/accept", self.json(self.accept))
+        self.app.router.add_get("/screenshot", lambda r: web.Response(body=b"png"))
+        if stream:
+            self.app.router.add_get("/events", self.events)
+    
+    def json(self, build):
+        async def handler(request):
+            self.requests.append(request.path)
+            return web.json_response(build(request))
+        return handler
+    
+    def push(self, event):
+        for queue in self.listeners:
+            queue.put_nowait(event)
+    
+    def hop(self, request):
+        asyncio.get_running_loop().call_later(0.05, self.set_world, 302)
+        return {"success": True}
+    
+    def set_world(self, world):
+        self.world = world
+        self.push({"type": "world", "world": world})
+    
+    def set_trade(self, status, then=None):
+        self.trade = {"status": status}
+        self.push({"type": "trade", **self.trade})
+        if then:
+            asyncio.get_running_loop().call_later(0.05, self.set_trade, then)
+        return {"success": True}
+    
+    def accept(self, request):
+        if self.trade["status"] == "confirming":
+            return self.set_trade("confirming", "declined" if self.decline else "completed")
+        return self.set_trade("accepted", "confirming")
+    
+    async def events(self, request):
+        self.requests.append(request.path)
+        queue = asyncio.Queue()
+        queue.put_nowait({"type": "hello", "world": self.world, "trade": self.trade})
+        self.listeners.append(queue)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        try:
+            while True:
+                await response.write(json.dumps(await queue.get()).encode() + b"\n")
+        finally:
+            self.listeners.remove(queue)
+
+
+class TestTradeAutomation:
+    """Test the staged OSRS trade flow."""
+    
+    async def run(self, plugin, tmp_path):
+        async with TestServer(plugin.app, host="127.0.0.1") as server:
+            http = HTTPClient(limiters=RateLimiterRegistry(""))
+            client = RuneLitePluginClient(server.host, server.port, http)
+            automation = OSRSTradeAutomation(
+                client, OSRSGPPaymentProcessor(0.5, http), ScreenshotStore(str(tmp_path))
+            )
+            client.events.start()
+            try:
+                for _ in range(20):
+                    if client.events.connected or not plugin.stream:
+                        break
+                    await asyncio.sleep(0.05)
+                started = time.monotonic()
+                result = await automation.run_trade("Zezima", 1_000_000, 302, "Grand Exchange")
+                return result, time.monotonic() - started
+            finally:
+                client.events.stop()
+                await http.close()
+    
+    @pytest.mark.asyncio
+    async def test_stages_advance_on_pushed_events(self, tmp_path):
+        """Test a trade completes without sleeps or status polling."""
+        plugin = FakePlugin()
+        result, elapsed = await self.run(plugin, tmp_path)
+        
+        assert result.success, result.message
+        assert result.stage == TradeStage.COMPLETED
+        assert list(result.timings) == [s.value for s in list(TradeStage)[:-1]]
+        assert ScreenshotStore.read(result.screenshot_path) == b"png"
+        assert elapsed < 1
+        assert "/trade/status" not in plugin.requests
+        
+        trade = OSRSTrade()
+        result.apply(trade)
+        assert trade.status == "completed"
+        assert trade.stage == "completed"
+        assert trade.trade_completed_at is not None
+        assert trade.screenshot_path == result.screenshot_path
+    
+    @pytest.mark.asyncio
+    async def test_polls_when_stream_unavailable(self, tmp_path):
+        """Test stages still advance by polling, and a decline fails the trade."""
+        plugin = FakePlugin(stream=False, decline=True)
+        result, elapsed = await self.run(plugin, tmp_path)
+        
+        assert not result.success
+        assert result.stage == TradeStage.FAILED
+        assert result.failed_stage == TradeStage.COMPLETED
+        assert result.message == "Trade was declined"
+        assert elapsed < 2
+        assert "/trade/status" in plugin.requests
+        
+        trade = OSRSTrade()
+        result.apply(trade)
+        assert trade.status == "failed"
+        assert trade.notes == "Failed at completed: Trade was declined"
+
+
+class TestScreenshotStore:
+    """Test content-addressed screenshot storage."""
+    
+    @pytest.mark.asyncio
+    async def test_streamed_frames_are_deduplicated(self, tmp_path):
+        """Test chunks are hashed into one file and identical frames stored once."""
+        store = ScreenshotStore(str(tmp_path), compress=False)
+        
+        async def chunks(*parts):
+            for part in parts:
+                yield part
+        
+        try:
+            first = await store.save_stream(chunks(b"frame-", b"one"))
+            again = await store.save_bytes(b"frame-one")
+            other = await store.save_bytes(b"frame-two")
+            empty = await store.save_bytes(b"")
+        finally:
+            store.close()
+        
+        assert first == again != other
+        assert empty is None
+        assert Path(first).name == f"{hashlib.sha256(b'frame-one').hexdigest()}.png"
+        assert ScreenshotStore.read(first) == b"frame-one"
+        assert store.metrics()["saved"] == 2
+        assert store.metrics()["deduplicated"] == 1
+        assert not list(tmp_path.glob("*.part"))
+    
+    @pytest.mark.asyncio
+    async def test_background_compression(self, tmp_path):
+        """Test stored files are gzipped off the event loop and still readable."""
+        store = ScreenshotStore(str(tmp_path), compress=True)
+        try:
+            path = await store.save_bytes(b"\x89PNG" + b"\0" * 4096)
+            await store.drain()
+            assert await store.save_bytes(b"\x89PNG" + b"\0" * 4096) == path
+        finally:
+            store.close()
+        
+        assert ScreenshotStore.resolve(path).suffix == ".gz"
+        assert ScreenshotStore.read(path) == b"\x89PNG" + b"\0" * 4096
+        assert store.metrics()["compressed"] == 1
+        assert store.metrics()["deduplicated"] == 1
+
+
+class TestTradeBenchmark:
+    """Test the mock RuneLite plugin and trade benchmark."""
+    
+    def test_summarize(self):
+        """Test nearest-rank percentiles."""
+        summary = summarize(i / 100 for i in range(1, 101))
+        assert summary == {"count": 100, "p50": 0.5, "p95": 0.95, "p99": 0.99, "max": 1.0}
+        assert summarize([])["p50"] is None
+    
+    @pytest.mark.asyncio
+    async def test_benchmark_drives_concurrent_trades(self):
+        """Test every trade completes across mock clients and is measured."""
+        report = await run_benchmark(trades=6, concurrency=3, accept_delay=0.01, seed=1)
+        
+        assert report["completed"] == 6
+        assert report["trades_per_minute"] > 0
+        assert report["stage_latency"]["completed"]["count"] == 6
+        assert report["requests"]["/trade/request"] == 6
+        assert report["requests"]["/screenshot"] == 6
+        assert report["requests"]["/events"] == 3
+        assert "/trade/status" not in report["requests"]
+
+
+class TestPluginEventStream:
+    """Test the RuneLite plugin event stream."""
+    
+    @staticmethod
+    async def stream(request, events, hold=True):
+        """Write NDJSON events, optionally keeping the response open."""
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for line in events:
+            await response.write(line.encode() + b"\n")
+        while hold:
+            await asyncio.sleep(0.05)
+        return response
+    
+    @pytest.mark.asyncio
+    async def test_reconnects_after_drop(self):
+        """Test a dropped stream is re-opened."""
+        connections = []
+        
+        async def events(request):
+            connections.append(1)
+            hello = '{"type": "hello", "world": %d}' % (300 + len(connections))
+            return await self.stream(request, [hello], hold=len(connections) > 1)
+        
+        app = web.Application()
+        app.router.add_get("/events", events)
+        async with TestServer(app, host="127.0.0.1") as server:
+            http = HTTPClient(limiters=RateLimiterRegistry(""))
+            plugin = RuneLitePluginClient(server.host, server.port, http)
+            plugin.events.start()
+            try:
+                for _ in range(100):
+                    if plugin.events.state.get("world") == 302:
+                        break
+                    await asyncio.sleep(0.05)
+            finally:
+                plugin.events.stop()
+                await http.close()
+        
+        assert plugin.events.state["world"] == 302
+        assert plugin.events.stats.connects == 2
+        assert plugin.events.stats.disconnects == 1
+
+
+class TestDatabaseEngine:
+    """Test backend engine profiles."""
+    
+    @pytest.mark.asyncio
+    async def test_sqlite_pragmas_and_pool_stats(self, tmp_path):
+        """Test SQLite connections get WAL, NORMAL sync and a busy timeout, and checkouts are timed."""
+        stats = PoolStats()
+        engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db", stats)
+        try:
+            async with engine.connect() as conn:
+                journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+                synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+                busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        finally:
+            await engine.dispose()
+        
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == settings.sqlite_busy_timeout_ms
+        snapshot = stats.snapshot()
+        assert snapshot["checkouts"] == 1
+        assert snapshot["checked_out"] == 0
+        assert snapshot["max_checkout_seconds"] > 0
+    
+    def test_server_database_profile(self):
+        """Test server databases get a sized, pinged, recycled pool and no SQL echo."""
+        options = engine_options("postgresql+asyncpg://bot:secret@db/gpskilled")
+        
+        assert options["echo"] is False
+        assert options["pool_size"] == settings.database_pool_size
+        assert options["max_overflow"] == settings.database_max_overflow
+        assert options["pool_pre_ping"] is True
+        assert options["pool_recycle"] == settings.database_pool_recycle
+        assert "pool_size" not in engine_options("sqlite+aiosqlite:///data/gpskilled.db")
+
+
+class TestMigrations:
+    """Test versioned migrations and the hot query indexes."""
+    
+    @staticmethod
+    async def explain(engine, statement):
+        """Run a statement and return SQLite's query plan for it as executed."""
+        captured = []
+        
+        def capture(conn, cursor, sql, parameters, context, executemany):
+            captured.append((sql, parameters))
+        
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(statement)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        
+        sql, parameters = captured[-1]
+        async with engine.connect() as conn:
+            rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            return " | ".join(row[-1] for row in rows)
+    
+    @pytest.mark.asyncio
+    async def test_hot_queries_use_indexes(self, tmp_path):
+        """Test each hot query is answered from its index without a table scan or sort."""
+        engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+        now = datetime.utcnow()
+        hot_queries = {
+            "ix_payments_status_expires_at": select(Payment).where(
+                Payment.status.in_([PaymentStatus.PENDING, PaymentStatus.CONFIRMING]),
+                Payment.expires_at < now
+            ),
+            "ix_payments_user_type_status": select(Payment).where(
+                Payment.user_id == "1",
+                Payment.payment_type == PaymentType.OSRS_GP,
+                Payment.status == PaymentStatus.PENDING
+            ),
+            "ix_payments_user_created_at": select(Payment).where(
+                Payment.user_id == "1"
+            ).order_by(Payment.created_at.desc()),
+            "ix_payments_confirming_tx": select(Payment.id, Payment.payment_type, Payment.transaction_id).where(
+                Payment.status == PaymentStatus.CONFIRMING,
+                Payment.transaction_id.is_not(None)
+            ),
+            "ix_osrs_trades_queue": select(OSRSTrade.id).where(
+                OSRSTrade.status == "pending"
+            ).order_by(OSRSTrade.priority.desc(), OSRSTrade.created_at, OSRSTrade.id).limit(1),
+            "ix_webhook_logs_status_created_at": select(WebhookLog).where(
+                WebhookLog.status == "failed", WebhookLog.created_at < now
+            )
+        }
+        try:
+            assert await migrate(engine) == ["0001", "0002", "0003", "0004", "0005", "0006", "0007"]
+            assert await migrate(engine) == []
+            
+            for index, statement in hot_queries.items():
+                plan = await self.explain(engine, statement)
+                assert f"INDEX {index}" in plan, plan
+                assert "TEMP B-TREE" not in plan, plan
+        finally:
+            await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_migrations_match_models(self, tmp_path):
+        """Test migrating gives the schema the models declare, and downgrades cleanly."""
+        def schema(conn):
+            inspector = inspect(conn)
+            return {
+                table: (
+                    sorted(c["name"] for c in inspector.get_columns(table)),
+                    sorted((i["name"], tuple(i["column_names"]), bool(i["unique"])) for i in inspector.get_indexes(table))
+                )
+                for table in Base.metadata.tables
+            }
+        
+        migrated = create_engine(f"sqlite+aiosqlite:///{tmp_path}/migrated.db")
+        declared = create_engine(f"sqlite+aiosqlite:///{tmp_path}/declared.db")
+        try:
+            await migrate(migrated)
+            async with declared.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                expected = await conn.run_sync(schema)
+            async with migrated.begin() as conn:
+                assert await conn.run_sync(schema) == expected
+                assert head() == "0007"
+                assert await conn.run_sync(downgrade, None) == ["0007", "0006", "0005", "0004", "0003", "0002", "0001"]
+                assert not await conn.run_sync(lambda c: inspect(c).has_table("payments"))
+        finally:
+            await migrated.dispose()
+            await declared.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_migrates_baseline_database(self, tmp_path):
+        """Test a database built by the old create_all startup is brought up to head."""
+        engine = create_engine(f"sqlite+aiosqlite:///{tmp_path}/baseline.db")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(v0001_initial.metadata.create_all)
+                await conn.execute(text(
+                    "INSERT INTO osrs_trades (payment_id, user_id, rsn, gp_amount, world, location, status) "
+                    "VALUES (1, '1', 'Zezima', 1000000, 301, 'Grand Exchange', 'pending')"
+                ))
+            
+            assert await migrate(engine) == ["0001", "0002", "0003", "0004", "0005", "0006", "0007"]
+            
+            async with engine.connect() as conn:
+                indexes = await conn.run_sync(lambda c: inspect(c).get_indexes("osrs_trades"))
+                trade = (await conn.execute(select(OSRSTrade.priority, OSRSTrade.stage))).one()
+            assert "ix_osrs_trades_queue" in {index["name"] for index in indexes}
+            assert trade.priority == 0
+            assert trade.stage is None
+        finally:
+            await engine.dispose()
+
+
+class TestWebhookQueue:
+    """Test acknowledge-then-process webhook handling."""
+    
+    @pytest.mark.asyncio
+    async def test_acknowledged_then_processed(self, db, monkeypatch):
+        """Test a delivery is logged and acknowledged, then a worker applies it to its payment."""
+        from api.main import app
+        
+        queue = WebhookQueue(webhooks_api.webhook_queue.handlers, workers=2)
+        monkeypatch.setattr(webhooks_api, "webhook_queue", queue)
+        async with db() as session:
+            session.add(Payment(
+                user_id="1", username="u", payment_type=PaymentType.BTC, amount_usd=10.0,
+                transaction_id="abc", status=PaymentStatus.CONFIRMING,
+                expires_at=datetime.utcnow() + timedelta(minutes=30)
+            ))
+            await session.commit()
+        
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            response = await api.post(
+                "/webhooks/blockcypher",
+                json={"hash": "abc", "confirmations": 1},
+                headers={"X-EventType": "tx-confirmation", "X-EventId": "hook"}
+            )
+            unknown = await api.post(
+                "/webhooks/blockcypher",
+                json={"hash": "unknown", "confirmations": 1},
+                headers={"X-EventType": "tx-confirmation"}
+            )
+        assert response.status_code == unknown.status_code == 200
+        assert response.json() == {"status": "received"}
+        assert queue.depth == 2
+        
+        queue.start()
+        try:
+            await asyncio.wait_for(queue.join(), 5)
+        finally:
+            queue.stop()
+        
+        async with db() as session:
+            payment = (await session.execute(select(Payment))).scalar_one()
+            logs = (await session.execute(select(WebhookLog).order_by(WebhookLog.id))).scalars().all()
+        assert payment.confirmations == 1
+        assert [(log.event_type, log.status) for log in logs] == [
+            ("tx-confirmation", "processed"), ("tx-confirmation", "ignored")
+        ]
+        assert json.loads(logs[0].payload) == {"hash": "abc", "confirmations": 1}
+        metrics = queue.metrics()
+        assert (metrics["received"], metrics["processed"], metrics["ignored"], metrics["depth"]) == (2, 1, 1, 0)
+        assert metrics["ingest_per_second"] > 0
+        assert metrics["lag_max_ms"] is not None
+    
+    @pytest.mark.asyncio
+    async def test_full_queue_pushes_back(self, db, monkeypatch):
+        """Test deliveries beyond the queue's capacity get 503 + Retry-After and are not logged."""
+        from api.main import app
+        
+        queue = WebhookQueue(webhooks_api.webhook_queue.handlers, maxsize=1)
+        monkeypatch.setattr(webhooks_api, "webhook_queue", queue)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            accepted = await api.post("/webhooks/payment", json={"n": 1})
+            refused = await api.post("/webhooks/payment", json={"n": 2})
+        
+        assert accepted.status_code == 200
+        assert refused.status_code == 503
+        assert refused.headers["Retry-After"] == str(settings.webhook_retry_after)
+        async with db() as session:
+            assert len((await session.execute(select(WebhookLog))).scalars().all()) == 1
+        assert queue.metrics()["rejected"] == 1
+        
+        assert await queue.process(1) == "processed"
+    
+    @pytest.mark.asyncio
+    async def test_redeliveries_are_dropped(self, db, monkeypatch):
+        """Test a repeated X-EventId delivery is acknowledged once, from memory or the unique index."""
+        from api.main import app
+        
+        queue = WebhookQueue(webhooks_api.webhook_queue.handlers)
+        monkeypatch.setattr(webhooks_api, "webhook_queue", queue)
+        headers = {"X-EventType": "tx-confirmation", "X-EventId": "hook-1"}
+        
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            async def deliver(confirmations):
+                response = await api.post(
+                    "/webhooks/blockcypher", json={"hash": "abc", "confirmations": confirmations}, headers=headers
+                )
+                return response.json()["status"]
+            
+            # BlockCypher reuses the hook id for every confirmation
+            assert [await deliver(1), await deliver(2)] == ["received", "received"]
+            assert await deliver(2) == "duplicate"
+            
+            # Forgotten by the in-memory front; caught by the unique index
+            monkeypatch.setattr(webhooks_api, "webhook_queue", WebhookQueue(queue.handlers))
+            assert await deliver(2) == "duplicate"
+            assert webhooks_api.webhook_queue.depth == 0
+        
+        async with db() as session:
+            keys = (await session.execute(select(WebhookLog.event_key).order_by(WebhookLog.id))).scalars().all()
+        assert keys == ["blockcypher:hook-1:abc:1", "blockcypher:hook-1:abc:2"]
+        assert queue.metrics()["duplicates"] == 1
+        assert webhooks_api.webhook_queue.metrics()["duplicates"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_signed_raw_body(self, db, monkeypatch):
+        """Test the HMAC is checked on the raw body before parsing and the body is logged verbatim."""
+        from api.main import app
+        
+        queue = WebhookQueue(webhooks_api.webhook_queue.handlers)
+        monkeypatch.setattr(webhooks_api, "webhook_queue", queue)
+        monkeypatch.setattr(settings, "api_secret_key", "s3cret")
+        body = b'{"amount": 10,   "note": "caf\xc3\xa9"}'
+        signature = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            async def post(content, signature=None):
+                headers = {"X-Signature": signature} if signature else {}
+                return (await api.post("/webhooks/payment", content=content, headers=headers)).status_code
+            
+            assert await post(body) == 401
+            assert await post(body + b" ", signature) == 401
+            assert await post(b"not json", hmac.new(b"s3cret", b"not json", hashlib.sha256).hexdigest()) == 400
+            assert await post(b"[]", hmac.new(b"s3cret", b"[]", hashlib.sha256).hexdigest()) == 400
+            assert await post(body, signature.upper()) == 200
+        
+        async with db() as session:
+            log = (await session.execute(select(WebhookLog))).scalar_one()
+        assert log.payload.encode("utf-8") == body
+        assert queue.metrics()["unauthorized"] == 2
+        assert queue.metrics()["malformed"] == 2
+        assert queue._queue.get_nowait().payload == {"amount": 10, "note": "caf\u00e9"}
+    
+    @pytest.mark.asyncio
+    async def test_completion_runs_once(self, db, monkeypatch):
+        """Test repeated and late confirmations credit the user once and never un-complete the payment."""
+        monkeypatch.setattr(settings, "payment_confirmation_blocks", 2)
+        async with db() as session:
+            session.add(User(discord_id="1", username="u", total_payments=0, total_spent_usd=0.0))
+            session.add(Payment(
+                user_id="1", username="u", payment_type=PaymentType.BTC, amount_usd=10.0,
+                transaction_id="abc", status=PaymentStatus.CONFIRMING,
+                expires_at=datetime.utcnow() + timedelta(minutes=30)
+            ))
+            await session.commit()
+        
+        completed = []
+        for confirmations in (2, 3, 2, 1):
+            async with db() as session:
+                payment = (await session.execute(select(Payment))).scalar_one()
+                completed.append(await apply_confirmations(session, payment, confirmations))
+                await session.commit()
+        
+        async with db() as session:
+            payment = (await session.execute(select(Payment))).scalar_one()
+            user = (await session.execute(select(User))).scalar_one()
+        assert completed == [True, False, False, False]
+        assert payment.status == PaymentStatus.COMPLETED
+        assert payment.confirmations == 3
+        assert (user.total_payments, user.total_spent_usd) == (1, 10.0)
+    
+    @pytest.mark.asyncio
+    async def test_replay(self, tmp_path, monkeypatch):
+        """Test a replay reprocesses failed and stranded rows page by page and records each outcome."""
+        # A file database, so concurrent workers get their own connections
+        engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'replay.db'}")
+        await migrate(engine)
+        db = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        monkeypatch.setattr(bot.database, "AsyncSessionLocal", db)
+        queue = WebhookQueue(webhooks_api.webhook_queue.handlers)
+        old = datetime.utcnow() - timedelta(minutes=10)
+        tx = json.dumps({"hash": "abc", "confirmations": 1})
+        async with db() as session:
+            session.add(Payment(
+                user_id="1", username="u", payment_type=PaymentType.BTC, amount_usd=10.0,
+                transaction_id="abc", status=PaymentStatus.CONFIRMING,
+                expires_at=datetime.utcnow() + timedelta(minutes=30)
+            ))
+            session.add_all([
+                WebhookLog(webhook_type="blockcypher", event_type="tx-confirmation", payload=tx,
+                           status="failed", error_message="database is locked", created_at=old),
+                WebhookLog(webhook_type="payment", payload="{}", status="received", created_at=old),
+                WebhookLog(webhook_type="payment", payload="{}", status="received"),
+                WebhookLog(webhook_type="payment", payload="{}", status="processed", created_at=old),
+                WebhookLog(webhook_type="payment", payload="not json", status="failed", created_at=old),
+                WebhookLog(webhook_type="other", payload="{}", status="received", created_at=old)
+            ])
+            await session.commit()
+        
+        report = await replay(queue, page_size=2, concurrency=3)
+        
+        async with db() as session:
+            payment = (await session.execute(select(Payment))).scalar_one()
+            logs = (await session.execute(select(WebhookLog).order_by(WebhookLog.id))).scalars().all()
+        assert (report.scanned, report.pages) == (4, 2)
+        assert dict(report.outcomes) == {"processed": 2, "failed": 1, "ignored": 1}
+        assert report.still_failing == [logs[4].id]
+        assert [log.status for log in logs] == ["processed", "processed", "received", "processed", "failed", "ignored"]
+        assert logs[0].error_message is None
+        assert logs[4].error_message
+        assert payment.confirmations == 1
+        
+        assert (await replay(queue, statuses=("failed",))).still_failing == [logs[4].id]
+        await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_retention(self, db):
+        """Test old finished rows are compacted into archives verbatim, and expired archives purged."""
+        now = datetime.utcnow()
+        body = json.dumps({"hash": "abc", "note": "caf\u00e9"}, ensure_ascii=False)
+        async with db() as session:
+            session.add_all([
+                WebhookLog(webhook_type="blockcypher", event_key=f"k{i}", payload=body,
+                           status="processed" if i % 2 else "ignored", created_at=now - timedelta(days=30 - i))
+                for i in range(5)
+            ])
+            session.add_all([
+                WebhookLog(webhook_type="payment", payload="{}", status="failed", created_at=now - timedelta(days=30)),
+                WebhookLog(webhook_type="payment", payload="{}", status="processed", created_at=now - timedelta(days=1))
+            ])
+            await session.commit()
+        
+        retention = WebhookRetention(archive_after_days=7, retention_days=28, batch_size=2)
+        assert retention.metrics()["tables"] is None
+        assert await retention.run_once(now) == {"archived": 5, "purged_archives": 1, "purged_rows": 2}
+        
+        async with db() as session:
+            logs = (await session.execute(select(WebhookLog).order_by(WebhookLog.id))).scalars().all()
+            archives = (await session.execute(select(WebhookLogArchive).order_by(WebhookLogArchive.id))).scalars().all()
+        assert [log.status for log in logs] == ["failed", "processed"]
+        assert [(a.first_log_id, a.last_log_id, a.row_count) for a in archives] == [(3, 4, 2), (5, 5, 1)]
+        rows = read_archive(archives[0])
+        assert [row["event_key"] for row in rows] == ["k2", "k3"]
+        assert rows[0]["payload"] == body
+        
+        sizes = retention.metrics()["tables"]
+        assert sizes["webhook_logs"]["rows"] == 2
+        assert sizes["webhook_log_archives"]["rows"] == 3
+        metrics = retention.metrics()
+        assert (metrics["archived_rows"], metrics["archives"], metrics["purged_rows"]) == (5, 3, 2)
+        assert metrics["archived_rows_per_second"] > 0
+        assert await retention.run_once(now) == {"archived": 0, "purged_archives": 0, "purged_rows": 0}
+
+
+class TestHealthCheck:
+    """Test the API health endpoint reports the bot's published state."""
+    
+    @pytest.mark.asyncio
+    async def test_reports_bot_breakers(self, db):
+        """Test breakers opened in the bot's client show up in the API's health check."""
+        from api.main import app
+        
+        bot_http = HTTPClient(limiters=RateLimiterRegistry(""))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+            missing = (await api.get("/webhooks/health")).json()
+            
+            await publish_health("bot", bot_http)
+            healthy = (await api.get("/webhooks/health")).json()
+            
+            breaker = bot_http.breakers.get("api.blockcypher.com")
+            for _ in range(breaker.failure_threshold):
+                breaker.record_failure()
+            await publish_health("bot", bot_http)
+            degraded = (await api.get("/webhooks/health")).json()
+        
+        assert missing["status"] == "degraded"
+        assert missing["circuit_breakers"] is None
+        assert healthy["status"] == "healthy"
+        assert healthy["http"]["stale"] is False
+        assert degraded["status"] == "degraded"
+        assert degraded["circuit_breakers"]["api.blockcypher.com"]["state"] == "open"
+
+
 class TestPaymentModel:
     """Test payment model."""
     